@@ -0,0 +1,37 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+
+import utils
+from wsgi import app as wsgi_app, server_config
+
+# asgiref 默认以 thread_sensitive 方式运行 WSGI 应用，所有请求排队进入同一个线程；
+# 这里改为在固定大小的线程池中并发执行
+_executor = ThreadPoolExecutor(max_workers=server_config.get('threads', 8), thread_name_prefix='asgi-wsgi')
+
+
+class _ThreadedWsgiToAsgiInstance(WsgiToAsgiInstance):
+    run_wsgi_app = sync_to_async(WsgiToAsgiInstance.__dict__['run_wsgi_app'].func, thread_sensitive=False, executor=_executor)
+
+
+class ThreadedWsgiToAsgi(WsgiToAsgi):
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            # 应用没有需要在启动/关闭时执行的异步逻辑
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    await send({'type': 'lifespan.startup.complete'})
+                elif message['type'] == 'lifespan.shutdown':
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+        await _ThreadedWsgiToAsgiInstance(self.wsgi_application, self.duplicate_header_limit)(scope, receive, send)
+
+
+# 视图中的数据库、Redis 调用是同步阻塞的，不能直接在服务器的主事件循环中执行，
+# 因此异步视图始终在工作线程各自的常驻事件循环中运行
+utils.use_thread_event_loops(wsgi_app)
+
+# ASGI 入口: uvicorn asgi:app --workers 4，或 gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:app
+app = ThreadedWsgiToAsgi(wsgi_app)
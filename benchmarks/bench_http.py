@@ -0,0 +1,86 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+"""
+HTTP 压测：以固定并发持续请求一个地址，输出吞吐量和延迟分位数，用于对比开发服务器、gunicorn 与 ASGI 部署。
+可以通过 --cookie 携带登录会话，测试需要登录的接口。
+
+用法: python -m benchmarks.bench_http http://127.0.0.1:5000/recruit/list [--concurrency 32] [--duration 10]
+"""
+
+import argparse
+import asyncio
+import time
+
+import aiohttp
+
+
+def _percentile(sorted_values, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(int(len(sorted_values) * fraction), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+async def run(url: str, concurrency: int, duration: float, warmup: float, cookie: str = None):
+    latencies = []
+    statuses = {}
+    errors = 0
+    headers = {'Cookie': cookie} if cookie else None
+    connector = aiohttp.TCPConnector(limit=concurrency)
+
+    async with aiohttp.ClientSession(connector=connector, headers=headers) as session:
+        record_after = time.perf_counter() + warmup
+        deadline = record_after + duration
+
+        async def client():
+            nonlocal errors
+            while True:
+                start = time.perf_counter()
+                if start >= deadline:
+                    return
+                try:
+                    async with session.get(url) as response:
+                        await response.read()
+                        status = response.status
+                except aiohttp.ClientError:
+                    status = None
+                end = time.perf_counter()
+                if start < record_after:
+                    continue
+                if status is None:
+                    errors += 1
+                    continue
+                statuses[status] = statuses.get(status, 0) + 1
+                latencies.append(end - start)
+
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'rps': len(latencies) / duration,
+        'p50': _percentile(latencies, 0.5),
+        'p90': _percentile(latencies, 0.9),
+        'p99': _percentile(latencies, 0.99),
+        'statuses': statuses,
+        'errors': errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('url')
+    parser.add_argument('--concurrency', type=int, default=32, help='并发连接数')
+    parser.add_argument('--duration', type=float, default=10, help='统计时长（秒）')
+    parser.add_argument('--warmup', type=float, default=2, help='预热时长（秒），不计入结果')
+    parser.add_argument('--cookie', help='请求携带的 Cookie，如 "session=..."')
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.url, args.concurrency, args.duration, args.warmup, args.cookie))
+    print(f"url={args.url} concurrency={args.concurrency} duration={args.duration}s")
+    print(f"requests={result['requests']}  {result['rps']:.1f} req/s  errors={result['errors']}  statuses={result['statuses']}")
+    print(f"latency p50={result['p50'] * 1000:.1f}ms  p90={result['p90'] * 1000:.1f}ms  p99={result['p99'] * 1000:.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
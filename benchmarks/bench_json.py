@@ -0,0 +1,103 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+"""
+JSON 序列化基准测试：构造与 /resume/admin/list 相同结构的简历列表，对比
+Flask 默认 JSON 提供者 + 视图逐行 strftime 与 FastJSONProvider 直接序列化 datetime 的耗时。
+
+用法: python -m benchmarks.bench_json [--rows 5000] [--repeat 20]
+"""
+
+import argparse
+import datetime
+import statistics
+import time
+import uuid
+
+from flask import Flask, jsonify
+from flask.json.provider import DefaultJSONProvider
+
+from benchmarks.common import import_isolated
+
+json_provider = import_isolated('utils.json_provider')
+
+
+def make_rows(count: int):
+    base = datetime.datetime(2025, 9, 1, 8, 0, 0)
+    return [{
+        'submit_id': uuid.uuid4().hex,
+        'uid': str(uuid.uuid4()),
+        'recruit_id': str(uuid.uuid4()),
+        'submit_time': base + datetime.timedelta(minutes=i),
+        'status': i % 7,
+        'first_choice': ['算法组', '电控组', '机械组', '运营组'][i % 4],
+        'realname': f'测试同学{i}',
+        'nickname': f'nickname_{i}',
+    } for i in range(count)]
+
+
+def legacy_format(item):
+    # 改动前 _format_resume_row 的写法
+    return {
+        'submit_id': item['submit_id'],
+        'uid': item['uid'],
+        'recruit_id': item['recruit_id'],
+        'submit_time': item['submit_time'].strftime('%Y-%m-%d %H:%M:%S'),
+        'status': item['status'],
+        'first_choice': item['first_choice'] or '',
+        'realname': item['realname'] or '',
+        'nickname': item['nickname'] or ''
+    }
+
+
+def current_format(item):
+    return {
+        'submit_id': item['submit_id'],
+        'uid': item['uid'],
+        'recruit_id': item['recruit_id'],
+        'submit_time': item['submit_time'],
+        'status': item['status'],
+        'first_choice': item['first_choice'] or '',
+        'realname': item['realname'] or '',
+        'nickname': item['nickname'] or ''
+    }
+
+
+def bench(app: Flask, rows, formatter, repeat: int):
+    timings = []
+    body = b''
+    with app.app_context():
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response = jsonify(success=True, data=[formatter(item) for item in rows])
+            body = response.get_data()
+            timings.append(time.perf_counter() - start)
+    return statistics.median(timings), body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=5000, help='列表行数')
+    parser.add_argument('--repeat', type=int, default=20, help='重复次数（取中位数）')
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+
+    default_app = Flask('bench-default')
+    default_app.json = DefaultJSONProvider(default_app)
+    fast_app = Flask('bench-fast')
+    fast_app.json = json_provider.FastJSONProvider(fast_app)
+
+    default_time, default_body = bench(default_app, rows, legacy_format, args.repeat)
+    fast_time, fast_body = bench(fast_app, rows, current_format, args.repeat)
+
+    # 两种方式的解析结果必须一致
+    assert default_app.json.loads(default_body) == fast_app.json.loads(fast_body)
+
+    backend = 'orjson' if json_provider.orjson is not None else 'json (orjson 未安装)'
+    print(f"rows={args.rows} repeat={args.repeat} backend={backend}")
+    print(f"DefaultJSONProvider + strftime: {default_time * 1000:.1f}ms  {len(default_body) / 1024:.0f} KiB")
+    print(f"FastJSONProvider:               {fast_time * 1000:.1f}ms  {len(fast_body) / 1024:.0f} KiB  ({default_time / fast_time:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
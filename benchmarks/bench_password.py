@@ -0,0 +1,81 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+"""
+密码哈希基准测试：模拟一批并发登录，对比在事件循环中直接调用 werkzeug 与使用 PasswordHasher 线程池的
+总耗时、吞吐量，以及同一事件循环上其他请求感受到的最大调度延迟。
+
+用法: python -m benchmarks.bench_password [--count 32] [--method scrypt] [--workers 4]
+"""
+
+import argparse
+import asyncio
+import time
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from benchmarks.common import import_isolated
+
+password = import_isolated('utils.password')
+
+
+async def _measure_lag(stop: asyncio.Event, interval: float = 0.005) -> float:
+    """每隔 interval 秒醒来一次，返回实际唤醒时间与预期的最大偏差（秒）。"""
+    worst = 0.0
+    while not stop.is_set():
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - expected)
+    return worst
+
+
+async def _run(logins, stored_hash: str, verify):
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(_measure_lag(stop))
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    results = await asyncio.gather(*(verify(stored_hash, pwd) for pwd in logins))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    return elapsed, await lag_task, results
+
+
+def bench_inline(logins, stored_hash: str):
+    async def verify(stored, pwd):
+        return check_password_hash(stored, pwd)
+    return asyncio.run(_run(logins, stored_hash, verify))
+
+
+def bench_pool(logins, stored_hash: str, hasher):
+    async def main():
+        # 预热线程池，不计入耗时
+        await hasher.verify(stored_hash, logins[0])
+        return await _run(logins, stored_hash, hasher.verify)
+    try:
+        return asyncio.run(main())
+    finally:
+        hasher.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=32, help='并发登录次数')
+    parser.add_argument('--method', default='scrypt', help="werkzeug 哈希方法，如 'scrypt'、'pbkdf2:sha256:600000'")
+    parser.add_argument('--workers', type=int, default=4, help='PasswordHasher 线程数')
+    args = parser.parse_args()
+
+    stored_hash = generate_password_hash('correct horse battery staple', method=args.method)
+    logins = ['correct horse battery staple'] * args.count
+
+    inline_elapsed, inline_lag, inline_results = bench_inline(logins, stored_hash)
+    hasher = password.PasswordHasher(method=args.method, max_workers=args.workers)
+    pool_elapsed, pool_lag, pool_results = bench_pool(logins, stored_hash, hasher)
+
+    print(f"logins={args.count} method={hasher.method_prefix} workers={args.workers}")
+    print(f"inline check_password_hash: {inline_elapsed:.3f}s  {args.count / inline_elapsed:.1f} verify/s  "
+          f"max loop lag={inline_lag * 1000:.1f}ms  ok={sum(inline_results)}")
+    print(f"PasswordHasher:             {pool_elapsed:.3f}s  {args.count / pool_elapsed:.1f} verify/s  "
+          f"max loop lag={pool_lag * 1000:.1f}ms  ok={sum(pool_results)}")
+
+
+if __name__ == '__main__':
+    main()
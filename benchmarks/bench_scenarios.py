@@ -0,0 +1,440 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+"""
+端到端场景基准测试：生成合成数据后，通过 Flask 测试客户端运行以下场景，
+输出每个场景的延迟分位数、每个请求的 SQL 查询数和峰值内存（tracemalloc），并可与保存的基线比较。
+
+- apply_burst   一批新用户并发投递简历（含正面照和附件上传）；
+- admin_list    管理员反复拉取简历列表和用户列表；
+- booking_race  大量通过初筛的用户并发抢占少量面试时间段，并校验没有重复预约；
+- bulk_status   管理员批量修改全部未处理简历的状态；
+- notify        通知 worker 把以上场景产生的发件箱任务投递到本地 SMTP 收信桩。
+
+需要本地 MySQL 和 Redis，并在专用于基准测试的部署目录（config/ 指向一次性的数据库）中运行：
+--reset 会清空相关数据表，目标库中已有用户且未指定 --reset 时拒绝运行。
+
+用法: python -m benchmarks.bench_scenarios --reset [--users 400] [--concurrency 16]
+          [--scenarios apply_burst,admin_list] [--save-baseline bench_baseline.json]
+          [--baseline bench_baseline.json --tolerance 0.25]
+"""
+
+import argparse
+import asyncio
+import contextvars
+import io
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+import pymysql
+
+from benchmarks import fixtures
+from benchmarks.smtp_sink import SmtpSink
+
+DEFAULT_SCENARIOS = ['apply_burst', 'admin_list', 'booking_race', 'bulk_status', 'notify']
+
+# 当前请求的 SQL 计数器；异步视图在另一线程执行时 contextvars 会被复制，计数器对象仍是同一个
+_query_counter: contextvars.ContextVar = contextvars.ContextVar('bench_query_counter', default=None)
+
+
+def install_query_counter():
+    """统计经由 pymysql 游标执行的语句数（DictCursor、SSDictCursor 均继承自 Cursor）。"""
+    original_execute = pymysql.cursors.Cursor.execute
+
+    def execute(self, query, args=None):
+        counter = _query_counter.get()
+        if counter is not None:
+            counter[0] += 1
+        return original_execute(self, query, args)
+
+    pymysql.cursors.Cursor.execute = execute
+
+
+def _percentile(sorted_values, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(int(len(sorted_values) * fraction), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+@dataclass
+class Sample:
+    latency: float
+    queries: int
+    status: int
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    samples: List[Sample] = field(default_factory=list)
+    elapsed: float = 0.0
+    peak_memory: Optional[int] = None
+    # 场景自身的计数和正确性检查，如成功预约数、投递的邮件数
+    checks: Dict[str, object] = field(default_factory=dict)
+    # 没有逐请求样本的场景（notify）按任务数和总查询数统计
+    operations: Optional[int] = None
+    total_queries: Optional[int] = None
+
+    def summary(self) -> Dict[str, object]:
+        latencies = sorted(sample.latency for sample in self.samples)
+        operations = self.operations if self.operations is not None else len(self.samples)
+        total_queries = self.total_queries if self.total_queries is not None else sum(sample.queries for sample in self.samples)
+        statuses: Dict[str, int] = {}
+        for sample in self.samples:
+            statuses[str(sample.status)] = statuses.get(str(sample.status), 0) + 1
+        result = {
+            'operations': operations,
+            'elapsed_s': round(self.elapsed, 3),
+            'throughput': round(operations / self.elapsed, 1) if self.elapsed else 0.0,
+            'queries_per_request': round(total_queries / operations, 2) if operations else 0.0,
+            'errors': sum(1 for sample in self.samples if sample.status >= 500),
+            'statuses': statuses,
+        }
+        if latencies:
+            result.update({
+                'p50_ms': round(_percentile(latencies, 0.5) * 1000, 1),
+                'p95_ms': round(_percentile(latencies, 0.95) * 1000, 1),
+                'p99_ms': round(_percentile(latencies, 0.99) * 1000, 1),
+                'max_ms': round(latencies[-1] * 1000, 1),
+                'mean_ms': round(statistics.fmean(latencies) * 1000, 1),
+            })
+        if self.peak_memory is not None:
+            result['peak_memory_kb'] = round(self.peak_memory / 1024)
+        result.update(self.checks)
+        return result
+
+
+class Bench:
+    """持有应用、数据集和参数，提供带会话的测试客户端和计时请求。"""
+
+    def __init__(self, app, dataset: fixtures.Dataset, smtp_sink: SmtpSink, concurrency: int, repeat: int,
+                 trace_memory: bool):
+        self.app = app
+        self.dataset = dataset
+        self.smtp_sink = smtp_sink
+        self.concurrency = concurrency
+        self.repeat = repeat
+        self.trace_memory = trace_memory
+        self._ip_counter = 0
+
+    def client(self, uid: Optional[str] = None):
+        """返回一个测试客户端；每个客户端使用不同的来源 IP，uid 非空时带有该用户的登录会话。"""
+        client = self.app.test_client()
+        self._ip_counter += 1
+        client.environ_base['REMOTE_ADDR'] = f'10.{(self._ip_counter >> 16) & 255}.{(self._ip_counter >> 8) & 255}.{self._ip_counter & 255}'
+        if uid is not None:
+            with client.session_transaction() as sess:
+                sess['uid'] = uid
+                sess.permanent = True
+        return client
+
+    @staticmethod
+    def request(client, method: str, url: str, **kwargs) -> Sample:
+        counter = [0]
+        token = _query_counter.set(counter)
+        start = time.perf_counter()
+        try:
+            response = client.open(url, method=method, **kwargs)
+            # 流式响应在读取响应体时才真正查询、序列化
+            response.get_data()
+        finally:
+            latency = time.perf_counter() - start
+            _query_counter.reset(token)
+        return Sample(latency, counter[0], response.status_code)
+
+    def concurrent(self, func: Callable, items) -> List:
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            return list(executor.map(func, items))
+
+    def run(self, name: str, scenario: Callable[['Bench', ScenarioResult], None]) -> ScenarioResult:
+        result = ScenarioResult(name)
+        if self.trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            scenario(self, result)
+        finally:
+            result.elapsed = time.perf_counter() - start
+            if self.trace_memory:
+                result.peak_memory = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+        return result
+
+
+# --- 场景 ---
+
+def scenario_apply_burst(bench: Bench, result: ScenarioResult):
+    rng = random.Random(1)
+    photo = fixtures.photo_upload_bytes()
+    attachment = fixtures.attachment_bytes(rng, 128 * 1024)
+    clients = [(uid, bench.client(uid)) for uid in bench.dataset.burst_uids]
+
+    def apply(item):
+        uid, client = item
+        data = {
+            'recruit_id': bench.dataset.recruit_id,
+            'first_choice': fixtures.POSITIONS[hash(uid) % len(fixtures.POSITIONS)],
+            'self_intro': fixtures.paragraph(random.Random(uid), 6),
+            'skills': '熟悉 C++、Python，参加过 RoboMaster 校内赛。',
+            'projects': fixtures.paragraph(random.Random(uid + 'p'), 8),
+            'awards': '校级二等奖',
+            'grade_point': '3.60',
+            'grade_rank': '20/200',
+            'real_head_img': (io.BytesIO(photo), 'photo.jpg'),
+            'additional_file': (io.BytesIO(attachment), 'resume.txt'),
+        }
+        return bench.request(client, 'POST', '/recruit/apply', data=data, content_type='multipart/form-data')
+
+    result.samples = bench.concurrent(apply, clients)
+    result.checks['applied'] = sum(1 for sample in result.samples if sample.status == 200)
+
+
+def scenario_admin_list(bench: Bench, result: ScenarioResult):
+    client = bench.client(bench.dataset.admin_uid)
+    for _ in range(bench.repeat):
+        result.samples.append(bench.request(client, 'GET', '/resume/admin/list'))
+        result.samples.append(bench.request(client, 'GET', '/admin/user/list'))
+
+
+def scenario_booking_race(bench: Bench, result: ScenarioResult):
+    from utils import SQL
+
+    schedule_ids = bench.dataset.race_schedule_ids
+    rng = random.Random(2)
+    # 每个用户先随机选一个时间段，被抢后改选下一个，直到成功或时间段用尽
+    attempts = [(uid, submit_id, bench.client(uid), rng.sample(schedule_ids, len(schedule_ids)))
+                for uid, submit_id in bench.dataset.race_applicants]
+
+    def book(item):
+        uid, submit_id, client, choices = item
+        samples = []
+        for schedule_id in choices:
+            sample = bench.request(client, 'POST', '/interview/schedule/book', json={'schedule_id': schedule_id, 'submit_id': submit_id})
+            samples.append(sample)
+            if sample.status != 409:
+                break
+        return samples
+
+    for samples in bench.concurrent(book, attempts):
+        result.samples.extend(samples)
+
+    submit_ids = [submit_id for _, submit_id in bench.dataset.race_applicants]
+    placeholders = ','.join(['%s'] * len(schedule_ids))
+    with SQL() as sql:
+        booked_slots = sql.execute_query(
+            f"SELECT COUNT(*) AS n FROM interview_schedule WHERE already_booked = 1 AND schedule_id IN ({placeholders})", schedule_ids)[0]['n']
+        interviews = sql.execute_query(
+            f"SELECT COUNT(*) AS n FROM interview_info WHERE submit_id IN ({','.join(['%s'] * len(submit_ids))})", submit_ids)[0]['n']
+    booked = sum(1 for sample in result.samples if sample.status == 200)
+    result.checks.update({
+        'booked': booked,
+        'conflicts': sum(1 for sample in result.samples if sample.status == 409),
+        # 成功响应数、被占用的时间段数和面试记录数必须一致，否则存在重复预约
+        'consistent': booked == booked_slots == interviews == min(len(schedule_ids), len(submit_ids)),
+    })
+
+
+def scenario_bulk_status(bench: Bench, result: ScenarioResult):
+    client = bench.client(bench.dataset.admin_uid)
+    submit_ids = bench.dataset.pending_submit_ids
+    # 在“简历未通过”与“未处理”之间来回切换，每次都会真正改变全部简历的状态
+    for i in range(bench.repeat):
+        new_status = 2 if i % 2 == 0 else 0
+        result.samples.append(bench.request(client, 'POST', '/resume/admin/batch/update_status',
+                                            json={'submit_ids': submit_ids, 'new_status': new_status}))
+    result.checks['submit_ids'] = len(submit_ids)
+
+
+def scenario_notify(bench: Bench, result: ScenarioResult):
+    from utils import SQL, OutboxWorker
+    from utils.notification import NOTIFICATION_HANDLERS
+
+    sink = bench.smtp_sink
+    sent_before = sink.messages
+    # 失败的任务会被推迟重试（retry_base_delay 设得很长），不再计入待投递任务
+    pending_query = ("SELECT COUNT(*) AS n FROM notification_outbox "
+                     "WHERE status = 'sending' OR (status = 'pending' AND next_attempt_time <= NOW())")
+
+    worker = OutboxWorker(NOTIFICATION_HANDLERS, concurrency=8, batch_size=50, poll_interval=0.05,
+                          retry_base_delay=3600)
+    counter = [0]
+
+    def count_remaining():
+        # 轮询剩余任务数的查询不计入
+        token = _query_counter.set(None)
+        try:
+            with SQL() as sql:
+                return sql.execute_query(pending_query)[0]['n']
+        finally:
+            _query_counter.reset(token)
+
+    jobs = count_remaining()
+
+    async def drain():
+        _query_counter.set(counter)
+        task = asyncio.create_task(worker.run())
+        while True:
+            await asyncio.sleep(0.05)
+            if not await asyncio.to_thread(count_remaining):
+                break
+        worker.stop()
+        await task
+
+    asyncio.run(drain())
+    with SQL() as sql:
+        failed = sql.execute_query("SELECT COUNT(*) AS n FROM notification_outbox WHERE status <> 'sent' AND last_error IS NOT NULL")[0]['n']
+    result.operations = jobs
+    result.total_queries = counter[0]
+    result.checks.update({'mails': sink.messages - sent_before, 'failed_jobs': failed})
+
+
+SCENARIOS: Dict[str, Callable[[Bench, ScenarioResult], None]] = {
+    'apply_burst': scenario_apply_burst,
+    'admin_list': scenario_admin_list,
+    'booking_race': scenario_booking_race,
+    'bulk_status': scenario_bulk_status,
+    'notify': scenario_notify,
+}
+
+
+# --- 基线 ---
+
+# 参与回归判断的指标：延迟和内存按相对容差，查询数增加即视为回归
+RELATIVE_METRICS = ['p50_ms', 'p95_ms', 'peak_memory_kb']
+EXACT_METRICS = ['queries_per_request']
+
+
+def compare(current: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    """返回回归项的描述列表。"""
+    regressions = []
+    for name, summary in current.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for metric in RELATIVE_METRICS:
+            if metric in summary and base.get(metric):
+                if summary[metric] > base[metric] * (1 + tolerance):
+                    regressions.append(f"{name}.{metric}: {base[metric]} -> {summary[metric]} (+{(summary[metric] / base[metric] - 1) * 100:.0f}%)")
+        for metric in EXACT_METRICS:
+            if metric in summary and metric in base and summary[metric] > base[metric] + 0.01:
+                regressions.append(f"{name}.{metric}: {base[metric]} -> {summary[metric]}")
+        for check in ('consistent',):
+            if check in summary and summary[check] is False:
+                regressions.append(f"{name}.{check}: False")
+    return regressions
+
+
+def _print_summary(name: str, summary: dict):
+    latency = ''
+    if 'p50_ms' in summary:
+        latency = f"p50={summary['p50_ms']}ms p95={summary['p95_ms']}ms p99={summary['p99_ms']}ms max={summary['max_ms']}ms  "
+    memory = f"peak_mem={summary['peak_memory_kb']}KB  " if 'peak_memory_kb' in summary else ''
+    print(f"{name:<13} n={summary['operations']:<5} {summary['throughput']:>7}/s  {latency}"
+          f"queries/req={summary['queries_per_request']}  {memory}statuses={summary['statuses']}")
+    extra = {key: value for key, value in summary.items() if key not in (
+        'operations', 'elapsed_s', 'throughput', 'queries_per_request', 'errors', 'statuses', 'p50_ms', 'p95_ms',
+        'p99_ms', 'max_ms', 'mean_ms', 'peak_memory_kb')}
+    if extra or summary['errors']:
+        print(f"{'':<13} errors={summary['errors']} {extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reset', action='store_true', help='清空目标库中的相关数据表后重新生成数据')
+    parser.add_argument('--users', type=int, default=400, help='普通用户数')
+    parser.add_argument('--burst-users', type=int, default=50, help='apply_burst 场景的投递人数')
+    parser.add_argument('--race-users', type=int, default=60, help='booking_race 场景的参与人数')
+    parser.add_argument('--race-slots', type=int, default=20, help='booking_race 场景的时间段数')
+    parser.add_argument('--concurrency', type=int, default=16, help='并发场景的线程数')
+    parser.add_argument('--repeat', type=int, default=10, help='admin_list、bulk_status 场景的重复次数')
+    parser.add_argument('--scenarios', default=','.join(DEFAULT_SCENARIOS), help='逗号分隔的场景列表')
+    parser.add_argument('--thread-event-loop', action='store_true', help='异步视图使用线程常驻事件循环（同 server.thread_event_loop）')
+    parser.add_argument('--no-tracemalloc', action='store_true', help='不统计峰值内存（tracemalloc 会使延迟升高）')
+    parser.add_argument('--smtp-latency', type=float, default=0.0, help='SMTP 收信桩每封邮件的模拟延迟（秒）')
+    parser.add_argument('--save-baseline', metavar='PATH', help='把本次结果保存为基线')
+    parser.add_argument('--baseline', metavar='PATH', help='与基线比较，存在回归时以状态码 1 退出')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='延迟和内存的允许增幅（比例）')
+    parser.add_argument('--json', metavar='PATH', help='把本次结果写入 JSON 文件')
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"未知场景: {', '.join(unknown)}")
+
+    import utils
+    from core import create_app
+    from core.global_params import mail_pool
+    from core.schema import sync_schema
+
+    app = create_app()
+    if args.thread_event_loop:
+        utils.use_thread_event_loops(app)
+
+    sync_schema()
+    with utils.SQL() as sql:
+        if args.reset:
+            fixtures.reset_tables(sql)
+        elif fixtures.count_users(sql):
+            sys.exit("目标数据库中已有用户数据。请确认 config/database.json 指向基准测试专用的数据库后使用 --reset。")
+
+    # 邮件发往本地收信桩，并取消发送限速
+    sink = SmtpSink(latency=args.smtp_latency)
+    mail_pool.host, mail_pool.port, mail_pool.use_tls = '127.0.0.1', sink.start(), False
+    mail_pool.rate_limiter = utils.TokenBucket(None)
+    mail_pool.connection_rate_limit = None
+
+    print(f"generating fixtures: users={args.users} ...")
+    start = time.perf_counter()
+    dataset = fixtures.generate(users=args.users, burst_users=args.burst_users, race_users=args.race_users,
+                                race_slots=args.race_slots)
+    print(f"fixtures: users={dataset.users} resumes={dataset.resumes} in {time.perf_counter() - start:.1f}s")
+
+    install_query_counter()
+    bench = Bench(app, dataset, sink, args.concurrency, args.repeat, trace_memory=not args.no_tracemalloc)
+
+    summaries = {}
+    for name in scenarios:
+        summaries[name] = bench.run(name, SCENARIOS[name]).summary()
+        _print_summary(name, summaries[name])
+
+    report = {
+        'meta': {
+            'users': args.users, 'burst_users': args.burst_users, 'race_users': args.race_users,
+            'race_slots': args.race_slots, 'concurrency': args.concurrency, 'repeat': args.repeat,
+            'thread_event_loop': args.thread_event_loop, 'tracemalloc': not args.no_tracemalloc,
+            'python': platform.python_version(), 'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+        },
+        'scenarios': summaries,
+    }
+    for path in filter(None, [args.json, args.save_baseline]):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"results written to {path}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        differing = {key: (baseline['meta'].get(key), value) for key, value in report['meta'].items()
+                     if key not in ('time', 'python') and baseline['meta'].get(key) != value}
+        if differing:
+            print(f"warning: parameters differ from baseline: {differing}")
+        regressions = compare(summaries, baseline['scenarios'], args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.baseline}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nno regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+"""
+短信客户端基准测试：在本地启动一个模拟短信宝接口 (/sms, /query) 的 HTTP 桩服务，
+对比同步 SmsBao 逐条发送与 AsyncSmsBao.send_many 批量发送的耗时。
+
+用法: python -m benchmarks.bench_sms [--count 200] [--latency 0.05] [--concurrency 10]
+"""
+
+import argparse
+import asyncio
+import threading
+import time
+
+from aiohttp import web
+
+from benchmarks.common import import_isolated
+
+sms = import_isolated('utils.sms')
+
+
+def start_stub_server(latency: float, port: int) -> str:
+    """在后台线程中启动短信宝桩服务，返回其 base url。"""
+    stats = {'requests': 0}
+
+    async def handle_sms(request):
+        stats['requests'] += 1
+        await asyncio.sleep(latency)
+        return web.Response(text='0')
+
+    async def handle_query(request):
+        await asyncio.sleep(latency)
+        return web.Response(text='0\nbench\n9999')
+
+    app = web.Application()
+    app.router.add_get('/sms', handle_sms)
+    app.router.add_get('/query', handle_query)
+
+    ready = threading.Event()
+
+    def _run():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        runner = web.AppRunner(app)
+        loop.run_until_complete(runner.setup())
+        loop.run_until_complete(web.TCPSite(runner, '127.0.0.1', port).start())
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=_run, daemon=True).start()
+    ready.wait()
+    return f'http://127.0.0.1:{port}'
+
+
+def bench_sync(base_url: str, messages):
+    client = sms.SmsBao('bench', 'bench', api_base_url=base_url)
+    start = time.perf_counter()
+    results = [client.send(mobile, content) for mobile, content in messages]
+    return time.perf_counter() - start, results
+
+
+def bench_async(base_url: str, messages, concurrency: int):
+    client = sms.AsyncSmsBao('bench', 'bench', max_concurrency=concurrency, api_base_url=base_url)
+
+    async def _run():
+        # 先发送一条预热连接，不计入耗时
+        await client.send(*messages[0])
+        start = time.perf_counter()
+        results = await client.send_many(messages)
+        return time.perf_counter() - start, results
+
+    elapsed, results = asyncio.run(_run())
+    client.close()
+    return elapsed, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=200, help='发送的短信条数')
+    parser.add_argument('--latency', type=float, default=0.05, help='桩服务每个请求的模拟延迟（秒）')
+    parser.add_argument('--concurrency', type=int, default=10, help='AsyncSmsBao 的并发上限')
+    parser.add_argument('--port', type=int, default=18080)
+    args = parser.parse_args()
+
+    base_url = start_stub_server(args.latency, args.port)
+    messages = [(f'1380000{i:04d}', f'【TDT创新实验室】基准测试短信 {i}') for i in range(args.count)]
+
+    sync_elapsed, sync_results = bench_sync(base_url, messages)
+    async_elapsed, async_results = bench_async(base_url, messages, args.concurrency)
+
+    print(f"messages={args.count} latency={args.latency}s concurrency={args.concurrency}")
+    print(f"SmsBao (sync, sequential): {sync_elapsed:.3f}s  {args.count / sync_elapsed:.1f} msg/s  ok={sum(r[0] for r in sync_results)}")
+    print(f"AsyncSmsBao.send_many:     {async_elapsed:.3f}s  {args.count / async_elapsed:.1f} msg/s  ok={sum(r[0] for r in async_results)}")
+
+
+if __name__ == '__main__':
+    main()
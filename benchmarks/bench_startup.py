@@ -0,0 +1,81 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+"""
+启动耗时基准测试：在全新的 Python 进程中导入应用入口（默认 wsgi），多次运行后输出导入耗时与进程总耗时。
+需要在部署目录（含 config/）中运行。--importtime 额外列出累计耗时最多的模块（python -X importtime）。
+
+用法: python -m benchmarks.bench_startup [--runs 5] [--module wsgi] [--importtime]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.common import REPO_ROOT
+
+_IMPORT_SNIPPET = (
+    "import time; _start = time.perf_counter(); import {module}; "
+    "print(time.perf_counter() - _start)"
+)
+
+
+def _env():
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [REPO_ROOT, env.get('PYTHONPATH')]))
+    return env
+
+
+def measure(module: str):
+    """返回 (导入耗时, 进程总耗时)，单位秒。"""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', _IMPORT_SNIPPET.format(module=module)],
+                            capture_output=True, text=True, env=_env())
+    total = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"导入 {module} 失败:\n{result.stderr}")
+    return float(result.stdout.strip().splitlines()[-1]), total
+
+
+def top_imports(module: str, limit: int):
+    """python -X importtime 中累计耗时最多的模块，返回 [(累计微秒, 模块名)]。"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            capture_output=True, text=True, env=_env())
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        parts = [part.strip() for part in line[len('import time:'):].split('|')]
+        if parts[1].isdigit():
+            rows.append((int(parts[1]), parts[2]))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='运行次数')
+    parser.add_argument('--module', default='wsgi', help='导入的入口模块')
+    parser.add_argument('--importtime', action='store_true', help='列出累计导入耗时最多的模块')
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    # 第一次运行会编译字节码、预热文件缓存，不计入结果
+    measure(args.module)
+    samples = [measure(args.module) for _ in range(args.runs)]
+    imports = [sample[0] for sample in samples]
+    totals = [sample[1] for sample in samples]
+
+    print(f"module={args.module} runs={args.runs}")
+    print(f"import: median={statistics.median(imports) * 1000:.1f}ms  min={min(imports) * 1000:.1f}ms  max={max(imports) * 1000:.1f}ms")
+    print(f"process: median={statistics.median(totals) * 1000:.1f}ms  min={min(totals) * 1000:.1f}ms  max={max(totals) * 1000:.1f}ms")
+
+    if args.importtime:
+        print(f"\ntop {args.top} cumulative imports:")
+        for micros, name in top_imports(args.module, args.top):
+            print(f"  {micros / 1000:8.1f}ms  {name}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,22 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+import importlib
+import os
+import sys
+import types
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_isolated(module_name: str):
+    """
+    导入 utils 包中的单个子模块，而不执行 utils/__init__.py。
+    utils 包在导入时会连带初始化数据库、Redis 等全局对象，微基准测试只需要被测的模块本身。
+    """
+    package_name = module_name.split('.')[0]
+    if package_name not in sys.modules:
+        package = types.ModuleType(package_name)
+        package.__path__ = [os.path.join(REPO_ROOT, package_name)]
+        sys.modules[package_name] = package
+    return importlib.import_module(module_name)
@@ -0,0 +1,221 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+"""
+基准测试用的合成数据：用户（user/userinfo/userpermission）、招聘、带正文和附件的简历、评审、面试教室和时间段。
+数据直接写入当前配置（config/database.json）指向的数据库，必须在专用于基准测试的部署目录中使用。
+"""
+
+import asyncio
+import datetime
+import io
+import random
+import uuid
+from dataclasses import dataclass, field
+from typing import List, Tuple
+
+# 合成数据涉及的所有表，reset_tables() 会清空它们
+FIXTURE_TABLES = [
+    'user', 'userinfo', 'useravatar', 'userpermission', 'userphone', 'recruit',
+    'resume_submit', 'resume_info', 'resume_review', 'resume_user_real_head_img',
+    'interview_info', 'interview_room', 'interview_schedule', 'interview_review', 'recruit_interview_settings',
+    'notification_outbox', 'blob_ref',
+]
+
+POSITIONS = ['算法组', '电控组', '机械组', '运营组']
+DEPARTMENTS = ['机电工程学院', '计算机学院', '自动化学院', '材料学院', '经济管理学院']
+SURNAMES = '王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗'
+GIVEN_NAMES = '伟芳娜敏静丽强磊军洋勇艳杰涛明超秀霞平刚'
+
+RESUME_PENDING_STATUS = 0
+RESUME_PASSED_STATUS = 1
+
+
+@dataclass
+class Dataset:
+    """生成的数据中各场景需要用到的 ID。"""
+    admin_uid: str = ''
+    recruit_id: str = ''
+    # 尚未投递当前招聘的用户，供投递场景使用
+    burst_uids: List[str] = field(default_factory=list)
+    # 简历已通过、等待预约面试的 (uid, submit_id)，供抢占时间段场景使用
+    race_applicants: List[Tuple[str, str]] = field(default_factory=list)
+    race_schedule_ids: List[str] = field(default_factory=list)
+    # 当前招聘中未处理的简历，供批量修改状态场景使用
+    pending_submit_ids: List[str] = field(default_factory=list)
+    users: int = 0
+    resumes: int = 0
+
+
+def paragraph(rng: random.Random, sentences: int) -> str:
+    words = ['机器人', '视觉', '控制', '嵌入式', '算法', '竞赛', '项目', '实验室', '团队', '设计', '调试', '优化',
+             'ROS', 'C++', 'Python', 'STM32', 'OpenCV', '深度学习', '路径规划', '电路', '建模', '仿真']
+    return '。'.join(''.join(rng.choice(words) for _ in range(rng.randint(6, 14))) for _ in range(sentences)) + '。'
+
+
+def _photo_bytes(rng: random.Random) -> bytes:
+    from PIL import Image
+    buffer = io.BytesIO()
+    color = tuple(rng.randint(0, 255) for _ in range(3))
+    Image.new('RGB', (480, 640), color).save(buffer, 'JPEG', quality=85)
+    return buffer.getvalue()
+
+
+def photo_upload_bytes(seed: int = 0) -> bytes:
+    """投递场景上传的正面照（JPEG）。"""
+    return _photo_bytes(random.Random(seed))
+
+
+def attachment_bytes(rng: random.Random, size: int = 64 * 1024) -> bytes:
+    """投递场景上传的附件（纯文本，约 size 字节）。"""
+    text = paragraph(rng, 8)
+    data = (text * (size // len(text.encode('utf-8')) + 1)).encode('utf-8')
+    return data[:size]
+
+
+def reset_tables(sql):
+    """清空 FIXTURE_TABLES 中的所有表。"""
+    for table in FIXTURE_TABLES:
+        sql.execute_update(f"TRUNCATE TABLE `{table}`")
+
+
+def count_users(sql) -> int:
+    return sql.execute_query("SELECT COUNT(*) AS n FROM `user`")[0]['n']
+
+
+def _store_files(rng: random.Random, distinct_photos: int, distinct_attachments: int):
+    """生成若干不同的正面照和附件保存到 BlobStore，返回 ([(hash, path)], [(hash, path)])。"""
+    from core.global_params import blob_store, image_processor
+
+    async def store_photos():
+        return [await blob_store.store_image(_photo_bytes(rng), image_processor, 'photo') for _ in range(distinct_photos)]
+
+    photos = asyncio.run(store_photos())
+    attachments = [blob_store.store_bytes(attachment_bytes(rng, rng.randint(16, 256) * 1024)) for _ in range(distinct_attachments)]
+    return photos, attachments
+
+
+def generate(users: int = 400, resume_ratio: float = 0.7, burst_users: int = 50, race_users: int = 60,
+             race_slots: int = 20, rooms: int = 4, slots_per_room: int = 20, seed: int = 2025) -> Dataset:
+    """
+    生成一套合成数据并返回 Dataset。数据库中的表需已通过 sync_schema() 创建。
+
+    :param users: 普通用户数（另有 3 名管理员）
+    :param resume_ratio: 向当前招聘投递过简历的用户比例（不含 burst_users），另有一半用户投递过往届招聘
+    :param burst_users: 保留的、尚未投递当前招聘的用户数
+    :param race_users: 简历已通过、参与抢占面试时间段的用户数
+    :param race_slots: 抢占场景中可预约的时间段数
+    :param rooms: 普通面试教室数
+    :param slots_per_room: 每个普通教室的时间段数
+    """
+    from utils import SQL
+
+    rng = random.Random(seed)
+    now = datetime.datetime.now().replace(microsecond=0)
+    dataset = Dataset()
+    photos, attachments = _store_files(rng, distinct_photos=8, distinct_attachments=16)
+    blob_refs = {}
+
+    with SQL() as sql:
+        # --- 用户 ---
+        uids = []
+        for i in range(users + 3):
+            uid = str(uuid.uuid4())
+            uids.append(uid)
+            realname = rng.choice(SURNAMES) + ''.join(rng.choice(GIVEN_NAMES) for _ in range(rng.randint(1, 2)))
+            sql.insert('user', {'uid': uid, 'mail': f'bench{i}@example.com', 'pwd': None})
+            sql.insert('userinfo', {
+                'uid': uid, 'nickname': f'bench_{i}', 'gender': rng.choice(['男', '女']), 'realname': realname,
+                'registration_time': now - datetime.timedelta(days=rng.randint(0, 400)),
+                'student_id': f'2024{i:06d}', 'department': rng.choice(DEPARTMENTS), 'major': '工科试验班',
+                'grade': rng.choice(['大一', '大二', '大三']), 'rank': ''
+            })
+            is_admin = i < 3
+            sql.insert('userpermission', {
+                'uid': uid, 'is_main_leader_admin': i == 0, 'is_group_leader_admin': False,
+                'is_member_admin': is_admin and i > 0, 'is_banned': False, 'ban_reason': ''
+            })
+        dataset.admin_uid = uids[0]
+        admins, members = uids[:3], uids[3:]
+        dataset.users = len(uids)
+
+        # --- 招聘：一期进行中，一期已结束 ---
+        recruit_id = str(uuid.uuid4())
+        past_recruit_id = str(uuid.uuid4())
+        sql.insert('recruit', {'recruit_id': recruit_id, 'name': '基准测试招新', 'start_time': now - datetime.timedelta(days=1),
+                               'end_time': now + datetime.timedelta(days=30), 'description': paragraph(rng, 5), 'is_active': True})
+        sql.insert('recruit', {'recruit_id': past_recruit_id, 'name': '往届招新', 'start_time': now - datetime.timedelta(days=400),
+                               'end_time': now - datetime.timedelta(days=300), 'description': paragraph(rng, 5), 'is_active': False})
+        sql.insert('recruit_interview_settings', {'recruit_id': recruit_id, 'book_start_time': now - datetime.timedelta(days=1),
+                                                  'book_end_time': now + datetime.timedelta(days=30)})
+        dataset.recruit_id = recruit_id
+
+        # --- 简历 ---
+        rng.shuffle(members)
+        dataset.burst_uids = members[:burst_users]
+        race_uids = members[burst_users:burst_users + race_users]
+        others = members[burst_users + race_users:]
+        current_applicants = race_uids + others[:int(len(others) * resume_ratio)]
+        past_applicants = rng.sample(members, len(members) // 2)
+
+        def add_resume(uid, rid, status, submit_time):
+            submit_id = str(uuid.uuid4())
+            photo_hash, photo_path = rng.choice(photos)
+            sql.insert('resume_submit', {'submit_id': submit_id, 'uid': uid, 'recruit_id': rid, 'submit_time': submit_time, 'status': status})
+            info = {
+                'submit_id': submit_id, 'first_choice': rng.choice(POSITIONS), 'second_choice': '',
+                'self_intro': paragraph(rng, rng.randint(3, 8)), 'skills': paragraph(rng, rng.randint(2, 5)),
+                'projects': paragraph(rng, rng.randint(3, 10)), 'awards': paragraph(rng, rng.randint(1, 4)),
+                'grade_point': f'{rng.uniform(2.5, 4.0):.2f}', 'grade_rank': f'{rng.randint(1, 200)}/200',
+                'additional_file_path': '', 'additional_file_name': '', 'additional_file_hash': None
+            }
+            if rng.random() < 0.6:
+                attachment_hash, attachment_path = rng.choice(attachments)
+                info.update(additional_file_path=attachment_path, additional_file_name='简历附件.txt', additional_file_hash=attachment_hash)
+                blob_refs[attachment_hash] = blob_refs.get(attachment_hash, 0) + 1
+            sql.insert('resume_info', info)
+            sql.insert('resume_user_real_head_img', {'submit_id': submit_id, 'real_head_img_path': photo_path, 'real_head_img_hash': photo_hash})
+            blob_refs[photo_hash] = blob_refs.get(photo_hash, 0) + 1
+            for _ in range(rng.randint(0, 2)):
+                sql.insert('resume_review', {
+                    'review_id': str(uuid.uuid4()), 'submit_id': submit_id, 'reviewer_uid': rng.choice(admins),
+                    'review_time': submit_time + datetime.timedelta(hours=rng.randint(1, 48)),
+                    'comments': paragraph(rng, 2), 'score': rng.randint(40, 100), 'passed': rng.random() < 0.5
+                })
+            return submit_id
+
+        for uid in current_applicants:
+            status = RESUME_PASSED_STATUS if uid in race_uids else RESUME_PENDING_STATUS
+            submit_id = add_resume(uid, recruit_id, status, now - datetime.timedelta(minutes=rng.randint(1, 1440)))
+            if uid in race_uids:
+                dataset.race_applicants.append((uid, submit_id))
+            else:
+                dataset.pending_submit_ids.append(submit_id)
+        for uid in past_applicants:
+            add_resume(uid, past_recruit_id, rng.choice([2, 4, 5, 6]), now - datetime.timedelta(days=rng.randint(300, 400)))
+        dataset.resumes = len(current_applicants) + len(past_applicants)
+
+        # 合成数据直接引用已保存的文件，引用计数与实际引用数保持一致
+        for blob_hash in {blob_hash for blob_hash, _ in photos + attachments}:
+            sql.execute_update("UPDATE `blob_ref` SET `refcount` = %s WHERE `hash` = %s", (blob_refs.get(blob_hash, 0), blob_hash))
+
+        # --- 面试教室和时间段 ---
+        def add_room(name, slots):
+            room_id = str(uuid.uuid4())
+            sql.insert('interview_room', {'room_id': room_id, 'room_name': name, 'location': f'实验楼 {rng.randint(101, 520)}',
+                                          'recruit_id': recruit_id, 'applicable_to_choice': ''})
+            schedule_ids = []
+            start = (now + datetime.timedelta(days=2)).replace(hour=9, minute=0, second=0)
+            for j in range(slots):
+                schedule_id = str(uuid.uuid4())
+                slot_start = start + datetime.timedelta(minutes=20 * j)
+                sql.insert('interview_schedule', {'schedule_id': schedule_id, 'room_id': room_id, 'start_time': slot_start,
+                                                  'end_time': slot_start + datetime.timedelta(minutes=20),
+                                                  'already_booked': False, 'booked_interview_id': None})
+                schedule_ids.append(schedule_id)
+            return schedule_ids
+
+        for k in range(rooms):
+            add_room(f'面试室 {k + 1}', slots_per_room)
+        dataset.race_schedule_ids = add_room('抢占测试教室', race_slots)
+
+    return dataset
@@ -0,0 +1,99 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+"""
+QQ 开放平台桩服务：实现 /oauth2.0/token、/oauth2.0/me、/user/get_user_info 和头像下载 (/avatar/<openid>)，
+头像响应带 ETag 并支持 If-None-Match。将 config/oauth.json 中的 qq_api_base_url 指向它即可在本地走通 QQ 登录。
+
+用法: python -m benchmarks.qq_stub [--port 8090] [--latency 0.05]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import io
+import threading
+
+from aiohttp import web
+
+
+def _avatar_bytes() -> bytes:
+    try:
+        from PIL import Image
+    except ImportError:
+        return b'\xff\xd8\xff\xd9'
+    buffer = io.BytesIO()
+    Image.new('RGB', (100, 100), (30, 144, 255)).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+def build_app(latency: float = 0.0, stats: dict = None) -> web.Application:
+    stats = stats if stats is not None else {}
+    avatar = _avatar_bytes()
+    avatar_etag = '"' + hashlib.sha256(avatar).hexdigest()[:16] + '"'
+
+    def count(name):
+        stats[name] = stats.get(name, 0) + 1
+
+    async def token(request):
+        count('token')
+        await asyncio.sleep(latency)
+        return web.Response(text=f"access_token=stub-{request.query.get('code', '')}&expires_in=7776000&refresh_token=stub")
+
+    async def me(request):
+        count('me')
+        await asyncio.sleep(latency)
+        openid = 'openid-' + request.query.get('access_token', '')
+        return web.Response(text=f'callback( {{"client_id":"stub","openid":"{openid}"}} );')
+
+    async def user_info(request):
+        count('user_info')
+        await asyncio.sleep(latency)
+        base = f'{request.scheme}://{request.host}'
+        return web.json_response({
+            'ret': 0,
+            'nickname': 'stub-user',
+            'gender': '男',
+            'figureurl_qq': f"{base}/avatar/{request.query.get('openid', '')}",
+        })
+
+    async def avatar_handler(request):
+        if request.headers.get('If-None-Match') == avatar_etag:
+            count('avatar_304')
+            return web.Response(status=304, headers={'ETag': avatar_etag})
+        count('avatar_200')
+        await asyncio.sleep(latency)
+        return web.Response(body=avatar, content_type='image/jpeg', headers={'ETag': avatar_etag})
+
+    app = web.Application()
+    app.router.add_get('/oauth2.0/token', token)
+    app.router.add_get('/oauth2.0/me', me)
+    app.router.add_get('/user/get_user_info', user_info)
+    app.router.add_get('/avatar/{openid}', avatar_handler)
+    return app
+
+
+def start_stub_server(port: int, latency: float = 0.0, stats: dict = None) -> str:
+    """在后台线程中启动桩服务，返回其 base url。"""
+    app = build_app(latency, stats)
+    ready = threading.Event()
+
+    def _run():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        runner = web.AppRunner(app)
+        loop.run_until_complete(runner.setup())
+        loop.run_until_complete(web.TCPSite(runner, '127.0.0.1', port).start())
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=_run, daemon=True).start()
+    ready.wait()
+    return f'http://127.0.0.1:{port}'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='QQ 开放平台桩服务')
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--latency', type=float, default=0.05, help='每个请求的模拟延迟（秒）')
+    args = parser.parse_args()
+    web.run_app(build_app(args.latency), host='127.0.0.1', port=args.port)
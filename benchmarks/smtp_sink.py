@@ -0,0 +1,128 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+"""
+SMTP 收信桩：接受任意账号的 AUTH PLAIN/LOGIN，收下所有邮件后丢弃，只记录数量。
+不支持 TLS，连接池需使用 use_tls=False。可设置每封邮件的模拟处理延迟。
+
+用法: python -m benchmarks.smtp_sink [--port 2525] [--latency 0.01]
+"""
+
+import argparse
+import asyncio
+import threading
+
+
+class SmtpSink:
+    """在后台线程的事件循环中运行的最小 SMTP 服务器。"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.messages = 0
+        self.recipients = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    def _count(self, recipients: int):
+        with self._lock:
+            self.messages += 1
+            self.recipients += recipients
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        with self._lock:
+            self.connections += 1
+
+        async def reply(line: str):
+            writer.write(line.encode('ascii') + b'\r\n')
+            await writer.drain()
+
+        await reply('220 bench-sink ESMTP')
+        recipients = 0
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode('utf-8', errors='replace').strip()
+                verb = command.split(' ', 1)[0].upper()
+                if verb == 'EHLO':
+                    writer.write(b'250-bench-sink\r\n250-AUTH PLAIN LOGIN\r\n250-8BITMIME\r\n250 SIZE 52428800\r\n')
+                    await writer.drain()
+                elif verb == 'HELO':
+                    await reply('250 bench-sink')
+                elif verb == 'AUTH':
+                    parts = command.split()
+                    if len(parts) >= 2 and parts[1].upper() == 'LOGIN':
+                        # AUTH LOGIN 依次询问用户名、密码（可能已随命令给出用户名）
+                        if len(parts) < 3:
+                            await reply('334 VXNlcm5hbWU6')
+                            await reader.readline()
+                        await reply('334 UGFzc3dvcmQ6')
+                        await reader.readline()
+                    elif len(parts) < 3:
+                        await reply('334 ')
+                        await reader.readline()
+                    await reply('235 2.7.0 Authentication successful')
+                elif verb == 'MAIL':
+                    recipients = 0
+                    await reply('250 OK')
+                elif verb == 'RCPT':
+                    recipients += 1
+                    await reply('250 OK')
+                elif verb == 'DATA':
+                    await reply('354 End data with <CR><LF>.<CR><LF>')
+                    while True:
+                        data = await reader.readline()
+                        if not data or data in (b'.\r\n', b'.\n'):
+                            break
+                    if self.latency:
+                        await asyncio.sleep(self.latency)
+                    self._count(recipients)
+                    await reply('250 OK: queued')
+                elif verb in ('RSET', 'NOOP'):
+                    await reply('250 OK')
+                elif verb == 'QUIT':
+                    await reply('221 Bye')
+                    break
+                else:
+                    await reply('502 Command not implemented')
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def start(self) -> int:
+        """在后台线程中启动服务器，返回实际监听的端口。"""
+        ready = threading.Event()
+
+        def _run():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            server = loop.run_until_complete(asyncio.start_server(self._handle, self.host, self.port))
+            self.port = server.sockets[0].getsockname()[1]
+            ready.set()
+            loop.run_forever()
+
+        threading.Thread(target=_run, name='smtp-sink', daemon=True).start()
+        ready.wait()
+        return self.port
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=2525)
+    parser.add_argument('--latency', type=float, default=0.0, help='每封邮件的模拟处理延迟（秒）')
+    args = parser.parse_args()
+
+    sink = SmtpSink(port=args.port, latency=args.latency)
+    port = sink.start()
+    print(f"SMTP sink listening on 127.0.0.1:{port}, Ctrl+C to stop")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        print(f"\nmessages={sink.messages} recipients={sink.recipients} connections={sink.connections}")
+
+
+if __name__ == '__main__':
+    main()
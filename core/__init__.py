@@ -1 +1,5 @@
+# utils 必须先于 global_params 完成导入（utils.notification 反向依赖 core.global_params）
+import utils
+
 from .global_params import *
+from .app import create_app
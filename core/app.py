@@ -0,0 +1,22 @@
+from typing import Any, Dict, Optional
+
+from flask import Flask
+
+from .global_params import flask_app
+
+
+def create_app(config: Optional[Dict[str, Any]] = None) -> Flask:
+    """
+    返回注册了全部路由的 Flask 应用。
+
+    导入应用不会建立数据库或 Redis 连接，它们在第一次使用时才创建；
+    表结构同步也不在这里执行，需单独运行 python worker.py --sync-schema。
+
+    :param config: 覆盖 flask_app.config 的配置项，如 {'TESTING': True}
+    """
+    # 导入即通过 @flask_app.route 注册路由
+    import modules  # noqa: F401
+
+    if config:
+        flask_app.config.update(config)
+    return flask_app
@@ -1,12 +1,12 @@
 import utils
+import functools
 import json
-import asyncio
 from flask import Flask, jsonify
+from werkzeug.middleware.proxy_fix import ProxyFix
 import flask_cors
 import redis
 from datetime import timedelta
 import logging
-import re
 
 logger = logging.getLogger(__name__)
 
@@ -27,13 +27,15 @@ db_config = {
     'db': database_config['sql']['sql_database_name'],
     'charset': 'utf8mb4'
 }
-utils.DatabaseManager.initialize_pool(**db_config)
+# 连接池和 Redis 连接都在第一次使用时建立，导入本模块不访问网络
+utils.DatabaseManager.configure(**db_config)
 
 redis_client = utils.RedisClient(
     host=database_config['redis']['redis_host'], 
     port=database_config['redis']['redis_port'], 
     db=database_config['redis']['redis_db'], 
-    password=database_config['redis']['redis_password']
+    password=database_config['redis']['redis_password'],
+    lazy=True
 )
 
 mail_info = {
@@ -44,21 +46,114 @@ mail_info = {
     'use_tls': True
 }
 
+# 常驻后台事件循环，用于维护跨请求复用的长连接
+background_loop = utils.BackgroundLoop()
+
+# 应用级共享的 HTTP 客户端（keep-alive、DNS 缓存）
+http_config = global_config.get('http_client', {})
+http_client = utils.HttpClient(
+    background_loop=background_loop,
+    limit=http_config.get('limit', 100),
+    limit_per_host=http_config.get('limit_per_host', 10),
+    ttl_dns_cache=http_config.get('ttl_dns_cache', 300),
+    timeout=http_config.get('timeout', 10)
+)
+
+mail_pool = utils.MailerPool(
+    **mail_info,
+    background_loop=background_loop,
+    pool_size=mail_config.get('pool_size', 4),
+    idle_timeout=mail_config.get('idle_timeout', 60),
+    health_check_interval=mail_config.get('health_check_interval', 15),
+    rate_limit=mail_config.get('rate_limit'),
+    rate_burst=mail_config.get('rate_burst'),
+    connection_rate_limit=mail_config.get('connection_rate_limit'),
+    connection_rate_burst=mail_config.get('connection_rate_burst'),
+    throttle_backoff=mail_config.get('throttle_backoff', 30)
+)
+
+# 上传图片的解码、缩放和重新编码在独立进程池中进行
+image_processor = utils.ImageProcessor(max_workers=global_config.get('image_workers', 2))
+
+# 头像、正面照和附件的文件响应（ETag/304，可选交给 nginx 等前端服务器发送）
+file_response_config = global_config.get('file_response', {})
+file_sender = utils.FileSender(
+    mode=file_response_config.get('sendfile_mode') or None,
+    accel_prefix=file_response_config.get('accel_prefix', '/protected/'),
+    max_age=file_response_config.get('max_age', 300)
+)
+
+# 内容寻址的上传文件存储
+blob_store = utils.BlobStore(
+    root=global_config.get('blob_root', 'blobs'),
+    sweep_grace=global_config.get('blob_sweep_grace', 3600)
+)
+
 def cMailer():
-    return utils.Mailer(**mail_info)
+    return mail_pool.acquire()
 
 try:
     sms_config = json.load(open('config/sms.json'))
-    sms_client = utils.SmsBao(sms_config['username'], sms_config['password'])
+    sms_client = utils.AsyncSmsBao(
+        sms_config['username'],
+        sms_config['password'],
+        background_loop=background_loop,
+        max_concurrency=sms_config.get('max_concurrency', 5),
+        timeout=sms_config.get('timeout', 10),
+        api_base_url=sms_config.get('api_base_url'),
+        rate_limit=sms_config.get('rate_limit'),
+        rate_burst=sms_config.get('rate_burst')
+    )
 except (FileNotFoundError, KeyError):
     sms_client = None
     logger.warning("警告: 短信配置文件 'config/sms.json' 未找到或格式不正确，短信功能将不可用。")
 
 flask_app = Flask(__name__)
 flask_app.debug = False
+# 位于 nginx 等反向代理之后时，按配置的代理层数从 X-Forwarded-* 中取得真实的客户端地址（限流按 IP 计数依赖于此）
+proxy_config = global_config.get('proxy', {})
+if any(proxy_config.values()):
+    flask_app.wsgi_app = ProxyFix(flask_app.wsgi_app, x_for=proxy_config.get('x_for', 0), x_proto=proxy_config.get('x_proto', 0),
+                                  x_host=proxy_config.get('x_host', 0), x_prefix=proxy_config.get('x_prefix', 0))
+# orjson 序列化所有 JSON 响应，datetime 统一输出为 '%Y-%m-%d %H:%M:%S'
+flask_app.json = utils.FastJSONProvider(flask_app)
 flask_app.config['SECRET_KEY'] = global_config['secret_key']
 flask_app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=global_config.get('login_expire_days', 7))
+# 会话保存在 Redis 中，Cookie 只携带会话 ID；过期时间随请求滑动续期
+session_interface = utils.RedisSessionInterface(redis_client)
+flask_app.session_interface = session_interface
+
+# 基于 Redis 的分布式限流，多个 worker 共享计数
+rate_limiter = utils.RateLimiter(redis_client)
+
+# 密码哈希在独立线程池中计算，不阻塞请求的事件循环
+password_config = global_config.get('password_hash', {})
+password_hasher = utils.PasswordHasher(
+    method=password_config.get('method', 'scrypt'),
+    salt_length=password_config.get('salt_length', 16),
+    max_workers=password_config.get('max_workers')
+)
+
+# 一次性验证码（Redis 原生过期、尝试次数限制和发送冷却）
+verification_config = global_config.get('verification', {})
+mail_verification = utils.VerificationCodeService(
+    redis_client, 'mail',
+    ttl=verification_config.get('ttl', 600),
+    cooldown=verification_config.get('cooldown', 60),
+    max_attempts=verification_config.get('max_attempts', 5)
+)
+phone_verification = utils.VerificationCodeService(
+    redis_client, 'phone',
+    ttl=verification_config.get('ttl', 600),
+    cooldown=verification_config.get('cooldown', 60),
+    max_attempts=verification_config.get('max_attempts', 5),
+    alphabet='0123456789'
+)
 flask_app.config['MAX_CONTENT_LENGTH'] = global_config.get('max_content_length', 16 * 1024 * 1024)  # Default to 16MB
+# 上传文件边接收边写入存储目录下的临时文件，并计算哈希
+flask_app.request_class = utils.SpoolingRequest
+flask_app.config['UPLOAD_TMP_DIR'] = blob_store.tmp_dir
+flask_app.config['MAX_UPLOAD_FILE_SIZE'] = global_config.get('max_upload_file_size', flask_app.config['MAX_CONTENT_LENGTH'])
 
 @flask_app.errorhandler(413)
 def request_entity_too_large(error):
@@ -66,131 +161,46 @@ def request_entity_too_large(error):
 
 flask_cors.CORS(flask_app)
 
-async def check_data_base():
-    sql_tables = [
-        'user', 'userinfo', 'useravatar', 'userpermission', 'recruit', 'userphone', 'usermailverify',
-        'resume_submit', 'resume_info', 'resume_review', 'resume_status_names', 'resume_user_real_head_img',
-        'interview_info', 'interview_room', 'interview_schedule', 'interview_review', 'recruit_interview_settings'
-    ]
-    sql_params = {
-        # ... 您的 sql_params 字典保持不变 ...
-        "user": ("uid char(36) primary key", "openid_qq char(64)", "openid_wx char(64)", "mail char(64)", "pwd char(255)"),
-        "userinfo": ("uid char(36) primary key", "nickname char(64)", "gender char(10)", "realname char(64)", "registration_time datetime",
-                       "student_id char(20)", "department char(64)", "major char(64)", "grade char(10)", "rank char(10)"),
-        "useravatar": ("uid char(36) primary key", "avatar_path char(255)"),
-        "userpermission": ("uid char(36) primary key", "is_main_leader_admin bool", "is_group_leader_admin bool", "is_member_admin bool", "is_banned bool", "ban_reason char(255)"),
-        "userphone": ("uid char(36) primary key", "phone_number char(20)", "is_verified bool", "verification_code char(10)", "code_sent_time datetime"),
-        "usermailverify": ("mail char(64) primary key", "verification_code char(10)", "code_sent_time datetime"),
-        "recruit": ("recruit_id char(36) primary key", "name char(64)", "start_time datetime", "end_time datetime", "description text", "is_active bool"),
-        "resume_submit": ("submit_id char(64) primary key", "uid char(36)", "recruit_id char(36)", "submit_time datetime", "status int"),
-        "resume_info": ("submit_id char(64) primary key", "first_choice char(64)", "second_choice char(64)", "self_intro text", "skills text", "projects text", "awards text", "grade_point char(10)", "grade_rank char(10)", "additional_file_path text", "additional_file_name char(64)"),
-        "resume_review": ("review_id char(36) primary key", "submit_id char(64)", "reviewer_uid char(36)", "review_time datetime", "comments text", "score int", "passed bool"),
-        "resume_status_names": ("status_id int primary key", "status_name char(64)"),
-        "resume_user_real_head_img": ("submit_id char(64) primary key", "real_head_img_path char(255)"),
-        "interview_info": ("interview_id char(36) primary key", "submit_id char(64)", "interviewee_uid char(36)", "interview_time datetime", "location char(255)", "notes text"),
-        "interview_room": ("room_id char(36) primary key", "room_name char(64)","location char(255)", "recruit_id char(36)", "applicable_to_choice char(64)"),
-        "interview_schedule": ("schedule_id char(36) primary key", "room_id char(36)", "start_time datetime", "end_time datetime", "already_booked bool", "booked_interview_id char(36)"),
-        "interview_review": ("review_id char(36) primary key", "interview_id char(36)", "reviewer_uid char(36)", "review_time datetime", "comments text", "score int", "passed bool"),
-        "recruit_interview_settings": ("recruit_id char(36) primary key", "book_start_time datetime", "book_end_time datetime")
-    }
-
-    parsed_schema = {
-        table: {
-            definition.strip().split()[0].replace('`', ''): definition
-            for definition in definitions
-        }
-        for table, definitions in sql_params.items()
-    }
-
-    with utils.SQL() as sql:
-        db_name = db_config['db']
-        for table in sql_tables:
-            expected_columns = parsed_schema.get(table, {})
-            if not expected_columns:
-                logger.warning(f"Table '{table}' is defined in 'sql_tables' but not in 'sql_params'. Skipping.")
-                continue
-
-            table_exists_query = "SELECT TABLE_NAME FROM information_schema.TABLES WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s"
-            if not sql.execute_query(table_exists_query, (db_name, table)):
-                create_sql = f"CREATE TABLE `{table}` ({', '.join(expected_columns.values())})"
-                sql.execute_update(create_sql)
-                logger.info(f"Table '{table}' created.")
-                continue
-
-            # --- 表已存在，开始同步其结构 ---
-            existing_columns_info = {col['Field']: col for col in sql.execute_query(f"SHOW COLUMNS FROM `{table}`")}
-            existing_column_names = set(existing_columns_info.keys())
-            expected_column_names = set(expected_columns.keys())
-
-            # 添加缺失字段
-            for col_name in expected_column_names - existing_column_names:
-                add_sql = f"ALTER TABLE `{table}` ADD COLUMN {expected_columns[col_name]}"
-                sql.execute_update(add_sql)
-                logger.info(f"Table '{table}': Added column '{col_name}'.")
-
-            # 删除多余字段
-            for col_name in existing_column_names - expected_column_names:
-                drop_sql = f"ALTER TABLE `{table}` DROP COLUMN `{col_name}`"
-                sql.execute_update(drop_sql)
-                logger.warning(f"Table '{table}': Removed extra column '{col_name}'.")
-
-            # **【核心修复1】修改字段类型，但不处理主键**
-            for col_name in expected_column_names.intersection(existing_column_names):
-                full_def = expected_columns[col_name]
-                # 使用正则表达式移除 'primary key'，忽略大小写
-                def_without_pk = re.sub(r'\s+primary\s+key', '', full_def, flags=re.IGNORECASE)
-                modify_sql = f"ALTER TABLE `{table}` MODIFY COLUMN {def_without_pk}"
-                sql.execute_update(modify_sql)
-            logger.info(f"Table '{table}': Verified and aligned column types and lengths.")
-
-            # **【核心修复2】单独同步主键**
-            # 获取代码中预期的主键
-            expected_pk = sorted([
-                name for name, definition in expected_columns.items()
-                if 'primary key' in definition.lower()
-            ])
-            # 获取数据库中现有的主键
-            existing_pk_info = sql.execute_query(f"SHOW KEYS FROM `{table}` WHERE Key_name = 'PRIMARY'")
-            existing_pk = sorted([row['Column_name'] for row in existing_pk_info])
-
-            # 如果主键不一致，则更新
-            if expected_pk != existing_pk:
-                logger.info(f"Table '{table}': Primary key mismatch. Expected: {expected_pk}, Found: {existing_pk}. Updating...")
-                # 先删除旧的主键（如果存在）
-                if existing_pk:
-                    sql.execute_update(f"ALTER TABLE `{table}` DROP PRIMARY KEY")
-                # 再添加新的主键（如果需要）
-                if expected_pk:
-                    pk_columns_str = ', '.join([f"`{col}`" for col in expected_pk])
-                    sql.execute_update(f"ALTER TABLE `{table}` ADD PRIMARY KEY ({pk_columns_str})")
-                logger.info(f"Table '{table}': Primary key updated successfully.")
-
-
-    # 状态检查部分保持不变
-    status_list = ["未处理", "简历通过", "简历未通过", "等待面试", "面试未通过", "已录取", "未参加面试"]
-    with utils.SQL() as sql:
-        existing_status = sql.fetch_all('resume_status_names')
-        existing_status_ids = [item['status_id'] for item in existing_status] if existing_status else []
-        for idx, status in enumerate(status_list):
-            if idx not in existing_status_ids:
-                sql.insert('resume_status_names', {'status_id': idx, 'status_name': status})
-        if existing_status:
-            for item in existing_status:
-                if item['status_id'] < 0 or item['status_id'] >= len(status_list):
-                    sql.delete('resume_status_names', {'status_id': item['status_id']})
-                elif item['status_name'] != status_list[item['status_id']]:
-                    sql.update('resume_status_names', {'status_name': status_list[item['status_id']]}, {'status_id': item['status_id']})
-
-async def initialize():
-    await check_data_base()
-
-# 使用 asyncio.run() 来替代旧的 event loop 管理方式，更简洁健壮
-try:
-    asyncio.run(initialize())
-except RuntimeError:
-    # 如果事件循环已在运行（例如在某些环境中），则创建任务
-    loop = asyncio.get_event_loop()
-    loop.create_task(initialize())
-
-
-resume_submit_ip_time_history = {}
+# Prometheus 指标：按路由的请求数与耗时、数据库连接池、Redis、邮件短信发送和事件循环延迟，由 /metrics 导出。
+# 先于压缩注册，after_request 逆序执行，请求耗时包含压缩时间
+metrics_config = global_config.get('metrics', {})
+request_metrics = utils.RequestMetrics()
+if metrics_config.get('enabled', True):
+    request_metrics.init_app(flask_app)
+    background_loop.on_start(functools.partial(
+        utils.watch_loop_lag, name='background', interval=metrics_config.get('loop_lag_interval', 1)
+    ))
+
+# 可选：检测异步视图和后台事件循环被同步调用阻塞的情况，记录阻塞点的调用栈
+watchdog_config = global_config.get('loop_watchdog', {})
+loop_watchdog = utils.LoopWatchdog(
+    threshold=watchdog_config.get('threshold', 0.1),
+    interval=watchdog_config.get('interval'),
+    stack_limit=watchdog_config.get('stack_limit', 30)
+)
+if watchdog_config.get('enabled', False):
+    loop_watchdog.init_app(flask_app)
+    background_loop.on_start(functools.partial(loop_watchdog.watch, name='background'))
+
+# 按需采样分析：携带管理员签发的 X-Profile-Token 的请求，或按 sample_rate 随机抽样的请求
+profiler_config = global_config.get('profiler', {})
+request_profiler = utils.RequestProfiler(
+    secret=global_config['secret_key'],
+    profile_dir=profiler_config.get('profile_dir', 'profiles'),
+    sample_rate=profiler_config.get('sample_rate', 0),
+    interval=profiler_config.get('interval', 0.005),
+    token_ttl=profiler_config.get('token_ttl', 600),
+    max_profiles=profiler_config.get('max_profiles', 200)
+)
+if profiler_config.get('enabled', True):
+    request_profiler.init_app(flask_app)
+
+# 按 Accept-Encoding 压缩 JSON/CSV 等文本响应；前端服务器已负责压缩时可在配置中关闭
+compression_config = global_config.get('compression', {})
+compressor = utils.Compressor(
+    min_size=compression_config.get('min_size', 1024),
+    gzip_level=compression_config.get('gzip_level', 6),
+    brotli_quality=compression_config.get('brotli_quality', 4)
+)
+if compression_config.get('enabled', True):
+    compressor.init_app(flask_app)
@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import re
+
+import utils
+from .global_params import db_config
+
+logger = logging.getLogger(__name__)
+
+
+async def check_data_base():
+    sql_tables = [
+        'user', 'userinfo', 'useravatar', 'userpermission', 'recruit', 'userphone',
+        'resume_submit', 'resume_info', 'resume_review', 'resume_status_names', 'resume_user_real_head_img',
+        'interview_info', 'interview_room', 'interview_schedule', 'interview_review', 'recruit_interview_settings',
+        'notification_outbox', 'blob_ref'
+    ]
+    sql_params = {
+        # ... 您的 sql_params 字典保持不变 ...
+        "user": ("uid char(36) primary key", "openid_qq char(64)", "openid_wx char(64)", "mail char(64)", "pwd char(255)"),
+        "userinfo": ("uid char(36) primary key", "nickname char(64)", "gender char(10)", "realname char(64)", "registration_time datetime",
+                       "student_id char(20)", "department char(64)", "major char(64)", "grade char(10)", "rank char(10)"),
+        "useravatar": ("uid char(36) primary key", "avatar_path char(255)", "avatar_hash char(64)"),
+        "userpermission": ("uid char(36) primary key", "is_main_leader_admin bool", "is_group_leader_admin bool", "is_member_admin bool", "is_banned bool", "ban_reason char(255)"),
+        "userphone": ("uid char(36) primary key", "phone_number char(20)", "is_verified bool", "verification_code char(10)", "code_sent_time datetime"),
+        "recruit": ("recruit_id char(36) primary key", "name char(64)", "start_time datetime", "end_time datetime", "description text", "is_active bool"),
+        "resume_submit": ("submit_id char(64) primary key", "uid char(36)", "recruit_id char(36)", "submit_time datetime", "status int"),
+        "resume_info": ("submit_id char(64) primary key", "first_choice char(64)", "second_choice char(64)", "self_intro text", "skills text", "projects text", "awards text", "grade_point char(10)", "grade_rank char(10)", "additional_file_path text", "additional_file_name char(64)", "additional_file_hash char(64)"),
+        "resume_review": ("review_id char(36) primary key", "submit_id char(64)", "reviewer_uid char(36)", "review_time datetime", "comments text", "score int", "passed bool"),
+        "resume_status_names": ("status_id int primary key", "status_name char(64)"),
+        "resume_user_real_head_img": ("submit_id char(64) primary key", "real_head_img_path char(255)", "real_head_img_hash char(64)"),
+        "interview_info": ("interview_id char(36) primary key", "submit_id char(64)", "interviewee_uid char(36)", "interview_time datetime", "location char(255)", "notes text"),
+        "interview_room": ("room_id char(36) primary key", "room_name char(64)","location char(255)", "recruit_id char(36)", "applicable_to_choice char(64)"),
+        "interview_schedule": ("schedule_id char(36) primary key", "room_id char(36)", "start_time datetime", "end_time datetime", "already_booked bool", "booked_interview_id char(36)"),
+        "interview_review": ("review_id char(36) primary key", "interview_id char(36)", "reviewer_uid char(36)", "review_time datetime", "comments text", "score int", "passed bool"),
+        "recruit_interview_settings": ("recruit_id char(36) primary key", "book_start_time datetime", "book_end_time datetime"),
+        "notification_outbox": ("job_id char(36) primary key", "kind char(64)", "payload text", "status char(16)", "attempts int", "max_attempts int",
+                                "next_attempt_time datetime", "created_time datetime", "updated_time datetime", "sent_time datetime",
+                                "claimed_by char(128)", "last_error text"),
+        "blob_ref": ("hash char(64) primary key", "refcount int", "size bigint", "created_time datetime", "updated_time datetime")
+    }
+    # 二级索引: 表名 -> {索引名: 字段}
+    sql_indexes = {
+        # worker 认领任务: WHERE status = ... AND next_attempt_time <= ... ORDER BY created_time
+        "notification_outbox": {"idx_outbox_due": ("status", "next_attempt_time", "created_time")}
+    }
+
+    parsed_schema = {
+        table: {
+            definition.strip().split()[0].replace('`', ''): definition
+            for definition in definitions
+        }
+        for table, definitions in sql_params.items()
+    }
+
+    with utils.SQL() as sql:
+        db_name = db_config['db']
+        for table in sql_tables:
+            expected_columns = parsed_schema.get(table, {})
+            if not expected_columns:
+                logger.warning(f"Table '{table}' is defined in 'sql_tables' but not in 'sql_params'. Skipping.")
+                continue
+
+            table_exists_query = "SELECT TABLE_NAME FROM information_schema.TABLES WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s"
+            if not sql.execute_query(table_exists_query, (db_name, table)):
+                create_sql = f"CREATE TABLE `{table}` ({', '.join(expected_columns.values())})"
+                sql.execute_update(create_sql)
+                logger.info(f"Table '{table}' created.")
+                continue
+
+            # --- 表已存在，开始同步其结构 ---
+            existing_columns_info = {col['Field']: col for col in sql.execute_query(f"SHOW COLUMNS FROM `{table}`")}
+            existing_column_names = set(existing_columns_info.keys())
+            expected_column_names = set(expected_columns.keys())
+
+            # 添加缺失字段
+            for col_name in expected_column_names - existing_column_names:
+                add_sql = f"ALTER TABLE `{table}` ADD COLUMN {expected_columns[col_name]}"
+                sql.execute_update(add_sql)
+                logger.info(f"Table '{table}': Added column '{col_name}'.")
+
+            # 删除多余字段
+            for col_name in existing_column_names - expected_column_names:
+                drop_sql = f"ALTER TABLE `{table}` DROP COLUMN `{col_name}`"
+                sql.execute_update(drop_sql)
+                logger.warning(f"Table '{table}': Removed extra column '{col_name}'.")
+
+            # **【核心修复1】修改字段类型，但不处理主键**
+            for col_name in expected_column_names.intersection(existing_column_names):
+                full_def = expected_columns[col_name]
+                # 使用正则表达式移除 'primary key'，忽略大小写
+                def_without_pk = re.sub(r'\s+primary\s+key', '', full_def, flags=re.IGNORECASE)
+                modify_sql = f"ALTER TABLE `{table}` MODIFY COLUMN {def_without_pk}"
+                sql.execute_update(modify_sql)
+            logger.info(f"Table '{table}': Verified and aligned column types and lengths.")
+
+            # **【核心修复2】单独同步主键**
+            # 获取代码中预期的主键
+            expected_pk = sorted([
+                name for name, definition in expected_columns.items()
+                if 'primary key' in definition.lower()
+            ])
+            # 获取数据库中现有的主键
+            existing_pk_info = sql.execute_query(f"SHOW KEYS FROM `{table}` WHERE Key_name = 'PRIMARY'")
+            existing_pk = sorted([row['Column_name'] for row in existing_pk_info])
+
+            # 如果主键不一致，则更新
+            if expected_pk != existing_pk:
+                logger.info(f"Table '{table}': Primary key mismatch. Expected: {expected_pk}, Found: {existing_pk}. Updating...")
+                # 先删除旧的主键（如果存在）
+                if existing_pk:
+                    sql.execute_update(f"ALTER TABLE `{table}` DROP PRIMARY KEY")
+                # 再添加新的主键（如果需要）
+                if expected_pk:
+                    pk_columns_str = ', '.join([f"`{col}`" for col in expected_pk])
+                    sql.execute_update(f"ALTER TABLE `{table}` ADD PRIMARY KEY ({pk_columns_str})")
+                logger.info(f"Table '{table}': Primary key updated successfully.")
+
+        # 同步二级索引（只处理 sql_indexes 中声明的索引，不删除其他索引）
+        for table, indexes in sql_indexes.items():
+            for index_name, columns in indexes.items():
+                existing_index_info = sql.execute_query(f"SHOW INDEX FROM `{table}` WHERE Key_name = %s", (index_name,))
+                existing_columns = [row['Column_name'] for row in sorted(existing_index_info, key=lambda row: row['Seq_in_index'])]
+                if existing_columns == list(columns):
+                    continue
+                if existing_columns:
+                    sql.execute_update(f"ALTER TABLE `{table}` DROP INDEX `{index_name}`")
+                columns_str = ', '.join([f"`{col}`" for col in columns])
+                sql.execute_update(f"ALTER TABLE `{table}` ADD INDEX `{index_name}` ({columns_str})")
+                logger.info(f"Table '{table}': Index '{index_name}' created on ({columns_str}).")
+
+    # 状态检查部分保持不变
+    status_list = ["未处理", "简历通过", "简历未通过", "等待面试", "面试未通过", "已录取", "未参加面试"]
+    with utils.SQL() as sql:
+        existing_status = sql.fetch_all('resume_status_names')
+        existing_status_ids = [item['status_id'] for item in existing_status] if existing_status else []
+        for idx, status in enumerate(status_list):
+            if idx not in existing_status_ids:
+                sql.insert('resume_status_names', {'status_id': idx, 'status_name': status})
+        if existing_status:
+            for item in existing_status:
+                if item['status_id'] < 0 or item['status_id'] >= len(status_list):
+                    sql.delete('resume_status_names', {'status_id': item['status_id']})
+                elif item['status_name'] != status_list[item['status_id']]:
+                    sql.update('resume_status_names', {'status_name': status_list[item['status_id']]}, {'status_id': item['status_id']})
+
+
+def sync_schema():
+    """按 sql_params 创建、同步数据表并写入状态名称。部署或升级后执行一次: python worker.py --sync-schema"""
+    asyncio.run(check_data_base())
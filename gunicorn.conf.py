@@ -0,0 +1,34 @@
+# gunicorn 配置: gunicorn -c gunicorn.conf.py wsgi:app
+# 参数取自 config/config.json 的 server 段
+import json
+import multiprocessing
+
+_global_config = json.load(open('config/config.json'))
+_server_config = _global_config.get('server', {})
+
+bind = _server_config.get('bind') or f"0.0.0.0:{_global_config.get('flask_port', 5000)}"
+workers = _server_config.get('workers') or multiprocessing.cpu_count() * 2 + 1
+worker_class = _server_config.get('worker_class', 'gthread')
+threads = _server_config.get('threads', 8)
+# 预加载时应用在主进程导入一次后 fork，启动更快、内存共享更多，但 HUP 不会重新加载代码（需使用 USR2 热替换）
+preload_app = _server_config.get('preload', False)
+timeout = _server_config.get('timeout', 60)
+graceful_timeout = _server_config.get('graceful_timeout', 30)
+keepalive = _server_config.get('keepalive', 5)
+# 定期重启工作进程，限制内存泄漏的影响
+max_requests = _server_config.get('max_requests', 0)
+max_requests_jitter = _server_config.get('max_requests_jitter', 0)
+accesslog = _server_config.get('accesslog', '-')
+
+
+def when_ready(server):
+    if server.cfg.preload_app:
+        # 预加载阶段（表结构同步等）创建的数据库连接不能被工作进程继承共用，fork 前关闭，由工作进程按需重建
+        from utils.sql import DatabaseManager
+        DatabaseManager.close_pool()
+
+
+def child_exit(server, worker):
+    # 多进程指标模式下清理已退出工作进程的实时 gauge（正在处理的请求数、占用的数据库连接数）
+    from utils.metrics import mark_process_dead
+    mark_process_dead(worker.pid)
@@ -4,5 +4,7 @@ import modules
 
 
 if __name__ == '__main__':
-    from core.global_params import flask_app, global_config
-    flask_app.run('0.0.0.0', global_config['flask_port'])
+    # 开发用单进程服务器；生产环境请使用 gunicorn -c gunicorn.conf.py wsgi:app
+    from wsgi import app
+    from core.global_params import global_config
+    app.run('0.0.0.0', global_config['flask_port'])
@@ -5,4 +5,6 @@ from .resume import *
 from .resume_admin import *
 from .admin import *
 from .interview import *
-from .interview_admin import *
\ No newline at end of file
+from .interview_admin import *
+from .metrics import *
+from .profiler import *
\ No newline at end of file
@@ -1,18 +1,49 @@
 import os
 import uuid
 from flask import request, jsonify, session, send_file
-from core.global_params import flask_app
+from core.global_params import flask_app, blob_store, session_interface
 import logging
 import datetime
 
-from utils import SQL, is_admin_check
+from utils import SQL, is_admin_check, get_stream_format, stream_query, stream_rows, with_http_dates
 
 logger = logging.getLogger(__name__)
 
+USER_LIST_QUERY = """
+    SELECT
+        ui.uid, ui.nickname, ui.realname, ui.registration_time,
+        u.mail,
+        up.is_main_leader_admin, up.is_group_leader_admin, up.is_member_admin
+    FROM
+        userinfo AS ui
+    LEFT JOIN
+        `user` AS u ON ui.uid = u.uid
+    LEFT JOIN
+        userpermission AS up ON ui.uid = up.uid
+"""
+
+USER_LIST_COLUMNS = ['uid', 'nickname', 'realname', 'email', 'is_main_leader_admin', 'is_group_leader_admin', 'is_member_admin', 'registration_time']
+
+def _format_user_row(item):
+    """将用户列表查询的一行转换为接口返回的格式"""
+    cnt_user_info = {
+        'uid': item['uid'],
+        'nickname': item['nickname'],
+        'realname': item['realname'],
+        'email': item['mail'],
+        'is_main_leader_admin': item['is_main_leader_admin'] if item['is_main_leader_admin'] is not None else False,
+        'is_group_leader_admin': item['is_group_leader_admin'] if item['is_group_leader_admin'] is not None else False,
+        'is_member_admin': item['is_member_admin'] if item['is_member_admin'] is not None else False,
+    }
+    if item['registration_time']:
+        cnt_user_info['registration_time'] = item['registration_time']
+    return cnt_user_info
+
 @flask_app.route('/admin/user/list', methods=['GET'])
 async def get_all_users():
     """
     获取所有用户的信息，管理员专用接口
+    可选查询参数 format=ndjson|csv，以流式方式逐行返回
     """
     if 'uid' not in session:
         return jsonify(success=False, error="未登录"), 401
@@ -22,27 +53,17 @@ async def get_all_users():
         permission_info = sql.fetch_one('userpermission', {'uid': uid})
         if not is_admin_check(permission_info):
             return jsonify(success=False, error="权限不足"), 403
-        
-        user_list = sql.fetch_all('userinfo')
+
+    stream_format = get_stream_format()
+    if stream_format:
+        rows = stream_query(USER_LIST_QUERY, None, _format_user_row)
+        return stream_rows(rows, stream_format, USER_LIST_COLUMNS, filename='users')
+
+    with SQL() as sql:
+        user_list = sql.execute_query(USER_LIST_QUERY)
     
     if user_list is not None:
-        user_info = []
-        for item in user_list:
-            with SQL() as sql:
-                user_submission = sql.fetch_one('user', {'uid': item['uid']})
-                permission_info = sql.fetch_one('userpermission', {'uid': item['uid']})
-            cnt_user_info = {
-                'uid': item['uid'],
-                'nickname': item['nickname'],
-                'realname': item['realname'],
-                'email': user_submission['mail'],
-                'is_main_leader_admin': permission_info['is_main_leader_admin'] if permission_info else False,
-                'is_group_leader_admin': permission_info['is_group_leader_admin'] if permission_info else False,
-                'is_member_admin': permission_info['is_member_admin'] if permission_info else False,
-            }
-            if item['registration_time']:
-                cnt_user_info['registration_time'] = item['registration_time'].strftime('%Y-%m-%d %H:%M:%S')
-            user_info.append(cnt_user_info)
+        user_info = [_format_user_row(item) for item in user_list]
         return jsonify(success=True, data=user_info)
     else:
         return jsonify(success=False, error="未找到用户信息")
@@ -81,7 +102,8 @@ async def get_target_user_info(target_uid):
             permission = True
         user_info['permission'] = permission
     
-    return jsonify(success=True, data=user_info)
+    # 原样返回的行保持 HTTP-date 格式的 registration_time
+    return jsonify(success=True, data=with_http_dates(user_info))
     
 @flask_app.route('/admin/user/batch/delete', methods=['POST'])
 async def batch_delete_users():
@@ -103,17 +125,24 @@ async def batch_delete_users():
         return jsonify(success=False, error="请求格式错误，应包含 'uids' 列表"), 400
     
     uids_to_delete = data['uids']
+    deleted_uids = []
     with SQL() as sql:
         for target_uid in uids_to_delete:
             user = sql.fetch_one('user', {'uid': target_uid})
             if user:
                 sql.delete('user', {'uid': target_uid})
                 sql.delete('userinfo', {'uid': target_uid})
+                avatar = sql.fetch_one('useravatar', {'uid': target_uid}) or {}
+                blob_store.discard(avatar.get('avatar_hash'), avatar.get('avatar_path'), sql=sql)
                 sql.delete('useravatar', {'uid': target_uid})
                 sql.delete('userpermission', {'uid': target_uid})
                 sql.delete('userphone', {'uid': target_uid})
+                deleted_uids.append(target_uid)
                 # 这里可以继续删除与用户相关的其他数据，如简历、申请等
-    
+
+    # 已删除用户的登录会话立即失效
+    session_interface.revoke_user_sessions(deleted_uids)
+
     return jsonify(success=True, message="用户已批量删除")
 
 @flask_app.route('/admin/user/permissions/update', methods=['POST'])
@@ -220,7 +249,7 @@ async def search_users():
                 'realname': item['realname'],
                 'nickname': item['nickname'],
                 'email': email,
-                'registration_time': item['registration_time'].strftime('%Y-%m-%d %H:%M:%S') if item['registration_time'] else '',
+                'registration_time': item['registration_time'] or '',
             })
 
     with SQL() as sql:
@@ -242,7 +271,7 @@ async def search_users():
                     'realname': user_info_record.get('realname', '') if user_info_record else '',
                     'nickname': user_info_record.get('nickname', '') if user_info_record else '',
                     'email': item['mail'],
-                    'registration_time': user_info_record.get('registration_time', '').strftime('%Y-%m-%d %H:%M:%S') if user_info_record and user_info_record.get('registration_time', None) else '',
+                    'registration_time': (user_info_record.get('registration_time') if user_info_record else None) or '',
                 })
     
     
@@ -6,8 +6,7 @@ from core.global_params import flask_app
 import logging
 import datetime
 
-from utils import SQL, is_admin_check
-from utils.notification import send_interview_booking_email
+from utils import SQL, is_admin_check, enqueue_notification
 
 logger = logging.getLogger(__name__)
 
@@ -56,10 +55,10 @@ async def get_available_interview_rooms(recruit_id):
             start_time = recruit_interview_settings['book_start_time']
             end_time = recruit_interview_settings['book_end_time']
             if not (start_time <= cnt_time <= end_time):
-                return jsonify(success=True, data={"available": False, "reason": "不在预约时间段内", "start_time": start_time.strftime('%Y-%m-%d %H:%M:%S'), "end_time": end_time.strftime('%Y-%m-%d %H:%M:%S')})
+                return jsonify(success=True, data={"available": False, "reason": "不在预约时间段内", "start_time": start_time, "end_time": end_time})
 
             # 所有条件满足，开放预约
-            return jsonify(success=True, data={"available": True, "start_time": start_time.strftime('%Y-%m-%d %H:%M:%S'), "end_time": end_time.strftime('%Y-%m-%d %H:%M:%S')})
+            return jsonify(success=True, data={"available": True, "start_time": start_time, "end_time": end_time})
     except Exception as e:
         logger.error(f"获取面试可预约状态时出错: {e}")
         return jsonify(success=False, error="服务器内部错误"), 500
@@ -120,8 +119,8 @@ async def get_available_schedules(submit_id):
                 if room_details:
                     available_slots.append({
                         "schedule_id": s['schedule_id'],
-                        "start_time": s['start_time'].strftime('%Y-%m-%d %H:%M:%S'),
-                        "end_time": s['end_time'].strftime('%Y-%m-%d %H:%M:%S'),
+                        "start_time": s['start_time'],
+                        "end_time": s['end_time'],
                         "room_name": room_details.get('room_name', 'N/A'),
                         "location": room_details.get('location', 'N/A')
                     })
@@ -185,14 +184,20 @@ async def book_interview_schedule():
             # 5. 更新简历状态为“等待面试”
             sql.update('resume_submit', {'status': AWAITING_INTERVIEW_STATUS}, {'submit_id': submit_id})
 
-            # 事务成功提交后，发送邮件通知
+            # 邮件通知写入发件箱，随事务一同提交后由 worker 发送
             recruit_info = sql.fetch_one('recruit', {'recruit_id': submission['recruit_id']})
             recruit_name = recruit_info.get('name', 'N/A') if recruit_info else 'N/A'
             resume_info = sql.fetch_one('resume_info', {'submit_id': submit_id})
             choice = resume_info.get('first_choice', 'N/A') if resume_info else 'N/A'
             interview_time_str = schedule['start_time'].strftime('%Y-%m-%d %H:%M:%S')
             location = room_info.get('location', 'N/A')
-        await send_interview_booking_email(uid, recruit_name, choice, interview_time_str, location)
+            enqueue_notification('interview_booking', {
+                'uid': uid,
+                'recruit_name': recruit_name,
+                'choice': choice,
+                'interview_time': interview_time_str,
+                'location': location
+            }, sql=sql)
         
         return jsonify(success=True, message="面试预约成功", interview_id=interview_id)
 
@@ -293,7 +298,7 @@ async def get_my_bookings(recruit_id):
                 {
                     'interview_id': info['interview_id'],
                     'submit_id': info['submit_id'],
-                    'interview_time': info['interview_time'].strftime('%Y-%m-%d %H:%M:%S'),
+                    'interview_time': info['interview_time'],
                     'location': info['location'],
                     'choice': info['choice'],
                     'room_id': info['room_id'],
@@ -7,7 +7,7 @@ from datetime import datetime, timedelta
 from functools import wraps
 
 # 假设这些是您项目中的工具类
-from utils import SQL, is_admin_check, send_interview_cancellation_email
+from utils import SQL, is_admin_check, enqueue_notification, get_stream_format, stream_query, stream_rows
 
 logger = logging.getLogger(__name__)
 
@@ -255,12 +255,7 @@ async def list_interview_schedules(room_id):
             
             # 【已修复】查询正确的表
             schedules = sql.fetch_all('interview_schedule', {'room_id': room_id})
-            # 格式化时间以便前端显示
-            for schedule in schedules:
-                if schedule.get('start_time'):
-                    schedule['start_time'] = schedule['start_time'].strftime('%Y-%m-%d %H:%M:%S')
-                if schedule.get('end_time'):
-                    schedule['end_time'] = schedule['end_time'].strftime('%Y-%m-%d %H:%M:%S')
+            # 时间由 JSON 序列化统一格式化
             schedules.sort(key=lambda x: x['start_time'])
             return jsonify(success=True, data=schedules)
     except Exception as e:
@@ -293,66 +288,80 @@ async def delete_interview_schedule(schedule_id):
 # IV. 面试安排与结果管理 (Interview Scheduling & Result Management)
 # ==============================================================================
 
+# 【已修复】使用 LEFT JOIN 关联 interview_review 表来获取结果
+INTERVIEW_LIST_QUERY = """
+    SELECT
+        ii.interview_id, ii.submit_id, ii.interviewee_uid,
+        ui.realname, ui.nickname,
+        ii.interview_time, ii.location, ii.notes,
+        ir.passed, ir.score, ir.comments AS interviewer_feedback, ir.reviewer_uid, ir.review_time,
+        rm.room_id,
+        rm.room_name,
+        ri.first_choice
+    FROM
+        interview_info AS ii
+    JOIN
+        resume_submit AS rs ON ii.submit_id = rs.submit_id
+    JOIN
+        userinfo AS ui ON ii.interviewee_uid = ui.uid
+    LEFT JOIN
+        interview_review AS ir ON ii.interview_id = ir.interview_id
+    LEFT JOIN
+        interview_schedule AS isch ON ii.interview_id = isch.booked_interview_id
+    LEFT JOIN
+        interview_room AS rm ON isch.room_id = rm.room_id
+    LEFT JOIN
+        resume_info AS ri ON ii.submit_id = ri.submit_id
+    WHERE
+        rs.recruit_id = %s
+    ORDER BY
+        ii.interview_time DESC
+"""
+
+INTERVIEW_LIST_COLUMNS = [
+    'interview_id', 'submit_id', 'interviewee_uid', 'interviewee_name', 'interview_time', 'location', 'notes',
+    'result_passed', 'score', 'interviewer_feedback', 'reviewer_uid', 'review_time', 'room_id', 'room_name', 'first_choice'
+]
+
+def _format_interview_row(item):
+    """将面试列表查询的一行转换为接口返回的格式"""
+    return {
+        'interview_id': item['interview_id'],
+        'submit_id': item['submit_id'],
+        'interviewee_uid': item['interviewee_uid'],
+        'interviewee_name': item.get('realname') or item.get('nickname', '未知'),
+        'interview_time': item['interview_time'],
+        'location': item.get('location', 'N/A'),
+        'notes': item.get('notes', ''),
+        # 【已修复】从关联表中获取结果
+        'result_passed': item.get('passed'), # bool or None
+        'score': item.get('score'),
+        'interviewer_feedback': item.get('interviewer_feedback'),
+        'reviewer_uid': item.get('reviewer_uid'),
+        'review_time': item.get('review_time'),
+        'room_id': item.get('room_id'),
+        'room_name': item.get('room_name'),
+        'first_choice': item.get('first_choice')
+    }
+
 @flask_app.route('/admin/interview/list/<recruit_id>', methods=['GET'])
 @admin_required
 async def list_interviews(recruit_id):
     """
     (Admin) 获取指定招聘的所有已安排面试列表，包含面试者信息和结果。
+    可选查询参数 format=ndjson|csv，以流式方式逐行返回。
     """
+    stream_format = get_stream_format()
+    if stream_format:
+        rows = stream_query(INTERVIEW_LIST_QUERY, (recruit_id,), _format_interview_row)
+        return stream_rows(rows, stream_format, INTERVIEW_LIST_COLUMNS, filename=f'interviews_{recruit_id}')
+
     try:
         with SQL() as sql:
-            # 【已修复】使用 LEFT JOIN 关联 interview_review 表来获取结果
-            query = """
-                SELECT
-                    ii.interview_id, ii.submit_id, ii.interviewee_uid,
-                    ui.realname, ui.nickname,
-                    ii.interview_time, ii.location, ii.notes,
-                    ir.passed, ir.score, ir.comments AS interviewer_feedback, ir.reviewer_uid, ir.review_time,
-                    rm.room_id,
-                    rm.room_name,
-                    ri.first_choice
-                FROM
-                    interview_info AS ii
-                JOIN
-                    resume_submit AS rs ON ii.submit_id = rs.submit_id
-                JOIN
-                    userinfo AS ui ON ii.interviewee_uid = ui.uid
-                LEFT JOIN
-                    interview_review AS ir ON ii.interview_id = ir.interview_id
-                LEFT JOIN
-                    interview_schedule AS isch ON ii.interview_id = isch.booked_interview_id
-                LEFT JOIN
-                    interview_room AS rm ON isch.room_id = rm.room_id
-                LEFT JOIN
-                    resume_info AS ri ON ii.submit_id = ri.submit_id
-                WHERE
-                    rs.recruit_id = %s
-                ORDER BY
-                    ii.interview_time DESC
-            """
-            interviews = sql.execute_query(query, (recruit_id,))
-
-            interview_list = [
-                {
-                    'interview_id': item['interview_id'],
-                    'submit_id': item['submit_id'],
-                    'interviewee_uid': item['interviewee_uid'],
-                    'interviewee_name': item.get('realname') or item.get('nickname', '未知'),
-                    'interview_time': item['interview_time'].strftime('%Y-%m-%d %H:%M:%S') if item['interview_time'] else None,
-                    'location': item.get('location', 'N/A'),
-                    'notes': item.get('notes', ''),
-                    # 【已修复】从关联表中获取结果
-                    'result_passed': item.get('passed'), # bool or None
-                    'score': item.get('score'),
-                    'interviewer_feedback': item.get('interviewer_feedback'),
-                    'reviewer_uid': item.get('reviewer_uid'),
-                    'review_time': item['review_time'].strftime('%Y-%m-%d %H:%M:%S') if item.get('review_time') else None,
-                    'room_id': item.get('room_id'),
-                    'room_name': item.get('room_name'),
-                    'first_choice': item.get('first_choice')
-                } for item in interviews
-            ]
-            interview_list.sort(key=lambda x: x['interview_time'], reverse=True)
+            interviews = sql.execute_query(INTERVIEW_LIST_QUERY, (recruit_id,))
+
+            interview_list = [_format_interview_row(item) for item in interviews]
+            interview_list.sort(key=lambda x: x['interview_time'] or datetime.min, reverse=True)
             return jsonify(success=True, data=interview_list)
     except Exception as e:
         logger.error(f"获取面试列表时出错: {e}")
@@ -438,14 +447,14 @@ async def cancel_interview(interview_id):
                             if recruit_info:
                                 recruit_name = recruit_info.get('name', 'N/A')
                     
-                await send_interview_cancellation_email(
-                    interview_info['interviewee_uid'],
-                    recruit_name,
-                    first_choice,
-                    interview_info['interview_time'].strftime('%Y-%m-%d %H:%M:%S') if interview_info.get('interview_time') else 'N/A'
-                )
+                enqueue_notification('interview_cancellation', {
+                    'uid': interview_info['interviewee_uid'],
+                    'recruit_name': recruit_name,
+                    'choice': first_choice,
+                    'interview_time': interview_info['interview_time'].strftime('%Y-%m-%d %H:%M:%S') if interview_info.get('interview_time') else 'N/A'
+                })
             except Exception as e:
-                logger.error(f"发送面试取消邮件时出错: {e}")
+                logger.error(f"写入面试取消通知时出错: {e}")
 
 
         return jsonify(success=True, message="面试已取消，关联的时间段（如有）已释放，用户可重新预约")
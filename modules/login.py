@@ -1,20 +1,29 @@
-import os
-import time
 import math
 from datetime import datetime
-import aiohttp
+import asyncio
+import hashlib
+import json
 import uuid
 import logging
 
 from flask import request, jsonify, session, redirect
-from werkzeug.security import generate_password_hash, check_password_hash
 
-from core.global_params import flask_app, oauth_config, redis_client, cMailer
+from core.global_params import flask_app, oauth_config, redis_client, cMailer, image_processor, blob_store, http_client, background_loop, rate_limiter, mail_verification, password_hasher
 
-from utils import SQL
+from utils import SQL, InvalidImageError, VerificationCooldown, VERIFY_OK, VERIFY_EXPIRED, VERIFY_LOCKED
 
 logger = logging.getLogger(__name__)
 
+# QQ 开放平台接口地址，可在 oauth.json 中指向本地桩服务用于测试
+QQ_API_BASE_URL = oauth_config.get('qq_api_base_url', 'https://graph.qq.com').rstrip('/')
+
+
+def _request_mail():
+    """限流维度：请求体中的邮箱地址。"""
+    data = request.get_json(silent=True)
+    mail = data.get('mail') if isinstance(data, dict) else None
+    return mail.strip().lower() if isinstance(mail, str) and mail.strip() else None
+
 def safe_redirect(url):
     """Safely redirects to a given URL."""
     if not url:
@@ -54,57 +63,98 @@ async def on_login_bundle_set():
         return jsonify(success=False, error="未提供绑定信息")
     return jsonify(success=True)
 
+def _save_avatar_record(uid, avatar_hash, avatar_path):
+    with SQL() as sql:
+        avatar_record = sql.fetch_one('useravatar', {'uid': uid})
+        if avatar_record:
+            sql.update('useravatar', {'avatar_path': avatar_path, 'avatar_hash': avatar_hash}, {'uid': uid})
+            blob_store.discard(avatar_record.get('avatar_hash'), avatar_record.get('avatar_path'), sql=sql)
+        else:
+            sql.insert('useravatar', {'uid': uid, 'avatar_path': avatar_path, 'avatar_hash': avatar_hash})
+
+def _current_avatar_hash(uid):
+    with SQL() as sql:
+        avatar_record = sql.fetch_one('useravatar', {'uid': uid})
+    return avatar_record.get('avatar_hash') if avatar_record else None
+
 async def handle_avatar(uid, avatar_url):
-    """Downloads avatar, saves it locally, and updates the database."""
-    if not os.path.exists('avatars'):
-        os.makedirs('avatars')
-    
-    avatar_path = f'avatars/{uid}.jpg'
-    
-    async with aiohttp.ClientSession() as http_session:
-        async with http_session.get(avatar_url) as response:
-            if response.status == 200:
-                with open(avatar_path, 'wb') as f:
-                    f.write(await response.read())
-                with SQL() as sql:
-                    if sql.fetch_one('useravatar', {'uid': uid}):
-                        sql.update('useravatar', {'avatar_path': avatar_path}, {'uid': uid})
-                    else:
-                        sql.insert('useravatar', {'uid': uid, 'avatar_path': avatar_path})
+    """
+    Downloads the QQ avatar and stores resized variants when it has changed.
+    Runs on the background loop; ETag/Last-Modified and the content hash are used to skip unchanged avatars.
+    """
+    cache_key = f'avatar_source_qq:{uid}'
+    cached = await asyncio.to_thread(redis_client.get, cache_key)
+    cached = json.loads(cached) if cached else {}
+
+    headers = {}
+    if cached.get('url') == avatar_url:
+        if cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+
+    response = await http_client.get(avatar_url, headers=headers)
+    # 304 表示头像未变化
+    if response.status != 200:
+        return
+
+    cache_value = json.dumps({
+        'url': avatar_url,
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified')
+    })
+    data = response.body
+    if hashlib.sha256(data).hexdigest() != await asyncio.to_thread(_current_avatar_hash, uid):
+        try:
+            avatar_hash, avatar_path = await blob_store.store_image(data, image_processor, 'avatar')
+        except InvalidImageError as e:
+            logger.warning(f"Failed to process avatar for user {uid}: {e}")
+            return
+        try:
+            await asyncio.to_thread(_save_avatar_record, uid, avatar_hash, avatar_path)
+        except Exception:
+            await asyncio.to_thread(blob_store.release, avatar_hash)
+            raise
+    await asyncio.to_thread(redis_client.set, cache_key, cache_value, 30 * 24 * 3600)
+
+async def _refresh_avatar_in_background(uid, avatar_url):
+    try:
+        await handle_avatar(uid, avatar_url)
+    except Exception as e:
+        logger.warning(f"Failed to refresh avatar for user {uid}: {e}")
 
 @flask_app.route('/oauth/qq/callback', methods=['GET'])
 async def on_qq_callback():
     code = request.args.get('code')
     state = request.args.get('state')
 
-    async with aiohttp.ClientSession() as http_session:
-        # Get access token
-        token_url = 'https://graph.qq.com/oauth2.0/token'
-        params = {
-            'grant_type': 'authorization_code',
-            'client_id': oauth_config['qq_app_id'],
-            'client_secret': oauth_config['qq_app_key'],
-            'code': code,
-            'redirect_uri': oauth_config['qq_redirect_uri']
-        }
-        async with http_session.get(token_url, params=params) as response:
-            access_token = (await response.text()).split('&')[0].split('=')[1]
-
-        # Get openid
-        openid_url = 'https://graph.qq.com/oauth2.0/me'
-        params = {'access_token': access_token}
-        async with http_session.get(openid_url, params=params) as response:
-            openid = (await response.text()).split('"openid":"')[1].split('"')[0]
-
-        # Get user info
-        user_info_url = 'https://graph.qq.com/user/get_user_info'
-        params = {
-            'access_token': access_token,
-            'oauth_consumer_key': oauth_config['qq_app_id'],
-            'openid': openid
-        }
-        async with http_session.get(user_info_url, params=params) as response:
-            user_info = await response.json()
+    # Get access token
+    token_url = f'{QQ_API_BASE_URL}/oauth2.0/token'
+    params = {
+        'grant_type': 'authorization_code',
+        'client_id': oauth_config['qq_app_id'],
+        'client_secret': oauth_config['qq_app_key'],
+        'code': code,
+        'redirect_uri': oauth_config['qq_redirect_uri']
+    }
+    response = await http_client.get(token_url, params=params)
+    access_token = response.text().split('&')[0].split('=')[1]
+
+    # Get openid
+    openid_url = f'{QQ_API_BASE_URL}/oauth2.0/me'
+    params = {'access_token': access_token}
+    response = await http_client.get(openid_url, params=params)
+    openid = response.text().split('"openid":"')[1].split('"')[0]
+
+    # Get user info
+    user_info_url = f'{QQ_API_BASE_URL}/user/get_user_info'
+    params = {
+        'access_token': access_token,
+        'oauth_consumer_key': oauth_config['qq_app_id'],
+        'openid': openid
+    }
+    response = await http_client.get(user_info_url, params=params)
+    user_info = response.json()
 
     # Check if user exists
     with SQL() as sql:
@@ -131,8 +181,8 @@ async def on_qq_callback():
     # Store access_token in Redis
     redis_client.set(f'access_token_qq:{uid}', access_token)
 
-    # Handle avatar
-    await handle_avatar(uid, user_info['figureurl_qq'])
+    # Handle avatar in the background so the redirect is not delayed by the download
+    background_loop.submit(_refresh_avatar_in_background(uid, user_info['figureurl_qq']))
 
     # Store user info in session
     session.permanent = True
@@ -166,23 +216,23 @@ async def on_mail_verify_send():
         return jsonify(success=False, error="未提供邮箱地址")
 
     mail = data['mail']
-    verification_code = os.urandom(3).hex()
-    
+
     with SQL() as sql:
         existing = sql.fetch_one('user', {'mail': mail})
         if existing:
             return jsonify(success=False, error="该邮箱已被注册")
-        
-        last_sent = sql.fetch_one('usermailverify', {'mail': mail})
-        if last_sent and last_sent['code_sent_time']:
-            elapsed = (datetime.now() - last_sent['code_sent_time']).total_seconds()
-            if elapsed < 60:
-                return jsonify(success=False, error="请勿频繁发送验证码，60秒后再试")
-            
-    if 'mail_verify_last_sent' in session:
-        elapsed = time.time() - session['mail_verify_last_sent']
-        if elapsed < 60:
-            return jsonify(success=False, error="请勿频繁发送验证码，60秒后再试")
+
+    try:
+        verification_code = mail_verification.issue(mail)
+    except VerificationCooldown as e:
+        return jsonify(success=False, error=f"请勿频繁发送验证码，{e.retry_after}秒后再试")
+
+    # 同一邮箱的发送间隔由 mail_verification 的冷却时间控制；按 IP 的限额只防止向大量邮箱群发，
+    # 且只对确实要发送的请求计数（校园网等出口 NAT 下很多用户共用一个地址）
+    rejected = rate_limiter.check('on_mail_verify_send', 20, 600, scopes=('ip',), error="发送验证码过于频繁，请稍后再试")
+    if rejected is not None:
+        mail_verification.revoke(mail)
+        return rejected
 
     bundle_name = data.get('bundle_name')
     if bundle_name:
@@ -194,20 +244,16 @@ async def on_mail_verify_send():
             await mailer.send(mail, "T-DT 验证码", f"同学您好,\n\t您的邮箱验证代码是: {verification_code}\n请在10分钟内使用该验证码完成验证。如非本人操作，请忽略此邮件。\n请勿回复此邮件。\n\n-- T-DT创新实验室", subtype='plain')
     except Exception as e:
         logger.error(f"发送邮件失败: {e}")
+        # 发送失败时作废验证码（同时解除该邮箱的冷却）并撤销本次 IP 计数，允许立即重试
+        mail_verification.revoke(mail)
+        rate_limiter.refund('on_mail_verify_send', scopes=('ip',))
         return jsonify(success=False, error="发送邮件失败")
-    
-    session['mail_verify_last_sent'] = time.time()
-    with SQL() as sql:
-        existing = sql.fetch_one('usermailverify', {'mail': mail})
-        if existing:
-            sql.update('usermailverify', {'verification_code': verification_code, 'code_sent_time': datetime.now()}, {'mail': mail})
-        else:
-            sql.insert('usermailverify', {'mail': mail, 'verification_code': verification_code, 'code_sent_time': datetime.now()})
 
     return jsonify(success=True, message="验证邮件已发送")
 
 
 @flask_app.route('/login/mail/register', methods=['POST'])
+@rate_limiter.limit(10, 300, scopes=('ip',))
 async def on_mail_register():
     data = request.json
     if not data or 'mail' not in data or 'pwd' not in data or 'verification_code' not in data:
@@ -221,14 +267,17 @@ async def on_mail_register():
         existing = sql.fetch_one('user', {'mail': mail})
         if existing:
             return jsonify(success=False, error="该邮箱已被注册")
-        
-        code_entry = sql.fetch_one('usermailverify', {'mail': mail})
-        if not code_entry or code_entry['verification_code'] != verification_code:
-            return jsonify(success=False, error="验证码错误")
-        if (datetime.now() - code_entry['code_sent_time']).total_seconds() > 600:
-            return jsonify(success=False, error="验证码已过期，请重新获取")
-        
-        hashed_pwd = generate_password_hash(pwd)
+
+    result = mail_verification.verify(mail, verification_code)
+    if result == VERIFY_EXPIRED:
+        return jsonify(success=False, error="验证码已过期，请重新获取")
+    if result == VERIFY_LOCKED:
+        return jsonify(success=False, error="验证码错误次数过多，请重新获取")
+    if result != VERIFY_OK:
+        return jsonify(success=False, error="验证码错误")
+
+    hashed_pwd = await password_hasher.hash(pwd)
+    with SQL() as sql:
         if 'uid' in session and session['uid'] and 'login_bundle' in session and session['login_bundle'] == 'mail':
             session.pop('login_bundle', None)
             # User is logged in, bind account
@@ -241,7 +290,6 @@ async def on_mail_register():
             sql.insert('user', {'uid': uid, 'mail': mail, 'pwd': hashed_pwd})
             sql.insert('userinfo', {'uid': uid, 'registration_time': datetime.now()})
             # sql.insert('useravatar', {'uid': uid, 'avatar_path': ''})
-            sql.delete('usermailverify', {'mail': mail})
 
     session.permanent = True
     session['uid'] = uid
@@ -253,6 +301,8 @@ async def on_mail_register():
     return response
 
 @flask_app.route('/login/mail', methods=['POST'])
+@rate_limiter.limit(60, 300, scopes=('ip',), name='on_mail_login_ip', error="登录尝试过于频繁，请稍后再试")
+@rate_limiter.limit(10, 300, scopes=(), key_func=_request_mail, error="该账号登录尝试过于频繁，请稍后再试")
 async def on_mail_login():
     data = request.json
     if not data or 'mail' not in data or 'pwd' not in data:
@@ -263,11 +313,17 @@ async def on_mail_login():
 
     with SQL() as sql:
         user = sql.fetch_one('user', {'mail': mail})
-        if not user:
-            return jsonify(success=False, error="用户不存在"), 404
-        if not check_password_hash(user['pwd'], pwd):
-            return jsonify(success=False, error="邮箱或密码错误"), 403
-        uid = user['uid']
+    if not user:
+        return jsonify(success=False, error="用户不存在"), 404
+    if not await password_hasher.verify(user['pwd'], pwd):
+        return jsonify(success=False, error="邮箱或密码错误"), 403
+    uid = user['uid']
+
+    if password_hasher.needs_rehash(user['pwd']):
+        # 哈希算法或成本参数已调整，使用刚校验过的明文重新计算
+        new_hash = await password_hasher.hash(pwd)
+        with SQL() as sql:
+            sql.update('user', {'pwd': new_hash}, {'uid': uid, 'pwd': user['pwd']})
 
     session.permanent = True
     session['uid'] = uid
@@ -0,0 +1,35 @@
+import hmac
+import ipaddress
+from flask import request, jsonify, Response
+from core.global_params import flask_app, metrics_config
+
+from utils.metrics import enabled as metrics_enabled, render as render_metrics
+
+def _is_direct_loopback():
+    """请求直接来自本机（经反向代理转发的请求带有 X-Forwarded-For 等头，不算）。"""
+    if 'X-Forwarded-For' in request.headers or 'X-Real-IP' in request.headers:
+        return False
+    try:
+        return ipaddress.ip_address(request.remote_addr or '').is_loopback
+    except ValueError:
+        return False
+
+@flask_app.route('/metrics', methods=['GET'])
+def export_metrics():
+    """
+    以 Prometheus 文本格式导出指标。
+    配置了 metrics.token 时需携带请求头 Authorization: Bearer <token>；未配置时只接受本机直接发起的请求。
+    """
+    if not metrics_config.get('enabled', True) or not metrics_enabled():
+        return jsonify(success=False, error="未启用指标导出"), 404
+
+    token = metrics_config.get('token')
+    if token:
+        provided = request.headers.get('Authorization', '').encode('utf-8')
+        if not hmac.compare_digest(provided, f'Bearer {token}'.encode('utf-8')):
+            return jsonify(success=False, error="无权访问"), 401
+    elif not _is_direct_loopback():
+        return jsonify(success=False, error="未配置 metrics.token，仅允许本机访问"), 403
+
+    body, content_type = render_metrics()
+    return Response(body, content_type=content_type)
@@ -0,0 +1,52 @@
+from flask import jsonify, session, send_file
+from core.global_params import flask_app, request_profiler, profiler_config
+import logging
+
+from utils import SQL, is_admin_check
+
+logger = logging.getLogger(__name__)
+
+def _check_admin():
+    """返回 (uid, 错误响应)，当前用户是管理员时错误响应为 None"""
+    if 'uid' not in session:
+        return None, (jsonify(success=False, error="未登录"), 401)
+    uid = session['uid']
+    with SQL() as sql:
+        permission_info = sql.fetch_one('userpermission', {'uid': uid})
+    if not is_admin_check(permission_info):
+        return None, (jsonify(success=False, error="权限不足"), 403)
+    if not profiler_config.get('enabled', True):
+        return None, (jsonify(success=False, error="未启用请求采样"), 404)
+    return uid, None
+
+@flask_app.route('/admin/profiler/token', methods=['POST'])
+def issue_profiler_token():
+    """
+    签发请求采样令牌，管理员专用接口
+    之后的请求携带请求头 X-Profile-Token: <token> 即会被采样，响应头 X-Profile-Id 为采样结果的文件名
+    """
+    uid, error = _check_admin()
+    if error:
+        return error
+    token, expires = request_profiler.issue_token(uid)
+    logger.info(f"管理员 {uid} 获取了请求采样令牌")
+    return jsonify(success=True, data={'header': 'X-Profile-Token', 'token': token, 'expires': expires})
+
+@flask_app.route('/admin/profiler/profiles', methods=['GET'])
+def list_profiles():
+    """列出已保存的采样结果（从新到旧），管理员专用接口"""
+    _, error = _check_admin()
+    if error:
+        return error
+    return jsonify(success=True, data=request_profiler.list_profiles())
+
+@flask_app.route('/admin/profiler/profiles/<name>', methods=['GET'])
+def get_profile(name):
+    """下载一份折叠栈格式的采样结果，可直接交给 flamegraph.pl 或 speedscope，管理员专用接口"""
+    _, error = _check_admin()
+    if error:
+        return error
+    path = request_profiler.profile_path(name)
+    if path is None:
+        return jsonify(success=False, error="采样结果不存在"), 404
+    return send_file(path, mimetype='text/plain', as_attachment=True, download_name=name)
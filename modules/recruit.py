@@ -1,7 +1,7 @@
 import os
 import uuid
 from flask import request, jsonify, session, send_file
-from core.global_params import flask_app
+from core.global_params import flask_app, blob_store
 import logging
 import datetime
 
@@ -43,8 +43,8 @@ async def get_recruit_list():
             recruit_info.append({
                 'recruit_id': item['recruit_id'],
                 'name': item['name'],
-                'start_time': item['start_time'].strftime('%Y-%m-%d %H:%M:%S'),
-                'end_time': item['end_time'].strftime('%Y-%m-%d %H:%M:%S'),
+                'start_time': item['start_time'],
+                'end_time': item['end_time'],
                 'is_active': item['is_active'],
                 "available": item['is_active'] and (item['start_time'] <= cnt_time <= item['end_time']),
                 "is_applyed": is_applyed
@@ -87,8 +87,8 @@ async def get_recruit_info(recruit_id):
     recruit_info = {
         'recruit_id': recruit['recruit_id'],
         'name': recruit['name'],
-        'start_time': recruit['start_time'].strftime('%Y-%m-%d %H:%M:%S'),
-        'end_time': recruit['end_time'].strftime('%Y-%m-%d %H:%M:%S'),
+        'start_time': recruit['start_time'],
+        'end_time': recruit['end_time'],
         'description': recruit['description'],
         'is_active': recruit['is_active'],
         'available': recruit['is_active'] and (recruit['start_time'] <= cnt_time <= recruit['end_time']),
@@ -185,18 +185,14 @@ async def delete_recruit(recruit_id):
                 resume_infos = sql.fetch_all('resume_info', {'submit_id': submit_ids})
                 if resume_infos:
                     for info in resume_infos:
-                        file_path = info['additional_file_path']
-                        if file_path and os.path.exists(file_path):
-                            os.remove(file_path)
+                        blob_store.discard(info.get('additional_file_hash'), info.get('additional_file_path'), sql=sql)
                 sql.delete('resume_review', {'submit_id': submit_ids})
                 sql.delete('resume_submit', {'recruit_id': recruit_id})
                 sql.delete('resume_info', {'submit_id': submit_ids})
                 resume_real_heads = sql.fetch_all('resume_user_real_head_img', {'submit_id': submit_ids})
                 if resume_real_heads:
                     for head in resume_real_heads:
-                        img_path = head['real_head_img_path']
-                        if img_path and os.path.exists(img_path):
-                            os.remove(img_path)
+                        blob_store.discard(head.get('real_head_img_hash'), head.get('real_head_img_path'), sql=sql)
                 sql.delete('resume_user_real_head_img', {'submit_id': submit_ids})
             sql.delete('recruit', {'recruit_id': recruit_id})
         return jsonify(success=True, message="招聘信息删除成功")
@@ -1,13 +1,12 @@
 import asyncio
 import os
 from flask import request, jsonify, session, send_file
-from core.global_params import flask_app, global_config
+from core.global_params import flask_app, global_config, image_processor, file_sender, blob_store, rate_limiter
 import logging
 import datetime
 import uuid
 
-from utils import SQL, is_admin_check
-from utils.notification import send_application_submission_email
+from utils import SQL, is_admin_check, enqueue_notification, InvalidImageError, resolve_image_variant, image_mimetype, accepts_webp, IMAGE_PROFILES, with_http_dates
 
 available_positions = ['算法组', '电控组', '机械组', '运营组']
 available_2st_positions = ['运营组']
@@ -18,6 +17,7 @@ NO_INTERVIEW_STATUS = 6     # "未参加面试"
 logger = logging.getLogger(__name__)
 
 @flask_app.route('/recruit/apply', methods=['POST'])
+@rate_limiter.limit(10, 60, scopes=('ip', 'uid'))
 async def apply_recruit():
     """
     提交招聘申请
@@ -84,47 +84,52 @@ async def apply_recruit():
         while sql.fetch_one('resume_submit', {'submit_id': submit_id}):
             submit_id = str(uuid.uuid4())
         
-    os.makedirs('photos', exist_ok=True)
-    real_head_img_path = f'photos/{submit_id}_real.jpg'
-    real_head_img.save(real_head_img_path)
-
-    additional_file_path = ''
-    filename = ''
     additional_file = request.files.get('additional_file')
-    if additional_file:
-        filename = additional_file.filename
-        if '.' in filename and filename.rsplit('.', 1)[1].lower() in global_config.get('allowed_content_extensions', []):
-            save_path = os.path.join('uploads', f"{submit_id}")
-            os.makedirs(os.path.dirname(save_path), exist_ok=True)
-            additional_file.save(save_path)
-            additional_file_path = save_path
-        else:
-            return jsonify(success=False, error="附加文件格式不支持"), 400
-    
-    with SQL() as sql:
-        sql.insert('resume_submit', {'submit_id': submit_id, 'uid': uid, 'recruit_id': recruit_id, 'submit_time': submit_time, 'status': status})
-        sql.insert('resume_info', {
-            'submit_id': submit_id,
-            'first_choice': first_choice,
-            'second_choice': second_choice,
-            'self_intro': self_intro,
-            'skills': skills,
-            'projects': projects,
-            'awards': awards,
-            'grade_point': grade_point,
-            'grade_rank': grade_rank,
-            'additional_file_path': additional_file_path,
-            'additional_file_name': filename
-        })
-        sql.insert('resume_user_real_head_img', {
-            'submit_id': submit_id,
-            'real_head_img_path': real_head_img_path
-        })
-        
-        recruit_info = sql.fetch_one('recruit', {'recruit_id': recruit_id})
-        recruit_name = recruit_info.get('name', 'N/A') if recruit_info else 'N/A'
-    await send_application_submission_email(uid, recruit_name, first_choice)
-        
+    filename = additional_file.filename if additional_file else ''
+    if additional_file and not ('.' in filename and filename.rsplit('.', 1)[1].lower() in global_config.get('allowed_content_extensions', [])):
+        return jsonify(success=False, error="附加文件格式不支持"), 400
+
+    # 文件按内容哈希保存，相同内容只存一份；写入前已持有引用，失败时需要释放
+    try:
+        real_head_img_hash, real_head_img_path = await blob_store.store_image_upload(real_head_img, image_processor, 'photo')
+    except InvalidImageError:
+        return jsonify(success=False, error="正面照无法识别，请上传有效的图片"), 400
+
+    additional_file_hash, additional_file_path = None, ''
+    try:
+        if additional_file:
+            additional_file_hash, additional_file_path = blob_store.store_upload(additional_file)
+
+        with SQL() as sql:
+            sql.insert('resume_submit', {'submit_id': submit_id, 'uid': uid, 'recruit_id': recruit_id, 'submit_time': submit_time, 'status': status})
+            sql.insert('resume_info', {
+                'submit_id': submit_id,
+                'first_choice': first_choice,
+                'second_choice': second_choice,
+                'self_intro': self_intro,
+                'skills': skills,
+                'projects': projects,
+                'awards': awards,
+                'grade_point': grade_point,
+                'grade_rank': grade_rank,
+                'additional_file_path': additional_file_path,
+                'additional_file_name': filename,
+                'additional_file_hash': additional_file_hash
+            })
+            sql.insert('resume_user_real_head_img', {
+                'submit_id': submit_id,
+                'real_head_img_path': real_head_img_path,
+                'real_head_img_hash': real_head_img_hash
+            })
+
+            recruit_name = recruit_info.get('name', 'N/A') if recruit_info else 'N/A'
+            # 通知写入发件箱，与投递记录在同一事务中提交，由 worker 异步发送
+            enqueue_notification('application_submission', {'uid': uid, 'recruit_name': recruit_name, 'choice': first_choice}, sql=sql)
+    except Exception:
+        blob_store.release(real_head_img_hash)
+        blob_store.release(additional_file_hash)
+        raise
+
     logger.info(f"User {uid} applied for recruit {recruit_id} with submit ID {submit_id}")
     return jsonify(success=True, submit_id=submit_id)
 
@@ -164,7 +169,8 @@ async def get_resume_info(submit_id):
         status_name_record = sql.fetch_one("resume_status_names", {'status_id': status})
         submission['status_name'] = status_name_record['status_name'] if status_name_record else "未知状态"
     
-    return jsonify(success=True, submission=submission, info=info)
+    # 原样返回的行保持 HTTP-date 格式的 submit_time
+    return jsonify(success=True, submission=with_http_dates(submission), info=info)
 
 @flask_app.route('/resume/list', methods=['GET'])
 async def list_user_resumes():
@@ -202,7 +208,7 @@ async def list_user_resumes():
                 result = {
                     'submit_id': submission['submit_id'],
                     'recruit_id': submission['recruit_id'],
-                    'submit_time': submission['submit_time'].strftime('%Y-%m-%d %H:%M:%S'),
+                    'submit_time': submission['submit_time'],
                     'status': status,
                     'status_name': status_name_record['status_name'] if status_name_record else "未知状态"
                 }
@@ -245,13 +251,18 @@ async def download_additional_file(submit_id):
             if not os.path.isfile(file_path):
                 return jsonify(success=False, error="附加文件不存在或已丢失"), 404
 
-        return send_file(os.path.join(os.getcwd(), file_path), as_attachment=True, download_name=file_name)
+        # 附件可能被重新上传，每次都向服务器验证，未变化时返回 304
+        return file_sender.send(file_path, as_attachment=True, download_name=file_name, max_age=0,
+                                content_hash=submission.get('additional_file_hash'))
     except Exception as e:
         logger.error(f"Error downloading additional file for submit_id {submit_id}: {e}")
         return jsonify(success=False, error="下载附加文件时发生错误"), 500
 
 @flask_app.route('/resume/real_head_img/<submit_id>', methods=['GET'])
 async def get_real_head_img(submit_id):
+    """
+    获取正面照，可通过 ?size=small|medium|large 选择尺寸，客户端支持时返回 WebP
+    """
     uid = session.get('uid')
     if not uid:
         return jsonify(success=False, error="用户未登录"), 401
@@ -271,11 +282,16 @@ async def get_real_head_img(submit_id):
             if not submission or not submission.get('real_head_img_path'):
                 return jsonify(success=False, error="未找到正面照"), 404
 
-            file_path = submission['real_head_img_path']
+            size = request.args.get('size')
+            if size and size not in IMAGE_PROFILES['photo']:
+                return jsonify(success=False, error="无效的尺寸参数"), 400
+            file_path = resolve_image_variant(submission['real_head_img_path'], size, accepts_webp(request.accept_mimetypes))
             if not os.path.isfile(file_path):
                 return jsonify(success=False, error="正面照不存在或已丢失"), 404
 
-        return send_file(os.path.join(os.getcwd(), file_path), as_attachment=False)
+        response = file_sender.send(file_path, mimetype=image_mimetype(file_path), content_hash=submission.get('real_head_img_hash'))
+        response.vary.add('Accept')
+        return response
     except Exception as e:
         logger.error(f"Error retrieving real head image for submit_id {submit_id}: {e}")
         return jsonify(success=False, error="获取正面照时发生错误"), 500
@@ -346,12 +362,7 @@ async def update_resume(submit_id):
     if additional_file_change:
         if additional_file:
             filename = additional_file.filename
-            if '.' in filename and filename.rsplit('.', 1)[1].lower() in global_config.get('allowed_content_extensions', []):
-                save_path = os.path.join('uploads', f"{submit_id}")
-                os.makedirs(os.path.dirname(save_path), exist_ok=True)
-                additional_file.save(save_path)
-                additional_file_path = save_path
-            else:
+            if not ('.' in filename and filename.rsplit('.', 1)[1].lower() in global_config.get('allowed_content_extensions', [])):
                 return jsonify(success=False, error="附加文件格式不支持")
         else:
             print(additional_file_change)
@@ -367,11 +378,18 @@ async def update_resume(submit_id):
             return jsonify(success=False, error="必须上传正面照")
         if not real_head_img.filename.lower().endswith(('.png', '.jpg', '.jpeg')):
             return jsonify(success=False, error="正面照格式不支持,仅支持png/jpg/jpeg")
-        if not os.path.exists('photos'):
-            os.makedirs('photos')
-        real_head_img_path = f'photos/{submit_id}_real.jpg'
-        real_head_img.save(real_head_img_path)
+
+    # 新文件按内容哈希保存并持有引用，旧文件的引用在同一事务中释放
+    real_head_img_hash = additional_file_hash = None
+    real_head_img_path = ''
+    if real_head_img_change:
+        try:
+            real_head_img_hash, real_head_img_path = await blob_store.store_image_upload(real_head_img, image_processor, 'photo')
+        except InvalidImageError:
+            return jsonify(success=False, error="正面照无法识别，请上传有效的图片")
     try:
+        if additional_file_change:
+            additional_file_hash, additional_file_path = blob_store.store_upload(additional_file)
         with SQL() as sql:
             update_data = {
                 'first_choice': first_choice,
@@ -383,15 +401,23 @@ async def update_resume(submit_id):
                 'grade_point': grade_point,
                 'grade_rank': grade_rank
             }
+            old_info = sql.fetch_one('resume_info', {'submit_id': submit_id}) or {}
             if additional_file_change and additional_file_path:
                 update_data['additional_file_path'] = additional_file_path
+                update_data['additional_file_name'] = filename
+                update_data['additional_file_hash'] = additional_file_hash
             sql.update('resume_info', update_data, {'submit_id': submit_id})
-            old_real_head_img_path = sql.fetch_one('resume_user_real_head_img', {'submit_id': submit_id}).get('real_head_img_path', '')
+            old_head = sql.fetch_one('resume_user_real_head_img', {'submit_id': submit_id}) or {}
             if real_head_img_change and real_head_img_path:
-                sql.update('resume_user_real_head_img', {'real_head_img_path': real_head_img_path}, {'submit_id': submit_id})
+                sql.update('resume_user_real_head_img', {'real_head_img_path': real_head_img_path, 'real_head_img_hash': real_head_img_hash}, {'submit_id': submit_id})
+                blob_store.discard(old_head.get('real_head_img_hash'), old_head.get('real_head_img_path'), sql=sql)
+            if additional_file_change and additional_file_path:
+                blob_store.discard(old_info.get('additional_file_hash'), old_info.get('additional_file_path'), sql=sql)
         logger.info(f"User {uid} updated resume {submit_id}")
         return jsonify(success=True)
     except Exception as e:
+        blob_store.release(real_head_img_hash)
+        blob_store.release(additional_file_hash)
         logger.error(f"Error updating resume: {e}")
         return jsonify(success=False, error="更新简历时发生错误")
     
@@ -418,28 +444,19 @@ async def delete_resume(submit_id):
             if user_id != uid and not is_admin:
                 return jsonify(success=False, error="无权限删除该简历"), 403
             if not is_admin and user_id == uid:
-                with SQL() as sql:
-                    recruit_id = submission.get('recruit_id')
-                    recruit_info = sql.fetch_one('recruit', {'recruit_id': recruit_id})
-                    if not recruit_info:
-                        return jsonify(success=False, error="无效的招聘ID"), 400
-                    recruit_start_time = recruit_info.get('start_time', 0)
-                    recruit_end_time = recruit_info.get('end_time', 0)
-                    current_time = datetime.datetime.now()
-                    if current_time < recruit_start_time or current_time > recruit_end_time:
-                        return jsonify(success=False, error="当前不在招聘时间范围内，无法删除简历"), 400
-            old_additional_file_path = sql.fetch_one('resume_info', {'submit_id': submit_id}).get('additional_file_path', '')
-            if old_additional_file_path and os.path.isfile(old_additional_file_path):
-                try:
-                    os.remove(old_additional_file_path)
-                except Exception as e:
-                    logger.warning(f"Failed to remove additional file {old_additional_file_path}: {e}")
-            old_real_head_img_path = sql.fetch_one('resume_user_real_head_img', {'submit_id': submit_id}).get('real_head_img_path', '')
-            if old_real_head_img_path and os.path.isfile(old_real_head_img_path):
-                try:
-                    os.remove(old_real_head_img_path)
-                except Exception as e:
-                    logger.warning(f"Failed to remove real head image {old_real_head_img_path}: {e}")
+                recruit_id = submission.get('recruit_id')
+                recruit_info = sql.fetch_one('recruit', {'recruit_id': recruit_id})
+                if not recruit_info:
+                    return jsonify(success=False, error="无效的招聘ID"), 400
+                recruit_start_time = recruit_info.get('start_time', 0)
+                recruit_end_time = recruit_info.get('end_time', 0)
+                current_time = datetime.datetime.now()
+                if current_time < recruit_start_time or current_time > recruit_end_time:
+                    return jsonify(success=False, error="当前不在招聘时间范围内，无法删除简历"), 400
+            old_info = sql.fetch_one('resume_info', {'submit_id': submit_id}) or {}
+            blob_store.discard(old_info.get('additional_file_hash'), old_info.get('additional_file_path'), sql=sql)
+            old_head = sql.fetch_one('resume_user_real_head_img', {'submit_id': submit_id}) or {}
+            blob_store.discard(old_head.get('real_head_img_hash'), old_head.get('real_head_img_path'), sql=sql)
             sql.delete('resume_submit', {'submit_id': submit_id})
             sql.delete('resume_info', {'submit_id': submit_id})
             sql.delete('resume_user_real_head_img', {'submit_id': submit_id})
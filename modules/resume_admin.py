@@ -2,19 +2,81 @@ import asyncio
 import os
 import uuid
 from flask import request, jsonify, session, send_file
-from core.global_params import flask_app
+from core.global_params import flask_app, blob_store
 import logging
 import datetime
 
-from utils import SQL, is_admin_check
-from utils.notification import send_status_change_notification
+from utils import SQL, is_admin_check, enqueue_notification, get_stream_format, stream_query, stream_rows, stream_zip, with_http_dates
 
 logger = logging.getLogger(__name__)
 
+# 每个批量通知任务包含的投递数量
+STATUS_NOTIFICATION_BATCH_SIZE = 200
+
+# 批量更新状态时每个事务处理的简历数量
+STATUS_UPDATE_CHUNK_SIZE = 500
+
+def _update_status_chunk(chunk, new_status, new_status_name):
+    """
+    在一个短事务中将一批简历更新为新状态，返回状态实际发生变化的 submit_id 列表。
+    仅对状态变化的简历写入通知任务；任务与状态更新一同提交，worker 在提交后才能看到并投递。
+    """
+    placeholders = ', '.join(['%s'] * len(chunk))
+    with SQL() as sql:
+        rows = sql.execute_query(
+            f"SELECT `submit_id` FROM `resume_submit` "
+            f"WHERE `submit_id` IN ({placeholders}) AND NOT (`status` <=> %s) FOR UPDATE",
+            (*chunk, new_status)
+        )
+        changed = [row['submit_id'] for row in rows]
+        if not changed:
+            return []
+        changed_placeholders = ', '.join(['%s'] * len(changed))
+        sql.execute_update(
+            f"UPDATE `resume_submit` SET `status` = %s WHERE `submit_id` IN ({changed_placeholders})",
+            (new_status, *changed)
+        )
+        # 通知以批量任务写入发件箱，由 worker 统一预取收件人信息后发送
+        for i in range(0, len(changed), STATUS_NOTIFICATION_BATCH_SIZE):
+            enqueue_notification('status_change_batch', {
+                'submit_ids': changed[i:i + STATUS_NOTIFICATION_BATCH_SIZE],
+                'new_status_name': new_status_name
+            }, sql=sql)
+    return changed
+
+RESUME_LIST_QUERY = """
+    SELECT
+        rs.submit_id, rs.uid, rs.recruit_id, rs.submit_time, rs.status,
+        ri.first_choice,
+        ui.realname, ui.nickname
+    FROM
+        resume_submit AS rs
+    LEFT JOIN
+        resume_info AS ri ON rs.submit_id = ri.submit_id
+    LEFT JOIN
+        userinfo AS ui ON rs.uid = ui.uid
+"""
+
+RESUME_LIST_COLUMNS = ['submit_id', 'uid', 'recruit_id', 'submit_time', 'status', 'first_choice', 'realname', 'nickname']
+
+def _format_resume_row(item):
+    """将简历列表查询的一行转换为接口返回的格式"""
+    return {
+        'submit_id': item['submit_id'],
+        'uid': item['uid'],
+        'recruit_id': item['recruit_id'],
+        'submit_time': item['submit_time'],
+        'status': item['status'],
+        'first_choice': item['first_choice'] or '',
+        'realname': item['realname'] or '',
+        'nickname': item['nickname'] or ''
+    }
+
 @flask_app.route('/resume/admin/list', methods=['GET'])
 async def get_all_resumes():
     """
     获取所有简历的列表，管理员专用接口
+    可选查询参数 format=ndjson|csv，以流式方式逐行返回
     """
     if 'uid' not in session:
         return jsonify(success=False, error="未登录"), 401
@@ -24,29 +86,127 @@ async def get_all_resumes():
         permission_info = sql.fetch_one('userpermission', {'uid': uid})
         if not is_admin_check(permission_info):
             return jsonify(success=False, error="权限不足"), 403
-        
-        resume_list = sql.fetch_all('resume_submit', columns=['submit_id', 'uid', 'recruit_id', 'submit_time', 'status'])
+
+    stream_format = get_stream_format()
+    if stream_format:
+        rows = stream_query(RESUME_LIST_QUERY, None, _format_resume_row)
+        return stream_rows(rows, stream_format, RESUME_LIST_COLUMNS, filename='resumes')
+
+    with SQL() as sql:
+        resume_list = sql.execute_query(RESUME_LIST_QUERY)
     
     if resume_list is not None:
-        resume_info = []
-        for item in resume_list:
-            with SQL() as sql:
-                resume_info_submit = sql.fetch_one('resume_info', {'submit_id': item['submit_id']}, columns=['first_choice'])
-                user_info_submission = sql.fetch_one('userinfo', {'uid': item['uid']})
-                resume_info.append({
-                    'submit_id': item['submit_id'],
-                    'uid': item['uid'],
-                    'recruit_id': item['recruit_id'],
-                    'submit_time': item['submit_time'].strftime('%Y-%m-%d %H:%M:%S'),
-                    'status': item['status'],
-                    'first_choice': resume_info_submit.get('first_choice', ''),
-                    'realname': user_info_submission.get('realname', '') if user_info_submission else '',
-                    'nickname': user_info_submission.get('nickname', '') if user_info_submission else ''
-                })
+        resume_info = [_format_resume_row(item) for item in resume_list]
         return jsonify(success=True, data=resume_info)
     else:
         return jsonify(success=False, error="未找到简历信息")
     
+RESUME_EXPORT_QUERY = """
+    SELECT
+        rs.submit_id, rs.uid, rs.submit_time, rs.status,
+        rsn.status_name, r.name AS recruit_name,
+        ri.first_choice, ri.second_choice, ri.self_intro, ri.skills, ri.projects, ri.awards,
+        ri.grade_point, ri.grade_rank, ri.additional_file_path, ri.additional_file_name,
+        ui.realname, ui.gender, ui.student_id, ui.department, ui.major, ui.grade,
+        up.phone_number, u.mail,
+        rh.real_head_img_path
+    FROM
+        resume_submit AS rs
+    LEFT JOIN resume_info AS ri ON rs.submit_id = ri.submit_id
+    LEFT JOIN resume_status_names AS rsn ON rs.status = rsn.status_id
+    LEFT JOIN recruit AS r ON rs.recruit_id = r.recruit_id
+    LEFT JOIN userinfo AS ui ON rs.uid = ui.uid
+    LEFT JOIN userphone AS up ON rs.uid = up.uid
+    LEFT JOIN `user` AS u ON rs.uid = u.uid
+    LEFT JOIN resume_user_real_head_img AS rh ON rs.submit_id = rh.submit_id
+"""
+
+RESUME_SUMMARY_FIELDS = [
+    ('姓名', 'realname'), ('性别', 'gender'), ('学号', 'student_id'), ('学院', 'department'), ('专业', 'major'),
+    ('年级', 'grade'), ('手机', 'phone_number'), ('邮箱', 'mail'), ('招聘', 'recruit_name'), ('提交时间', 'submit_time'),
+    ('状态', 'status_name'), ('第一志愿', 'first_choice'), ('第二志愿', 'second_choice'), ('绩点', 'grade_point'),
+    ('排名', 'grade_rank'), ('自我介绍', 'self_intro'), ('技能', 'skills'), ('项目经历', 'projects'), ('获奖经历', 'awards'),
+]
+
+def _safe_zip_name(name):
+    """去除压缩包内文件名中的路径分隔符等字符"""
+    return ''.join('_' if c in '/\\:*?"<>|' else c for c in str(name)).strip() or 'unnamed'
+
+def _render_resume_summary(row):
+    lines = []
+    for label, key in RESUME_SUMMARY_FIELDS:
+        value = row.get(key)
+        if isinstance(value, datetime.datetime):
+            value = value.strftime('%Y-%m-%d %H:%M:%S')
+        lines.append(f"{label}: {value if value is not None else ''}")
+    return '\n'.join(lines).encode('utf-8')
+
+def _iter_resume_export_entries(query, params):
+    """
+    为每份简历生成压缩包条目：summary.txt、正面照和附件（附件名加 attachment_ 前缀，避免与前两者重名）
+    与 stream_query 相同，在独立连接上以服务端游标逐行读取，连接持有到压缩包发送完毕
+    """
+    with SQL() as sql:
+        for row in sql.iter_query(query, params):
+            folder = _safe_zip_name(f"{row['realname'] or row['uid']}_{row['submit_id'][:8]}")
+            yield f"{folder}/summary.txt", _render_resume_summary(row)
+            if row['real_head_img_path']:
+                ext = os.path.splitext(row['real_head_img_path'])[1] or '.jpg'
+                yield f"{folder}/photo{ext}", row['real_head_img_path']
+            if row['additional_file_path']:
+                yield f"{folder}/attachment_{_safe_zip_name(row['additional_file_name'] or 'file')}", row['additional_file_path']
+
+@flask_app.route('/resume/admin/export/zip', methods=['GET'])
+async def export_resumes_zip():
+    """
+    以 ZIP 流式导出简历材料，管理员专用接口
+    查询参数（至少提供 recruit_id 或 submit_ids 之一）：
+    recruit_id 招聘ID；status 简历状态；submit_ids 以逗号分隔的简历提交ID
+    每份简历一个目录，包含 summary.txt、正面照和附件
+    """
+    if 'uid' not in session:
+        return jsonify(success=False, error="未登录"), 401
+
+    uid = session['uid']
+    with SQL() as sql:
+        permission_info = sql.fetch_one('userpermission', {'uid': uid})
+        if not is_admin_check(permission_info):
+            return jsonify(success=False, error="权限不足"), 403
+
+    recruit_id = request.args.get('recruit_id')
+    status = request.args.get('status')
+    submit_ids = [sid for sid in request.args.get('submit_ids', '').split(',') if sid]
+    if not recruit_id and not submit_ids:
+        return jsonify(success=False, error="必须提供 'recruit_id' 或 'submit_ids'"), 400
+
+    conditions, params = [], []
+    if recruit_id:
+        conditions.append("rs.recruit_id = %s")
+        params.append(recruit_id)
+    if status is not None and status != '':
+        if not status.lstrip('-').isdigit():
+            return jsonify(success=False, error="'status' 应为整数"), 400
+        conditions.append("rs.status = %s")
+        params.append(int(status))
+    if submit_ids:
+        conditions.append(f"rs.submit_id IN ({', '.join(['%s'] * len(submit_ids))})")
+        params.extend(submit_ids)
+    where = ' AND '.join(conditions)
+    query = f"{RESUME_EXPORT_QUERY} WHERE {where} ORDER BY rs.submit_time"
+
+    try:
+        # 条件只涉及 resume_submit，先计数；行和文件内容都在打包时逐条读取
+        with SQL() as sql:
+            total = sql.execute_query(f"SELECT COUNT(*) AS total FROM resume_submit AS rs WHERE {where}", tuple(params))[0]['total']
+    except Exception as e:
+        logger.error(f"导出简历时出错: {e}")
+        return jsonify(success=False, error="导出简历时出错"), 500
+    if not total:
+        return jsonify(success=False, error="没有符合条件的简历"), 404
+
+    logger.info(f"Admin {uid} exported {total} resumes as ZIP")
+    return stream_zip(_iter_resume_export_entries(query, tuple(params)), f"resumes_{recruit_id or 'selected'}")
+
 @flask_app.route('/resume/admin/batch/delete', methods=['POST'])
 async def batch_delete_resumes():
     """
@@ -73,6 +233,11 @@ async def batch_delete_resumes():
     try:
         with SQL() as sql:
             for submit_id in submit_ids:
+                # 释放附件和正面照的引用，文件由清理任务回收
+                info = sql.fetch_one('resume_info', {'submit_id': submit_id}) or {}
+                blob_store.discard(info.get('additional_file_hash'), info.get('additional_file_path'), sql=sql)
+                head = sql.fetch_one('resume_user_real_head_img', {'submit_id': submit_id}) or {}
+                blob_store.discard(head.get('real_head_img_hash'), head.get('real_head_img_path'), sql=sql)
                 sql.delete('resume_submit', {'submit_id': submit_id})
                 sql.delete('resume_info', {'submit_id': submit_id})
                 sql.delete('resume_review', {'submit_id': submit_id})
@@ -127,20 +292,26 @@ async def batch_update_resume_status():
     if not isinstance(new_status, int):
         return jsonify(success=False, error="'new_status' 应为整数"), 400
     
+    # 去重并保持原有顺序
+    submit_ids = list(dict.fromkeys(submit_ids))
+
+    changed_ids = []
     try:
         with SQL() as sql:
             status_name_record = sql.fetch_one('resume_status_names', {'status_id': new_status})
-            new_status_name = status_name_record['status_name'] if status_name_record else "未知状态"
+        new_status_name = status_name_record['status_name'] if status_name_record else "未知状态"
 
-            for submit_id in submit_ids:
-                sql.update('resume_submit', {'status': new_status}, {'submit_id': submit_id})
-                # 异步发送通知
-                await send_status_change_notification(submit_id, new_status_name)
-        return jsonify(success=True, message="简历状态批量更新成功")
+        for i in range(0, len(submit_ids), STATUS_UPDATE_CHUNK_SIZE):
+            chunk = submit_ids[i:i + STATUS_UPDATE_CHUNK_SIZE]
+            changed_ids.extend(_update_status_chunk(chunk, new_status, new_status_name))
+        return jsonify(success=True, message="简历状态批量更新成功",
+                       changed_ids=changed_ids, unchanged_count=len(submit_ids) - len(changed_ids))
     except Exception as e:
-        logger.error(f"批量更新简历状态时出错: {e}")
-        return jsonify(success=False, error="批量更新简历状态时出错"), 500
-    
+        logger.error(f"批量更新简历状态时出错（已提交 {len(changed_ids)} 份）: {e}")
+        # 每批在独立事务中提交，出错前已完成的批次不会回滚，返回这些简历以便管理员确认实际生效的范围
+        return jsonify(success=False, error="批量更新简历状态时出错，部分简历可能已更新",
+                       changed_ids=changed_ids), 500
+
 @flask_app.route('/resume/admin/review/add/<submit_id>', methods=['POST'])
 async def admin_review_resume(submit_id):
     """
@@ -211,7 +382,8 @@ async def get_admin_review(submit_id):
         with SQL() as sql:
             review_info = sql.fetch_all('resume_review', {'submit_id': submit_id})
             if review_info:
-                return jsonify(success=True, data=review_info)
+                # 原样返回的行保持 HTTP-date 格式的 review_time
+                return jsonify(success=True, data=[with_http_dates(review) for review in review_info])
             else:
                 return jsonify(success=False, error="未找到审核信息"), 404
     except Exception as e:
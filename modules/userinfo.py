@@ -1,9 +1,9 @@
 import os
 from flask import request, jsonify, session, send_file
-from core.global_params import flask_app
+from core.global_params import flask_app, image_processor, file_sender, blob_store
 import logging
 
-from utils import SQL, is_admin_check
+from utils import SQL, is_admin_check, InvalidImageError, resolve_image_variant, image_mimetype, accepts_webp, IMAGE_PROFILES, with_http_dates
 
 logger = logging.getLogger(__name__)
 
@@ -36,26 +36,34 @@ async def get_user_info():
             permission = True
         user_info['permission'] = permission
     
-    return jsonify(success=True, data=user_info)
+    # 原样返回的行保持 HTTP-date 格式的 registration_time
+    return jsonify(success=True, data=with_http_dates(user_info))
 
 @flask_app.route('/user/avatar/get', methods=['GET'])
 async def get_user_avatar():
     """
-    获取当前登录用户的头像
+    获取当前登录用户的头像，可通过 ?size=small|medium|large 选择尺寸，客户端支持时返回 WebP
     """
     uid = session.get('uid')
     if not uid:
         return jsonify(success=False, error="用户未登录"), 401
 
+    size = request.args.get('size')
+    if size and size not in IMAGE_PROFILES['avatar']:
+        return jsonify(success=False, error="无效的尺寸参数"), 400
+
     with SQL() as sql:
         avatar_info = sql.fetch_one('useravatar', {'uid': uid})
 
     if avatar_info and avatar_info.get('avatar_path') and os.path.exists(avatar_info['avatar_path']):
-        return send_file(os.path.join(os.getcwd(), avatar_info['avatar_path']), mimetype='image/jpeg')
+        avatar_path = resolve_image_variant(avatar_info['avatar_path'], size, accepts_webp(request.accept_mimetypes))
+        response = file_sender.send(avatar_path, mimetype=image_mimetype(avatar_path), content_hash=avatar_info.get('avatar_hash'))
+        response.vary.add('Accept')
+        return response
     else:
         # 如果没有头像记录或路径为空/文件不存在，也返回默认头像
         try:
-            return send_file(os.path.join(os.getcwd(), 'avatars/default.jpg'), mimetype='image/jpeg')
+            return file_sender.send('avatars/default.jpg', mimetype='image/jpeg')
         except FileNotFoundError:
             return jsonify(success=False, error="默认头像未找到"), 404
 
@@ -122,23 +130,22 @@ async def update_user_avatar():
     if not avatar_file.filename.lower().endswith(('.png', '.jpg', '.jpeg', '.gif')):
         return jsonify(success=False, error="不支持的文件类型"), 400
 
-    avatar_dir = 'avatars'
-    os.makedirs(avatar_dir, exist_ok=True)
-    
-    # 使用一个更安全的文件名
-    file_extension = os.path.splitext(avatar_file.filename)[1]
-    avatar_path = os.path.join(avatar_dir, f'{uid}{file_extension}')
-    
-    avatar_file.save(avatar_path)
+    # 解码、去除 EXIF 并生成各尺寸变体，按内容哈希保存
+    try:
+        avatar_hash, avatar_path = await blob_store.store_image_upload(avatar_file, image_processor, 'avatar')
+    except InvalidImageError:
+        return jsonify(success=False, error="头像文件无法识别，请上传有效的图片"), 400
 
     try:
         with SQL() as sql:
             avatar_record = sql.fetch_one('useravatar', {'uid': uid})
             if avatar_record:
-                sql.update('useravatar', {'avatar_path': avatar_path}, {'uid': uid})
+                sql.update('useravatar', {'avatar_path': avatar_path, 'avatar_hash': avatar_hash}, {'uid': uid})
+                blob_store.discard(avatar_record.get('avatar_hash'), avatar_record.get('avatar_path'), sql=sql)
             else:
-                sql.insert('useravatar', {'uid': uid, 'avatar_path': avatar_path})
+                sql.insert('useravatar', {'uid': uid, 'avatar_path': avatar_path, 'avatar_hash': avatar_hash})
         return jsonify(success=True, message="头像更新成功", path=avatar_path)
     except Exception as e:
+        blob_store.release(avatar_hash)
         logger.error(f"更新用户头像时出错: {e}")
         return jsonify(success=False, error="头像更新失败"), 500
@@ -1,8 +1,26 @@
 from .sql import SQL, DatabaseManager
-from .mail import Mailer
+from .loop import BackgroundLoop, run_in_thread_loop, use_thread_event_loops
+from .http import HttpClient, HttpResponse
+from .throttle import TokenBucket
+from .mail import Mailer, MailerPool
 from .redis import RedisClient
+from .session import RedisSessionInterface
+from .rate_limit import RateLimiter
+from .password import PasswordHasher
+from .verification import VerificationCodeService, VerificationCooldown, VERIFY_OK, VERIFY_MISMATCH, VERIFY_EXPIRED, VERIFY_LOCKED
 from .admin import is_admin_check
-from .sms import SmsBao
-from .notification import send_application_submission_email, send_interview_booking_email, send_status_change_notification, send_interview_cancellation_email
+from .sms import SmsBao, AsyncSmsBao
+from .image import ImageProcessor, InvalidImageError, resolve_image_variant, remove_image_variants, image_mimetype, accepts_webp, IMAGE_PROFILES
+from .file_response import FileSender
+from .json_provider import FastJSONProvider, json_default, with_http_dates
+from .compression import Compressor
+from .metrics import RequestMetrics, monitor_loop_lag, watch_loop_lag
+from .watchdog import LoopWatchdog
+from .profiler import RequestProfiler
+from .upload import SpoolingRequest, SpooledUpload
+from .storage import BlobStore
+from .stream import get_stream_format, stream_rows, stream_query, stream_zip
+from .outbox import enqueue_notification, OutboxWorker, PartialFailure
+from .notification import send_application_submission_email, send_interview_booking_email, send_status_change_notification, send_status_change_notifications, send_interview_cancellation_email
 
-__all__ = ['SQL', 'DatabaseManager', 'Mailer', 'RedisClient', 'is_admin_check', 'SmsBao', 'send_application_submission_email', 'send_interview_booking_email', 'send_status_change_notification' , 'send_interview_cancellation_email']
\ No newline at end of file
+__all__ = ['SQL', 'DatabaseManager', 'BackgroundLoop', 'run_in_thread_loop', 'use_thread_event_loops', 'HttpClient', 'HttpResponse', 'TokenBucket', 'Mailer', 'MailerPool', 'RedisClient', 'RedisSessionInterface', 'RateLimiter', 'PasswordHasher', 'VerificationCodeService', 'VerificationCooldown', 'VERIFY_OK', 'VERIFY_MISMATCH', 'VERIFY_EXPIRED', 'VERIFY_LOCKED', 'is_admin_check', 'SmsBao', 'AsyncSmsBao', 'ImageProcessor', 'InvalidImageError', 'resolve_image_variant', 'remove_image_variants', 'image_mimetype', 'accepts_webp', 'IMAGE_PROFILES', 'FileSender', 'FastJSONProvider', 'json_default', 'with_http_dates', 'Compressor', 'RequestMetrics', 'monitor_loop_lag', 'watch_loop_lag', 'LoopWatchdog', 'RequestProfiler', 'SpoolingRequest', 'SpooledUpload', 'BlobStore', 'get_stream_format', 'stream_rows', 'stream_query', 'stream_zip', 'enqueue_notification', 'OutboxWorker', 'PartialFailure', 'send_application_submission_email', 'send_interview_booking_email', 'send_status_change_notification', 'send_status_change_notifications', 'send_interview_cancellation_email']
\ No newline at end of file
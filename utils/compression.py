@@ -0,0 +1,141 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+import gzip
+import zlib
+from typing import Iterable, Optional
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖，未安装时只提供 gzip
+    brotli = None
+
+# 值得压缩的响应类型；图片、ZIP、PDF 等本身已压缩的文件不在其中
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/x-ndjson',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml',
+    'text/csv',
+    'text/html',
+    'text/plain',
+    'text/css',
+    'text/xml',
+}
+
+
+class _GzipStream:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        # SYNC_FLUSH 保证每个分块都能立即被客户端解压，流式响应不会被压缩缓冲拖住
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _BrotliStream:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class Compressor:
+    """
+    按 Accept-Encoding 协商的响应压缩（brotli 优先，其次 gzip）。
+    - 普通响应小于 min_size 字节时不压缩；
+    - 流式响应（NDJSON/CSV 导出）逐块压缩并立即刷新；
+    - send_file 等直通响应、sendfile 卸载的响应、已带 Content-Encoding 或 no-transform 的响应不处理，
+      非文本类型（图片、ZIP、PDF 等）也不处理。
+    """
+
+    def __init__(self, min_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4,
+                 mimetypes: Optional[Iterable[str]] = None):
+        """
+        :param min_size: 压缩的最小响应体字节数
+        :param gzip_level: 动态响应的 gzip 压缩级别（1-9）
+        :param brotli_quality: 动态响应的 brotli 质量（0-11）
+        :param mimetypes: 需要压缩的 MIME 类型，默认为 COMPRESSIBLE_MIMETYPES
+        """
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.mimetypes = set(mimetypes) if mimetypes is not None else set(COMPRESSIBLE_MIMETYPES)
+
+    def init_app(self, app):
+        app.after_request(self.after_request)
+
+    @property
+    def encodings(self):
+        return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+    def _choose_encoding(self) -> Optional[str]:
+        return request.accept_encodings.best_match(self.encodings)
+
+    def _should_compress(self, response: Response) -> bool:
+        if response.status_code < 200 or response.status_code in (204, 206, 304):
+            return False
+        if request.method == 'HEAD' or response.direct_passthrough:
+            return False
+        if 'Content-Encoding' in response.headers or 'X-Accel-Redirect' in response.headers or 'X-Sendfile' in response.headers:
+            return False
+        if response.cache_control.no_transform:
+            return False
+        return response.mimetype in self.mimetypes
+
+    def _compress(self, data: bytes, encoding: str) -> bytes:
+        if encoding == 'br':
+            return brotli.compress(data, quality=self.brotli_quality)
+        return gzip.compress(data, compresslevel=self.gzip_level, mtime=0)
+
+    def _compress_stream(self, chunks: Iterable, encoding: str, charset: str):
+        stream = _BrotliStream(self.brotli_quality) if encoding == 'br' else _GzipStream(self.gzip_level)
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode(charset)
+                data = stream.compress(chunk)
+                if data:
+                    yield data
+            yield stream.finish()
+        finally:
+            # 关闭原始迭代器，使其中的数据库游标等资源得到释放
+            close = getattr(chunks, 'close', None)
+            if close is not None:
+                close()
+
+    def after_request(self, response: Response) -> Response:
+        if not self._should_compress(response):
+            return response
+        # 是否压缩取决于请求头，缓存必须区分
+        response.vary.add('Accept-Encoding')
+        encoding = self._choose_encoding()
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            charset = response.mimetype_params.get('charset', 'utf-8')
+            response.response = self._compress_stream(response.response, encoding, charset)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < self.min_size:
+                return response
+            response.set_data(self._compress(data, encoding))
+
+        response.headers['Content-Encoding'] = encoding
+        if response.headers.get('ETag') and not response.headers['ETag'].startswith('W/'):
+            # 压缩后的表示与原始内容字节不同，强 ETag 需要区分
+            etag, _ = response.get_etag()
+            response.set_etag(f'{etag}-{encoding}')
+        return response
@@ -0,0 +1,135 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+import hashlib
+import mimetypes
+import os
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Optional
+from urllib.parse import quote
+
+from flask import Response, request, send_file
+
+# 计算内容哈希时每次读取的字节数
+HASH_CHUNK_SIZE = 1024 * 1024
+
+SENDFILE_MODES = ('x-accel', 'x-sendfile')
+
+
+def _disposition_filename(filename: str) -> dict:
+    """与 send_file 相同：非 ASCII 文件名同时提供 filename*（RFC 2231）。"""
+    try:
+        filename.encode('ascii')
+        return {'filename': filename}
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize('NFKD', filename).encode('ascii', 'ignore').decode('ascii')
+        return {'filename': simple, 'filename*': f"UTF-8''{quote(filename, safe='')}"}
+
+
+class FileSender:
+    """
+    带条件请求与 sendfile 卸载的文件响应。
+    - ETag 为文件内容的 SHA-256（强校验）；调用方传入已保存的内容哈希时直接由哈希和变体后缀生成，
+      否则（旧数据）读取文件计算，并按 (路径, mtime, 大小) 缓存，文件不变时不会重复计算；
+    - 请求头 If-None-Match 命中时直接返回 304，不打开文件；
+    - mode 为 'x-accel' 时返回 X-Accel-Redirect（nginx），为 'x-sendfile' 时返回 X-Sendfile（Apache/lighttpd），
+      由前端服务器读取并发送文件内容，Python 进程只负责权限校验。
+    """
+
+    def __init__(self, mode: Optional[str] = None, accel_prefix: str = '/protected/', root: Optional[str] = None,
+                 max_age: int = 300, etag_cache_size: int = 4096):
+        """
+        :param mode: None、'x-accel' 或 'x-sendfile'
+        :param accel_prefix: nginx 中映射到 root 的 internal location 前缀
+        :param root: 文件相对路径的根目录，默认为当前工作目录
+        :param max_age: 默认的 Cache-Control max-age（秒），0 表示每次都需要重新验证
+        :param etag_cache_size: 缓存的 ETag 条目数上限
+        """
+        if mode and mode not in SENDFILE_MODES:
+            raise ValueError(f"不支持的 sendfile 模式: {mode}")
+        self.mode = mode or None
+        self.accel_prefix = '/' + accel_prefix.strip('/') + '/'
+        self.root = os.path.abspath(root or os.getcwd())
+        self.max_age = max_age
+        self.etag_cache_size = etag_cache_size
+        self._etags: 'OrderedDict[tuple, str]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _hash_file(self, path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def etag_for(self, path: str, stat: Optional[os.stat_result] = None) -> str:
+        """返回文件内容的 ETag，文件未变化时使用缓存。"""
+        stat = stat or os.stat(path)
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            etag = self._etags.get(key)
+            if etag is not None:
+                self._etags.move_to_end(key)
+                return etag
+        etag = self._hash_file(path)
+        with self._lock:
+            self._etags[key] = etag
+            while len(self._etags) > self.etag_cache_size:
+                self._etags.popitem(last=False)
+        return etag
+
+    def _etag(self, abs_path: str, content_hash: Optional[str]) -> str:
+        if content_hash:
+            name = os.path.basename(abs_path)
+            # BlobStore 的文件名以内容哈希开头，其余部分为图片变体后缀（如 _avatar_small.webp），无需读取文件
+            if name.startswith(content_hash):
+                return content_hash + name[len(content_hash):]
+        return self.etag_for(abs_path)
+
+    def _apply_cache_headers(self, response: Response, etag: str, max_age: int):
+        response.set_etag(etag)
+        response.cache_control.private = True
+        if max_age > 0:
+            response.cache_control.max_age = max_age
+        else:
+            response.cache_control.no_cache = True
+        response.vary.add('Cookie')
+
+    def send(self, path: str, mimetype: Optional[str] = None, as_attachment: bool = False,
+             download_name: Optional[str] = None, max_age: Optional[int] = None,
+             content_hash: Optional[str] = None) -> Response:
+        """
+        发送文件。调用方应在此之前完成权限校验并确认文件存在。
+
+        :param path: 文件路径（相对于 root 或绝对路径）
+        :param max_age: 覆盖默认的 max-age
+        :param content_hash: 数据库中保存的内容哈希（BlobStore 的文件名），为空时读取文件计算
+        """
+        abs_path = os.path.abspath(os.path.join(self.root, path))
+        etag = self._etag(abs_path, content_hash)
+        max_age = self.max_age if max_age is None else max_age
+
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+            self._apply_cache_headers(response, etag, max_age)
+            return response
+
+        mimetype = mimetype or mimetypes.guess_type(download_name or abs_path)[0] or 'application/octet-stream'
+        if self.mode:
+            response = Response(mimetype=mimetype)
+            if self.mode == 'x-accel':
+                relative = os.path.relpath(abs_path, self.root).replace(os.sep, '/')
+                response.headers['X-Accel-Redirect'] = quote(self.accel_prefix + relative)
+            else:
+                response.headers['X-Sendfile'] = abs_path
+            if as_attachment or download_name:
+                filename = download_name or os.path.basename(abs_path)
+                response.headers.set('Content-Disposition', 'attachment' if as_attachment else 'inline',
+                                     **_disposition_filename(filename))
+        else:
+            response = send_file(abs_path, mimetype=mimetype, as_attachment=as_attachment,
+                                 download_name=download_name, etag=False, conditional=True, max_age=None)
+        self._apply_cache_headers(response, etag, max_age)
+        return response
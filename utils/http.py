@@ -0,0 +1,98 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+import asyncio
+import json
+import logging
+from typing import Any, Dict, Optional
+
+import aiohttp
+from multidict import CIMultiDict
+
+from .loop import BackgroundLoop
+
+logger = logging.getLogger(__name__)
+
+
+class HttpResponse:
+    """HttpClient 的响应结果。响应体在后台事件循环中已完整读取，可以在任意事件循环中使用。"""
+
+    def __init__(self, status: int, headers: 'CIMultiDict[str]', body: bytes, charset: Optional[str] = None):
+        self.status = status
+        # 响应头名称不区分大小写
+        self.headers = headers
+        self.body = body
+        self.charset = charset or 'utf-8'
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+    def text(self) -> str:
+        return self.body.decode(self.charset, errors='replace')
+
+    def json(self) -> Any:
+        return json.loads(self.text())
+
+
+class HttpClient:
+    """
+    应用级共享的 HTTP 客户端。
+    会话常驻在后台事件循环 (BackgroundLoop) 中，复用 keep-alive 连接并缓存 DNS 解析结果，
+    避免每次请求都重新建立 TCP/TLS 连接。可以在任意事件循环中调用。
+    """
+
+    def __init__(self, background_loop: Optional[BackgroundLoop] = None, limit: int = 100,
+                 limit_per_host: int = 10, ttl_dns_cache: int = 300, timeout: float = 10):
+        """
+        :param background_loop: 运行 HTTP 会话的后台事件循环
+        :param limit: 连接总数上限
+        :param limit_per_host: 每个主机的连接数上限
+        :param ttl_dns_cache: DNS 缓存时间（秒）
+        :param timeout: 单个请求的总超时时间（秒）
+        """
+        self.background_loop = background_loop or BackgroundLoop(name='http-client')
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.ttl_dns_cache = ttl_dns_cache
+        self.timeout = timeout
+        # 以下状态只在后台事件循环中访问
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """返回后台事件循环中的常驻会话，必要时（首次使用、fork 或会话关闭后）重新创建。"""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host,
+                                             ttl_dns_cache=self.ttl_dns_cache)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout))
+            self._session_loop = loop
+        return self._session
+
+    async def _request(self, method: str, url: str, **kwargs) -> HttpResponse:
+        async with self._get_session().request(method, url, **kwargs) as response:
+            body = await response.read()
+            return HttpResponse(response.status, CIMultiDict(response.headers), body, response.charset)
+
+    async def request(self, method: str, url: str, **kwargs) -> HttpResponse:
+        """
+        发送请求并读取完整的响应体。
+
+        :param kwargs: 传给 aiohttp.ClientSession.request 的参数（params、headers、data 等）
+        :raises aiohttp.ClientError, asyncio.TimeoutError: 网络错误或超时
+        """
+        return await self.background_loop.run(self._request(method, url, **kwargs))
+
+    async def get(self, url: str, params: Optional[Dict[str, Any]] = None,
+                  headers: Optional[Dict[str, str]] = None) -> HttpResponse:
+        return await self.request('GET', url, params=params, headers=headers)
+
+    async def _close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    def close(self):
+        """关闭常驻的 HTTP 会话。"""
+        if self._session is not None:
+            self.background_loop.run_sync(self._close(), timeout=10)
@@ -0,0 +1,217 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+import asyncio
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow 为可选依赖，缺失时按原样保存可识别格式的上传图片
+    Image = None
+    ImageOps = None
+
+logger = logging.getLogger(__name__)
+
+# 各类图片生成的尺寸档位（最长边像素）
+IMAGE_PROFILES: Dict[str, Dict[str, int]] = {
+    'avatar': {'small': 64, 'medium': 256, 'large': 512},
+    'photo': {'small': 160, 'medium': 480, 'large': 1080},
+}
+DEFAULT_SIZE = 'large'
+IMAGE_FORMATS = {'jpg': 'JPEG', 'webp': 'WEBP'}
+IMAGE_MIMETYPES = {'jpg': 'image/jpeg', 'jpeg': 'image/jpeg', 'png': 'image/png', 'gif': 'image/gif', 'webp': 'image/webp'}
+# 解码前的像素数上限，防止解压炸弹
+MAX_IMAGE_PIXELS = 40_000_000
+# 未安装 Pillow 时按文件头识别格式: (扩展名, 偏移, 魔数)
+IMAGE_SIGNATURES = (
+    ('jpg', 0, b'\xff\xd8\xff'),
+    ('png', 0, b'\x89PNG\r\n\x1a\n'),
+    ('gif', 0, b'GIF87a'),
+    ('gif', 0, b'GIF89a'),
+    ('webp', 8, b'WEBP'),
+)
+
+
+class InvalidImageError(ValueError):
+    """上传的文件无法被解码为图片。"""
+
+
+def variant_path(base: str, size: str, ext: str = 'jpg') -> str:
+    """返回某个尺寸、格式的图片变体路径，如 photos/<id>_real_large.jpg。"""
+    return f"{base}_{size}.{ext}"
+
+
+def sniff_image_type(data: bytes) -> Optional[str]:
+    """根据文件头返回图片扩展名，无法识别时返回 None。"""
+    for ext, offset, magic in IMAGE_SIGNATURES:
+        if data[offset:offset + len(magic)] == magic and (ext != 'webp' or data[:4] == b'RIFF'):
+            return ext
+    return None
+
+
+def find_stored_image(base: str) -> Optional[str]:
+    """返回已处理过的图片中应写入数据库的路径（最大尺寸的 JPEG，或未安装 Pillow 时按原格式保存的文件），不存在时返回 None。"""
+    for ext in dict.fromkeys(['jpg'] + [ext for ext, _, _ in IMAGE_SIGNATURES]):
+        path = variant_path(base, DEFAULT_SIZE, ext)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def _split_variant(stored_path: str):
+    """从数据库中保存的路径解析出 (base, size)；旧数据（未处理的原图）返回 (None, None)。"""
+    root, _ = os.path.splitext(stored_path)
+    for sizes in IMAGE_PROFILES.values():
+        for size in sizes:
+            if root.endswith(f"_{size}"):
+                return root[:-len(size) - 1], size
+    return None, None
+
+
+def resolve_image_variant(stored_path: str, size: Optional[str] = None, accept_webp: bool = False) -> str:
+    """
+    根据请求的尺寸和客户端是否支持 WebP，返回实际要发送的文件路径。
+    找不到对应变体（或为处理前上传的旧图片）时返回 stored_path 本身。
+    """
+    base, _ = _split_variant(stored_path)
+    if base is None:
+        return stored_path
+    size = size or DEFAULT_SIZE
+    candidates = [variant_path(base, size, 'webp')] if accept_webp else []
+    candidates.append(variant_path(base, size, 'jpg'))
+    for path in candidates:
+        if os.path.isfile(path):
+            return path
+    return stored_path
+
+
+def accepts_webp(accept_mimetypes) -> bool:
+    """客户端是否在 Accept 头中明确声明支持 WebP（仅有 */* 不算）。"""
+    return any(value == 'image/webp' and quality > 0 for value, quality in accept_mimetypes)
+
+
+def image_mimetype(path: str) -> str:
+    ext = os.path.splitext(path)[1].lstrip('.').lower()
+    return IMAGE_MIMETYPES.get(ext, 'application/octet-stream')
+
+
+def remove_image_variants(stored_path: str):
+    """删除一张图片的所有变体（以及旧格式的原图）。"""
+    paths = {stored_path}
+    base, _ = _split_variant(stored_path)
+    if base is not None:
+        for sizes in IMAGE_PROFILES.values():
+            for size in sizes:
+                for ext in IMAGE_FORMATS:
+                    paths.add(variant_path(base, size, ext))
+    for path in paths:
+        if path and os.path.isfile(path):
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.warning(f"删除图片 {path} 失败: {e}")
+
+
+def _write_atomic(path: str, data: bytes):
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _render_variants(data: bytes, base: str, sizes: Dict[str, int], jpeg_quality: int, webp_quality: int) -> str:
+    """
+    在进程池中执行：解码、按 EXIF 方向旋转、去除元数据、缩放并重新编码为 JPEG/WebP。
+    返回最大尺寸 JPEG 的路径。
+    """
+    Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            img.seek(0)
+            img = ImageOps.exif_transpose(img)
+            if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+                img = img.convert('RGBA')
+                background = Image.new('RGB', img.size, (255, 255, 255))
+                background.paste(img, mask=img.getchannel('A'))
+                img = background
+            elif img.mode != 'RGB':
+                img = img.convert('RGB')
+    except (OSError, SyntaxError, Image.DecompressionBombError) as e:
+        raise InvalidImageError(f"无法解析图片: {e}")
+
+    os.makedirs(os.path.dirname(base) or '.', exist_ok=True)
+    largest = None
+    for size, edge in sorted(sizes.items(), key=lambda item: item[1], reverse=True):
+        variant = img.copy()
+        variant.thumbnail((edge, edge), Image.LANCZOS)
+        # 不传 exif 参数，编码结果中不包含任何原始元数据
+        buffer = io.BytesIO()
+        variant.save(buffer, 'JPEG', quality=jpeg_quality, optimize=True, progressive=True)
+        _write_atomic(variant_path(base, size, 'jpg'), buffer.getvalue())
+        buffer = io.BytesIO()
+        variant.save(buffer, 'WEBP', quality=webp_quality, method=4)
+        _write_atomic(variant_path(base, size, 'webp'), buffer.getvalue())
+        if largest is None:
+            largest = variant_path(base, size, 'jpg')
+    return largest
+
+
+class ImageProcessor:
+    """
+    上传图片处理器。解码和编码都是 CPU 密集型操作，放在独立的进程池中执行，
+    不占用请求线程，也不受 GIL 影响。
+    进程池在首次使用时创建（fork 之后会重新创建），未安装 Pillow 时退化为按原样保存，并保留文件头识别出的格式。
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, jpeg_quality: int = 85, webp_quality: int = 80):
+        self.max_workers = max_workers
+        self.jpeg_quality = jpeg_quality
+        self.webp_quality = webp_quality
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        return Image is not None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                self._pid = os.getpid()
+            return self._executor
+
+    async def save(self, data: bytes, base: str, profile: str = 'photo') -> str:
+        """
+        处理图片并保存全部尺寸变体，返回应写入数据库的路径（最大尺寸的 JPEG；未安装 Pillow 时为按原格式保存的文件）。
+
+        :param data: 上传文件的原始字节
+        :param base: 不含尺寸和扩展名的目标路径，如 photos/<submit_id>_real
+        :param profile: IMAGE_PROFILES 中的档位名称
+        :raises InvalidImageError: 文件无法解析为图片（未安装 Pillow 时为不是 JPEG/PNG/GIF/WebP）
+        """
+        if not self.available:
+            ext = sniff_image_type(data)
+            if ext is None:
+                raise InvalidImageError("无法识别的图片格式")
+            logger.warning("未安装 Pillow，图片将按原样保存。")
+            path = variant_path(base, DEFAULT_SIZE, ext)
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            await asyncio.to_thread(_write_atomic, path, data)
+            return path
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._get_executor(), _render_variants,
+            data, base, IMAGE_PROFILES[profile], self.jpeg_quality, self.webp_quality
+        )
+
+    def shutdown(self):
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=False)
+        self._executor = None
@@ -0,0 +1,103 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+import dataclasses
+import datetime
+import decimal
+import json
+import uuid
+from typing import Any, Dict
+
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，未安装时退回标准库 json
+    orjson = None
+
+
+def json_default(obj: Any) -> Any:
+    """
+    标准 JSON 类型以外的值的序列化方式。
+    datetime 统一输出为 '%Y-%m-%d %H:%M:%S'（与接口一贯的格式一致），视图无需逐行 strftime。
+    原样返回数据库行的旧接口使用 with_http_dates() 保持原来的 HTTP-date 格式。
+    """
+    if isinstance(obj, datetime.datetime):
+        return obj.isoformat(' ', 'seconds')
+    if isinstance(obj, datetime.date):
+        return obj.isoformat()
+    if isinstance(obj, datetime.time):
+        return obj.isoformat('seconds')
+    if isinstance(obj, datetime.timedelta):
+        # MySQL 的 TIME 列
+        return str(obj)
+    if isinstance(obj, (decimal.Decimal, uuid.UUID)):
+        return str(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, bytes):
+        return obj.decode('utf-8', errors='replace')
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def with_http_dates(row: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    将行中的 datetime/date 转为 HTTP-date（如 'Mon, 19 Oct 2026 10:17:23 GMT'）。
+    原样返回数据库行的接口在更换 JSON 提供者之前由 Flask 默认提供者输出该格式，前端按此解析，保持不变。
+    """
+    return {key: http_date(value) if isinstance(value, datetime.date) else value for key, value in row.items()}
+
+
+# orjson 的选项：datetime 交给 json_default 处理以保持统一格式；允许 int 等非字符串键
+_ORJSON_OPTION = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS if orjson is not None else 0
+
+
+def dumps(obj: Any) -> str:
+    """紧凑的 JSON 序列化（不转义中文），供流式输出等不经过 Flask 的场景使用。"""
+    if orjson is None:
+        return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=json_default)
+    return orjson.dumps(obj, default=json_default, option=_ORJSON_OPTION).decode('utf-8')
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    基于 orjson 的 Flask JSON 提供者，jsonify、request.get_json 等都经由它序列化。
+    datetime/date/Decimal/UUID 的输出与 json_default 一致；未安装 orjson 时使用标准库 json，输出格式相同。
+    调试模式下的缩进输出、自定义 dumps 参数仍交给标准库处理。
+    """
+
+    default = staticmethod(json_default)
+
+    def _orjson_option(self) -> int:
+        option = _ORJSON_OPTION
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return option
+
+    def dumps_bytes(self, obj: Any) -> bytes:
+        """序列化为 UTF-8 编码的 JSON。"""
+        if orjson is None:
+            return super().dumps(obj, ensure_ascii=False).encode('utf-8')
+        return orjson.dumps(obj, default=json_default, option=self._orjson_option())
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return self.dumps_bytes(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        if orjson is None or self.compact is False or (self.compact is None and self._app.debug):
+            # 需要缩进输出时沿用默认实现
+            return super().response(obj)
+        return self._app.response_class(self.dumps_bytes(obj) + b'\n', mimetype=self.mimetype)
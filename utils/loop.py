@@ -0,0 +1,137 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+import asyncio
+import concurrent.futures
+import functools
+import logging
+import os
+import threading
+from typing import Any, Callable, Coroutine, List, Optional
+
+# 每个线程常驻的事件循环，见 use_thread_event_loops()
+_thread_state = threading.local()
+
+class BackgroundLoop:
+    """
+    在独立守护线程中运行的常驻事件循环。
+    Flask 的异步视图在每个请求的临时事件循环中执行，绑定在事件循环上的长连接
+    （SMTP、HTTP 会话等）无法跨请求复用，因此统一放在这个常驻循环中维护。
+    任意线程、任意事件循环都可以通过 run()/submit() 把协程交给它执行。
+    """
+
+    def __init__(self, name: str = 'background-loop', logger: logging.Logger = None):
+        self.name = name
+        self.logger = logger or logging.getLogger(__name__)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self._start_callbacks: List[Callable[[asyncio.AbstractEventLoop], Any]] = []
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """返回后台事件循环，首次访问（或 fork 之后）时自动启动。"""
+        if self._loop is None or self._pid != os.getpid() or not self._thread.is_alive():
+            self.start()
+        return self._loop
+
+    def start(self):
+        """启动后台线程及其事件循环。重复调用是安全的。"""
+        with self._lock:
+            # fork 出的子进程不会继承线程，需要重新创建事件循环
+            if self._loop is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def _run():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+
+            thread = threading.Thread(target=_run, name=self.name, daemon=True)
+            thread.start()
+            ready.wait()
+            self._loop = loop
+            self._thread = thread
+            self._pid = os.getpid()
+            for callback in self._start_callbacks:
+                loop.call_soon_threadsafe(callback, loop)
+            self.logger.info(f"Background event loop '{self.name}' started.")
+
+    def on_start(self, callback: Callable[[asyncio.AbstractEventLoop], Any]):
+        """
+        注册在后台事件循环中执行的启动回调，参数为事件循环，可在其中创建常驻任务。
+        不会因注册而启动循环；循环每次启动（包括 fork 之后重新启动）时都会调用。
+        """
+        with self._lock:
+            self._start_callbacks.append(callback)
+            if self._loop is not None and self._pid == os.getpid() and self._thread.is_alive():
+                self._loop.call_soon_threadsafe(callback, self._loop)
+
+    def is_current(self) -> bool:
+        """当前代码是否正运行在后台事件循环之中。"""
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def submit(self, coro: Coroutine) -> concurrent.futures.Future:
+        """将协程提交到后台事件循环执行，立即返回 concurrent.futures.Future（不等待结果）。"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    async def run(self, coro: Coroutine) -> Any:
+        """在后台事件循环中执行协程，并在调用方的事件循环中等待其结果。"""
+        if self.is_current():
+            return await coro
+        return await asyncio.wrap_future(self.submit(coro))
+
+    def run_sync(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """在同步代码中执行协程并阻塞等待结果。"""
+        return self.submit(coro).result(timeout)
+
+    def stop(self):
+        """停止后台事件循环。"""
+        with self._lock:
+            if self._loop is not None and self._loop.is_running():
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join(timeout=5)
+            self._loop = None
+            self._thread = None
+
+
+def _thread_event_loop() -> asyncio.AbstractEventLoop:
+    loop = getattr(_thread_state, 'loop', None)
+    if loop is None or loop.is_closed() or getattr(_thread_state, 'pid', None) != os.getpid():
+        loop = asyncio.new_event_loop()
+        _thread_state.loop = loop
+        _thread_state.pid = os.getpid()
+    return loop
+
+
+def run_in_thread_loop(coro: Coroutine) -> Any:
+    """在当前线程常驻的事件循环中执行协程并返回结果。当前线程不能已有正在运行的事件循环。"""
+    return _thread_event_loop().run_until_complete(coro)
+
+
+def use_thread_event_loops(app):
+    """
+    让 Flask 的异步视图在所属工作线程的常驻事件循环中执行，而不是每个请求新建并销毁一个事件循环。
+    同一线程上的请求共用一个事件循环，省去创建循环的开销，asyncio.to_thread 等使用的默认线程池也得以复用。
+    视图中的同步数据库调用仍然只阻塞所在的工作线程。
+    调用线程已有正在运行的事件循环时（如 asgiref 的主循环线程）回退到 Flask 默认的实现。
+    """
+    default_async_to_sync = app.async_to_sync
+
+    def async_to_sync(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                return run_in_thread_loop(func(*args, **kwargs))
+            return default_async_to_sync(func)(*args, **kwargs)
+        return wrapper
+
+    app.async_to_sync = async_to_sync
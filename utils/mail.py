@@ -1,12 +1,21 @@
 import asyncio
 import aiosmtplib
+import time
+from collections import deque
 from email.mime.base import MIMEBase
 from email.mime.text import MIMEText
-from typing import List, Union
+from typing import Iterable, List, Union, Optional, Tuple
 import logging
 
+from . import metrics
+from .loop import BackgroundLoop
+from .throttle import TokenBucket
+
 logger = logging.getLogger(__name__)
 
+# 服务商表示“稍后再试”的临时性响应码，收到后整体暂停发送
+SMTP_THROTTLE_CODES = (421, 450, 451, 452)
+
 class Mailer:
     """
     一个作为异步上下文管理器的邮件发送类。
@@ -62,5 +71,286 @@ class Mailer:
 
         msg['From'] = self.user
         msg['To'] = ", ".join(recipients)
-        
-        await self.server.send_message(msg)
\ No newline at end of file
+
+        start = time.perf_counter()
+        try:
+            await self.server.send_message(msg)
+        except BaseException:
+            metrics.record_send('mail', False, time.perf_counter() - start)
+            raise
+        metrics.record_send('mail', True, time.perf_counter() - start)
+
+
+class _PooledConnection:
+    """连接池中的一条已认证 SMTP 连接。"""
+    def __init__(self, server: aiosmtplib.SMTP, bucket: Optional[TokenBucket] = None):
+        self.server = server
+        self.last_used = time.monotonic()
+        self.bucket = bucket or TokenBucket(None)
+
+
+class MailerPool:
+    """
+    常驻的、已认证的 SMTP 连接池。
+    连接在后台事件循环 (BackgroundLoop) 中创建、复用和回收，因此可以被任意请求的事件循环调用。
+    - 连接在空闲超过 idle_timeout 秒后被关闭；
+    - 空闲超过 health_check_interval 秒的连接在复用前先发送 NOOP 检查；
+    - 发送时遇到连接断开会自动重连并重试一次；收到 421 以外的错误响应时发送 RSET 后把连接放回池中；
+    - 发送速率由全局和单连接两级令牌桶整形，收到服务商的限流响应后整体暂停 throttle_backoff 秒。
+    """
+    def __init__(self, host: str, port: int, user: str, password: str, use_tls: bool = True,
+                 background_loop: Optional[BackgroundLoop] = None, pool_size: int = 4,
+                 idle_timeout: float = 60, health_check_interval: float = 15, timeout: float = 30,
+                 rate_limit: Optional[float] = None, rate_burst: Optional[float] = None,
+                 connection_rate_limit: Optional[float] = None, connection_rate_burst: Optional[float] = None,
+                 throttle_backoff: float = 30):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.use_tls = use_tls
+        self.pool_size = max(1, int(pool_size))
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.timeout = timeout
+        self.background_loop = background_loop or BackgroundLoop(name='smtp-pool')
+        self.rate_limiter = TokenBucket(rate_limit, rate_burst)
+        self.connection_rate_limit = connection_rate_limit
+        self.connection_rate_burst = connection_rate_burst
+        self.throttle_backoff = throttle_backoff
+        self._queued = 0
+        # 以下状态只在后台事件循环中访问
+        self._state_loop = None
+        self._idle: deque = deque()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._reaper: Optional[asyncio.Task] = None
+
+    def _ensure_state(self):
+        """确保池状态属于当前（后台）事件循环；fork 或循环重建后会重新初始化。"""
+        loop = asyncio.get_running_loop()
+        if self._state_loop is not loop:
+            self._state_loop = loop
+            self._idle = deque()
+            self._semaphore = asyncio.Semaphore(self.pool_size)
+            self._reaper = loop.create_task(self._reap_idle())
+
+    async def _connect(self) -> _PooledConnection:
+        server = aiosmtplib.SMTP(hostname=self.host, port=self.port, use_tls=self.use_tls, timeout=self.timeout)
+        try:
+            await server.connect()
+            await server.login(self.user, self.password)
+        except aiosmtplib.SMTPException as e:
+            logger.error(f"SMTP连接失败: {e}")
+            raise ConnectionError(f"SMTP连接失败: {e}")
+        logger.info("SMTP 连接池新建连接并登录成功。")
+        return _PooledConnection(server, TokenBucket(self.connection_rate_limit, self.connection_rate_burst))
+
+    async def _close(self, conn: _PooledConnection):
+        try:
+            if conn.server.is_connected:
+                await conn.server.quit()
+        except Exception:
+            conn.server.close()
+
+    async def _is_healthy(self, conn: _PooledConnection) -> bool:
+        if not conn.server.is_connected:
+            return False
+        idle = time.monotonic() - conn.last_used
+        if idle > self.idle_timeout:
+            return False
+        if idle > self.health_check_interval:
+            try:
+                await conn.server.noop()
+            except aiosmtplib.SMTPException:
+                return False
+        return True
+
+    async def _acquire(self) -> _PooledConnection:
+        self._ensure_state()
+        await self._semaphore.acquire()
+        try:
+            # 优先复用最近使用过的连接
+            while self._idle:
+                conn = self._idle.pop()
+                if await self._is_healthy(conn):
+                    return conn
+                await self._close(conn)
+            return await self._connect()
+        except BaseException:
+            self._semaphore.release()
+            raise
+
+    async def _release(self, conn: _PooledConnection, discard: bool = False):
+        try:
+            if discard or not conn.server.is_connected:
+                await self._close(conn)
+            else:
+                conn.last_used = time.monotonic()
+                self._idle.append(conn)
+        finally:
+            self._semaphore.release()
+
+    async def _reap_idle(self):
+        """定期关闭空闲超时的连接。"""
+        while True:
+            await asyncio.sleep(max(1.0, min(self.idle_timeout, 30) / 2))
+            now = time.monotonic()
+            keep = deque()
+            while self._idle:
+                conn = self._idle.popleft()
+                if now - conn.last_used > self.idle_timeout:
+                    await self._close(conn)
+                    logger.info("SMTP 连接池关闭了一条空闲连接。")
+                else:
+                    keep.append(conn)
+            self._idle.extend(keep)
+
+    @property
+    def queue_depth(self) -> int:
+        """已提交但尚未开始投递的邮件数（在等待令牌或空闲连接）。"""
+        return self._queued
+
+    async def _acquire_shaped(self) -> _PooledConnection:
+        """取一条连接并等待该连接的令牌桶。"""
+        conn = await self._acquire()
+        try:
+            await conn.bucket.acquire()
+        except BaseException:
+            await self._release(conn)
+            raise
+        return conn
+
+    async def _reset(self, conn: _PooledConnection) -> bool:
+        """对出错的会话发送 RSET 清空信封，成功时连接可以放回池中。"""
+        if not conn.server.is_connected:
+            return False
+        try:
+            await conn.server.rset()
+        except (aiosmtplib.SMTPException, ConnectionError):
+            return False
+        return True
+
+    def _pause_if_throttled(self, codes: Iterable[int]):
+        codes = sorted(set(codes) & set(SMTP_THROTTLE_CODES))
+        if codes:
+            logger.warning(f"SMTP 服务商限流 ({', '.join(map(str, codes))})，暂停发送 {self.throttle_backoff} 秒。")
+            self.rate_limiter.pause(self.throttle_backoff)
+
+    async def _send_message(self, msg: MIMEBase):
+        self._queued += 1
+        try:
+            await self.rate_limiter.acquire()
+            conn = await self._acquire_shaped()
+        finally:
+            self._queued -= 1
+        for attempt in range(2):
+            if attempt:
+                conn = await self._acquire_shaped()
+            start = time.perf_counter()
+            try:
+                await conn.server.send_message(msg)
+            except aiosmtplib.SMTPRecipientsRefused as e:
+                # 所有收件人都被拒绝，会话本身仍然可用
+                metrics.record_send('mail', False, time.perf_counter() - start)
+                self._pause_if_throttled(recipient.code for recipient in e.recipients)
+                await self._release(conn, discard=not await self._reset(conn))
+                raise
+            except aiosmtplib.SMTPResponseException as e:
+                metrics.record_send('mail', False, time.perf_counter() - start)
+                self._pause_if_throttled((e.code,))
+                # 421 表示服务端即将关闭连接；其他错误响应只影响本封邮件，RSET 后连接可以继续使用
+                if e.code == 421:
+                    await self._release(conn, discard=True)
+                else:
+                    await self._release(conn, discard=not await self._reset(conn))
+                raise
+            except (aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPConnectError, ConnectionError):
+                # 连接在池中已失效，丢弃并用新连接重试一次
+                metrics.record_send('mail', False, time.perf_counter() - start)
+                await self._release(conn, discard=True)
+                if attempt:
+                    raise
+                continue
+            except BaseException:
+                metrics.record_send('mail', False, time.perf_counter() - start)
+                await self._release(conn, discard=True)
+                raise
+            metrics.record_send('mail', True, time.perf_counter() - start)
+            await self._release(conn)
+            return
+
+    async def send(self, targets: Union[str, List[str]], subject: str, content: str, subtype: str = 'plain'):
+        """发送简单的文本或HTML邮件。"""
+        msg = MIMEText(content, subtype, 'utf-8')
+        msg['Subject'] = subject
+        await self.send_mime(targets, msg)
+
+    async def send_mime(self, targets: Union[str, List[str]], msg: MIMEBase):
+        """通过连接池发送一个预先构建好的 MIME 对象，可在任意事件循环中调用。"""
+        if isinstance(targets, str):
+            recipients = [targets]
+        else:
+            recipients = targets
+
+        msg['From'] = self.user
+        msg['To'] = ", ".join(recipients)
+
+        await self.background_loop.run(self._send_message(msg))
+
+    async def _send_many(self, messages: List[MIMEBase]) -> List[Optional[BaseException]]:
+        return await asyncio.gather(*(self._send_message(msg) for msg in messages), return_exceptions=True)
+
+    async def send_many(self, messages: Iterable[Tuple[Union[str, List[str]], MIMEBase]]) -> List[Optional[BaseException]]:
+        """
+        批量发送 (收件人, MIME 对象) 序列，并发数受连接池大小限制。
+        返回与输入顺序一致的列表，成功为 None，失败为对应的异常。
+        """
+        prepared = []
+        for targets, msg in messages:
+            recipients = [targets] if isinstance(targets, str) else targets
+            msg['From'] = self.user
+            msg['To'] = ", ".join(recipients)
+            prepared.append(msg)
+        return await self.background_loop.run(self._send_many(prepared))
+
+    async def _close_all(self):
+        if self._reaper:
+            self._reaper.cancel()
+        while self._idle:
+            await self._close(self._idle.pop())
+
+    def close(self):
+        """关闭池中所有空闲连接。"""
+        if self._state_loop is not None:
+            self.background_loop.run_sync(self._close_all(), timeout=10)
+
+    def acquire(self) -> 'PooledMailer':
+        """返回一个与 Mailer 接口一致的异步上下文管理器，发送时使用池中的连接。"""
+        return PooledMailer(self)
+
+
+class PooledMailer:
+    """
+    MailerPool 的轻量包装，保持与 `async with Mailer(...) as mailer` 相同的用法。
+    进入/退出上下文不会建立或断开连接。
+    """
+    def __init__(self, pool: MailerPool):
+        self.pool = pool
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        return None
+
+    async def send(self, targets: Union[str, List[str]], subject: str, content: str, subtype: str = 'plain'):
+        """发送简单的文本或HTML邮件。"""
+        await self.pool.send(targets, subject, content, subtype)
+
+    async def send_mime(self, targets: Union[str, List[str]], msg: MIMEBase):
+        """发送一个预先构建好的 MIME 对象。"""
+        await self.pool.send_mime(targets, msg)
+
+    async def send_many(self, messages: Iterable[Tuple[Union[str, List[str]], MIMEBase]]) -> List[Optional[BaseException]]:
+        """批量发送 (收件人, MIME 对象) 序列，参见 MailerPool.send_many。"""
+        return await self.pool.send_many(messages)
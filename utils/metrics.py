@@ -0,0 +1,180 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+import asyncio
+import logging
+import os
+import time
+from typing import Optional, Tuple
+
+from flask import g, request
+
+try:
+    import prometheus_client
+    from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, multiprocess
+except ImportError:  # prometheus_client 为可选依赖，未安装时所有指标都是空操作
+    prometheus_client = None
+
+logger = logging.getLogger(__name__)
+
+# 多进程部署（gunicorn 多 worker、通知 worker）时，各进程把指标写入该目录，导出时汇总
+MULTIPROC_DIR_ENV = 'PROMETHEUS_MULTIPROC_DIR'
+
+# 各类耗时的分桶（秒）
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+REDIS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+DB_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10)
+SEND_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+LOOP_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+
+class _NullMetric:
+    """未安装 prometheus_client 时的占位指标，接受与真实指标相同的调用。"""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def inc(self, amount: float = 1):
+        pass
+
+    def dec(self, amount: float = 1):
+        pass
+
+    def set(self, value: float):
+        pass
+
+    def observe(self, amount: float):
+        pass
+
+
+def _metric(cls_name: str, name: str, documentation: str, labelnames=(), **kwargs):
+    if prometheus_client is None:
+        return _NullMetric()
+    cls = {'counter': Counter, 'gauge': Gauge, 'histogram': Histogram}[cls_name]
+    return cls(name, documentation, labelnames, **kwargs)
+
+
+HTTP_REQUESTS = _metric('counter', 'http_requests_total', '按路由统计的请求数', ('method', 'route', 'status'))
+HTTP_LATENCY = _metric('histogram', 'http_request_duration_seconds', '按路由统计的请求处理耗时',
+                       ('method', 'route'), buckets=HTTP_BUCKETS)
+HTTP_IN_PROGRESS = _metric('gauge', 'http_requests_in_progress', '正在处理的请求数', multiprocess_mode='livesum')
+
+DB_POOL_IN_USE = _metric('gauge', 'db_pool_connections_in_use', '已从连接池取出、尚未归还的数据库连接数',
+                         multiprocess_mode='livesum')
+DB_POOL_WAIT = _metric('histogram', 'db_pool_wait_seconds', '从连接池获取数据库连接的等待时间', buckets=DB_WAIT_BUCKETS)
+
+REDIS_LATENCY = _metric('histogram', 'redis_command_duration_seconds', 'Redis 命令耗时（流水线按整体计）',
+                        ('command',), buckets=REDIS_BUCKETS)
+REDIS_ERRORS = _metric('counter', 'redis_command_errors_total', '执行失败的 Redis 命令数', ('command',))
+
+NOTIFICATION_SENT = _metric('counter', 'notification_send_total', '邮件、短信的发送次数', ('channel', 'result'))
+NOTIFICATION_LATENCY = _metric('histogram', 'notification_send_duration_seconds', '单封邮件、单条短信的发送耗时',
+                               ('channel',), buckets=SEND_BUCKETS)
+
+LOOP_LAG = _metric('histogram', 'event_loop_lag_seconds', '事件循环定时唤醒的延迟', ('loop',), buckets=LOOP_LAG_BUCKETS)
+LOOP_BLOCKED = _metric('counter', 'event_loop_blocked_total', 'LoopWatchdog 检测到的事件循环阻塞次数', ('loop', 'route'))
+LOOP_BLOCKED_SECONDS = _metric('histogram', 'event_loop_blocked_seconds', 'LoopWatchdog 检测到的每次阻塞的总时长',
+                               ('loop',), buckets=LOOP_LAG_BUCKETS)
+
+
+def enabled() -> bool:
+    """是否真正在采集指标（已安装 prometheus_client）。"""
+    return prometheus_client is not None
+
+
+def record_send(channel: str, ok: bool, seconds: float):
+    """记录一次邮件（channel='mail'）或短信（channel='sms'）发送。"""
+    NOTIFICATION_SENT.labels(channel, 'ok' if ok else 'error').inc()
+    NOTIFICATION_LATENCY.labels(channel).observe(seconds)
+
+
+def render() -> Tuple[bytes, str]:
+    """
+    以 Prometheus 文本格式导出当前指标，返回 (内容, Content-Type)。
+    设置了 PROMETHEUS_MULTIPROC_DIR 时汇总目录中所有进程的指标，否则只导出本进程的指标。
+    """
+    if prometheus_client is None:
+        return b'', 'text/plain; charset=utf-8'
+    if os.environ.get(MULTIPROC_DIR_ENV):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+    return prometheus_client.generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid: int):
+    """多进程模式下清理已退出进程的实时 gauge（由 gunicorn 的 child_exit 调用）。"""
+    if prometheus_client is not None and os.environ.get(MULTIPROC_DIR_ENV):
+        multiprocess.mark_process_dead(pid)
+
+
+async def monitor_loop_lag(name: str, interval: float = 1.0):
+    """
+    在事件循环中常驻运行：每隔 interval 秒醒来一次，把实际唤醒时间与预期的偏差记为该循环的调度延迟。
+    循环被同步调用阻塞时，偏差即为阻塞的时长。
+    """
+    loop = asyncio.get_running_loop()
+    histogram = LOOP_LAG.labels(name)
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        histogram.observe(max(loop.time() - expected, 0.0))
+
+
+_lag_tasks = set()
+
+
+def watch_loop_lag(loop: asyncio.AbstractEventLoop, name: str, interval: float = 1.0) -> asyncio.Task:
+    """在 loop 中启动 monitor_loop_lag 常驻任务，须在 loop 所在的线程中调用（如 BackgroundLoop.on_start 的回调）。"""
+    task = loop.create_task(monitor_loop_lag(name, interval))
+    # 事件循环只弱引用任务，需要保留引用
+    _lag_tasks.add(task)
+    task.add_done_callback(_lag_tasks.discard)
+    return task
+
+
+class RequestMetrics:
+    """
+    按路由统计请求数和耗时。路由取 URL 规则（如 /recruit/<int:id>），未匹配任何路由的请求记为 <unmatched>，
+    避免扫描器的随机路径产生大量标签。
+    耗时从 before_request 计到 after_request，流式响应只计到开始发送为止。
+    """
+
+    def __init__(self, exclude_paths: Optional[Tuple[str, ...]] = ('/metrics',)):
+        self.exclude_paths = set(exclude_paths or ())
+
+    def init_app(self, app):
+        if prometheus_client is None:
+            logger.warning("未安装 prometheus_client，/metrics 不会输出任何指标。")
+            return
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        app.teardown_request(self.teardown_request)
+
+    @staticmethod
+    def _route() -> str:
+        return request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+
+    def before_request(self):
+        if request.path in self.exclude_paths:
+            return
+        g._metrics_start = time.perf_counter()
+        g._metrics_active = True
+        HTTP_IN_PROGRESS.inc()
+
+    def after_request(self, response):
+        start = g.pop('_metrics_start', None)
+        if start is not None:
+            route = self._route()
+            HTTP_LATENCY.labels(request.method, route).observe(time.perf_counter() - start)
+            HTTP_REQUESTS.labels(request.method, route, str(response.status_code)).inc()
+        return response
+
+    def teardown_request(self, exc):
+        if not g.pop('_metrics_active', False):
+            return
+        if g.pop('_metrics_start', None) is not None:
+            # 请求没有走到 after_request（处理过程中抛出了未被处理的异常），按 500 计
+            HTTP_REQUESTS.labels(request.method, self._route(), '500').inc()
+        HTTP_IN_PROGRESS.dec()
@@ -1,11 +1,14 @@
 import asyncio
+import functools
 from core.global_params import cMailer, sms_client
 from utils.sql import SQL
+from utils.outbox import PartialFailure
+from email.mime.text import MIMEText
 import logging
 
 logger = logging.getLogger(__name__)
 
-async def send_application_submission_email(uid, recruit_name, choice):
+async def send_application_submission_email(uid, recruit_name, choice, raise_on_error=False):
     """
     发送简历投递成功邮件通知
     """
@@ -23,8 +26,10 @@ async def send_application_submission_email(uid, recruit_name, choice):
             logger.info(f"成功向 {mail_to} 发送简历投递成功邮件。")
     except Exception as e:
         logger.error(f"发送简历投递邮件给 {uid} 时出错: {e}")
+        if raise_on_error:
+            raise
 
-async def send_interview_booking_email(uid, recruit_name, choice, interview_time, location):
+async def send_interview_booking_email(uid, recruit_name, choice, interview_time, location, raise_on_error=False):
     """
     发送面试预约成功邮件通知
     """
@@ -45,8 +50,10 @@ async def send_interview_booking_email(uid, recruit_name, choice, interview_time
             logger.info(f"成功向 {mail_to} 发送面试预约成功邮件。")
     except Exception as e:
         logger.error(f"发送面试预约邮件给 {uid} 时出错: {e}")
+        if raise_on_error:
+            raise
 
-async def send_interview_cancellation_email(uid, recruit_name, choice, interview_time):
+async def send_interview_cancellation_email(uid, recruit_name, choice, interview_time, raise_on_error=False):
     """
     发送面试取消邮件通知
     """
@@ -74,79 +81,196 @@ async def send_interview_cancellation_email(uid, recruit_name, choice, interview
         if phone_info and phone_info.get('phone_number') and sms_client:
             phone_number = phone_info['phone_number']
             sms_content = f"【TDT创新实验室】亲爱的{realname}同学您好，您预约的{recruit_name}的{choice}岗位的面试已被取消，请您及时登录系统重新预约。"
-            sms_client.send(phone_number, sms_content)
-            logger.info(f"已向 {phone_number} 发送面试取消短信。")
+            success, message = await sms_client.send(phone_number, sms_content)
+            if success:
+                logger.info(f"已向 {phone_number} 发送面试取消短信。")
+            else:
+                logger.warning(f"向 {phone_number} 发送面试取消短信失败: {message}")
     except Exception as e:
         logger.error(f"发送面试取消邮件给 {uid} 时出错: {e}")
+        if raise_on_error:
+            raise
 
 
-async def send_status_change_notification(submit_id, new_status_name):
+# 需要发送短信通知的状态
+SMS_STATUSES = ["简历通过", "简历未通过", "面试未通过", "已录取"]
+
+# 每次预取的投递数量，避免 IN 列表过长
+STATUS_CHANGE_PREFETCH_CHUNK = 500
+
+STATUS_CHANGE_RECIPIENTS_QUERY = """
+    SELECT
+        rs.submit_id, rs.uid, rs.recruit_id,
+        u.mail,
+        up.phone_number,
+        ui.realname,
+        r.name AS recruit_name,
+        ri.first_choice
+    FROM
+        resume_submit AS rs
+    LEFT JOIN
+        `user` AS u ON rs.uid = u.uid
+    LEFT JOIN
+        userphone AS up ON rs.uid = up.uid
+    LEFT JOIN
+        userinfo AS ui ON rs.uid = ui.uid
+    LEFT JOIN
+        recruit AS r ON rs.recruit_id = r.recruit_id
+    LEFT JOIN
+        resume_info AS ri ON rs.submit_id = ri.submit_id
+    WHERE
+        rs.submit_id IN ({placeholders})
+"""
+
+# 模板中姓名的占位符，模板按 (招聘, 志愿) 渲染一次后再逐人替换
+_REALNAME = '\x00realname\x00'
+
+def _render_status_change_templates(new_status_name, recruit_name, choice):
     """
-    发送简历状态变更的邮件和短信通知
+    渲染状态变更的邮件主题、邮件正文和短信正文，其中姓名以占位符代替。
     """
-    try:
-        with SQL() as sql:
-            submission = sql.fetch_one('resume_submit', {'submit_id': submit_id})
-            if not submission:
-                return
-
-            uid = submission['uid']
-            recruit_id = submission['recruit_id']
-            
-            user_info = sql.fetch_one('user', {'uid': uid})
-            user_phone_info = sql.fetch_one('userphone', {'uid': uid})
-            user_info_info = sql.fetch_one('userinfo', {'uid': uid})
-            recruit_info = sql.fetch_one('recruit', {'recruit_id': recruit_id})
-            resume_info = sql.fetch_one('resume_info', {'submit_id': submit_id})
-            
-        recruit_name = recruit_info.get('name', 'N/A') if recruit_info else 'N/A'
-        choice = resume_info.get('first_choice', 'N/A') if resume_info else 'N/A'
-        realname = user_info_info.get('realname', '') if user_info_info else ''
-        plan_name = recruit_info.get('name', 'N/A') if recruit_info else 'N/A'
-        # 邮件通知
-        if user_info and user_info.get('mail'):
-            mail_to = user_info['mail']
-            subject = f"【T-DT创新实验室】您的投递状态已更新为: {new_status_name}"
-            content = f"""同学您好,
+    plan_name = recruit_name
+    realname = _REALNAME
+    subject = f"【T-DT创新实验室】您的投递状态已更新为: {new_status_name}"
+    content = f"""同学您好,
             您投递的 {recruit_name} 的 {choice} 岗位的状态已更新为:  {new_status_name}。
             请登录我们的网站查看详情。
             -- T-DT创新实验室"""
-            if new_status_name == '简历通过':
-                content = f"""亲爱的{realname}同学您好,
+    if new_status_name == '简历通过':
+        content = f"""亲爱的{realname}同学您好,
                 <br><br>感谢您投递<b>{recruit_name}</b>的<b>{choice}</b>岗位。我们很高兴地通知您，您的简历已通过初筛！
                 <br>请尽快登录系统预约面试，以进行下一步的操作。
                 <br><br>感谢您对我们的关注和信任。祝您面试顺利！
                 <br><br>-- T-DT创新实验室"""
-            elif new_status_name == '已录取':
-                content = f"""亲爱的{realname}同学您好,
+    elif new_status_name == '已录取':
+        content = f"""亲爱的{realname}同学您好,
                 <br><br>感谢您投递<b>{recruit_name}</b>的<b>{choice}</b>岗位。我们很高兴地通知您，您已通过面试，正式成为{plan_name}的一员！
                 <br>我们衷心期待您的到来。
                 <br><br>再次非常感谢您对我们工作的支持与信任，祝您学业有成，生活美满。
                 <br><br>-- T-DT创新实验室"""
-            elif new_status_name == '简历未通过' or new_status_name == '面试未通过':
-                content = f"""亲爱的{realname}同学您好,
+    elif new_status_name == '简历未通过' or new_status_name == '面试未通过':
+        content = f"""亲爱的{realname}同学您好,
                 <br><br>感谢您投递<b>{recruit_name}</b>的<b>{choice}</b>岗位。对于您的申请，我们经过了慎重的考虑，您不是该岗位的最佳人选，因此我们无法为您推进后续安排。
                 <br>这并非说明您不够优秀，只是不一定适合我们实验室。
                 <br><br>再次感谢您的信任与参与，祝愿您学业有成！
                 <br><br>-- T-DT创新实验室"""
-            
-            async with cMailer() as mailer:
-                await mailer.send(mail_to, subject, content, subtype='plain')
 
-            logger.info(f"成功向 {mail_to} 发送状态变更邮件。")
-        # 短信通知 (仅在特定状态下)
-        sms_statuses = ["简历通过", "简历未通过", "面试未通过", "已录取"]
-        if new_status_name in sms_statuses and user_phone_info and user_phone_info.get('phone_number') and sms_client:
-            phone_number = user_phone_info['phone_number']
-            sms_content = f"【TDT创新实验室】同学您好，感谢您投递{recruit_name}，您在{choice}投递的简历已更新为{new_status_name}，感谢您对T-DT创新实验室的支持。"
-            if new_status_name == '简历通过':
-                sms_content = f"【TDT创新实验室】亲爱的{realname}同学您好， 感谢您投递{recruit_name}，我们很高兴地通知您，对于您在{choice}的投递，已经通过了简历初筛！请尽快登陆系统预约面试，以进行下一步的操作。 感谢您对我们的关注和信任。祝您面试顺利！"
-            elif new_status_name == '已录取':
-                sms_content = f"【TDT创新实验室】亲爱的{realname}同学您好， 感谢您投递{recruit_name}，我们很高兴地通知您，对于您在{choice}的投递，已经通过了面试！非常感谢您加入{plan_name}，我们衷心期待您的到来。再次非常感谢您对我们工作的支持与信任，祝您学业有成，生活美满。"
-            elif new_status_name == '简历未通过' or new_status_name == '面试未通过':
-                sms_content = f"【TDT创新实验室】亲爱的{realname}同学您好， 感谢您投递{recruit_name}，对于您在{choice}的投递，我们经过了慎重的考虑，您不是该岗位的最佳人选，因此我们无法为您推进后续安排。这并非说明您不够优秀，只是不一定适合我们实验室。再次感谢您的信任与参与，祝愿您学业有成！"
-            sms_client.send(phone_number, sms_content)
-            logger.info(f"已向 {phone_number} 发送状态变更短信。")
+    sms_content = f"【TDT创新实验室】同学您好，感谢您投递{recruit_name}，您在{choice}投递的简历已更新为{new_status_name}，感谢您对T-DT创新实验室的支持。"
+    if new_status_name == '简历通过':
+        sms_content = f"【TDT创新实验室】亲爱的{realname}同学您好， 感谢您投递{recruit_name}，我们很高兴地通知您，对于您在{choice}的投递，已经通过了简历初筛！请尽快登陆系统预约面试，以进行下一步的操作。 感谢您对我们的关注和信任。祝您面试顺利！"
+    elif new_status_name == '已录取':
+        sms_content = f"【TDT创新实验室】亲爱的{realname}同学您好， 感谢您投递{recruit_name}，我们很高兴地通知您，对于您在{choice}的投递，已经通过了面试！非常感谢您加入{plan_name}，我们衷心期待您的到来。再次非常感谢您对我们工作的支持与信任，祝您学业有成，生活美满。"
+    elif new_status_name == '简历未通过' or new_status_name == '面试未通过':
+        sms_content = f"【TDT创新实验室】亲爱的{realname}同学您好， 感谢您投递{recruit_name}，对于您在{choice}的投递，我们经过了慎重的考虑，您不是该岗位的最佳人选，因此我们无法为您推进后续安排。这并非说明您不够优秀，只是不一定适合我们实验室。再次感谢您的信任与参与，祝愿您学业有成！"
+    return subject, content, sms_content
+
+def _fetch_status_change_recipients(submit_ids):
+    """用 JOIN + IN 查询批量加载通知所需的收件人信息。"""
+    recipients = []
+    with SQL() as sql:
+        for i in range(0, len(submit_ids), STATUS_CHANGE_PREFETCH_CHUNK):
+            chunk = submit_ids[i:i + STATUS_CHANGE_PREFETCH_CHUNK]
+            placeholders = ','.join(['%s'] * len(chunk))
+            recipients.extend(sql.execute_query(STATUS_CHANGE_RECIPIENTS_QUERY.format(placeholders=placeholders), chunk))
+    return recipients
+
+async def send_status_change_notifications(submit_ids=(), new_status_name=None, raise_on_error=False,
+                                          mail_ids=(), sms_ids=()):
+    """
+    批量发送简历状态变更的邮件和短信通知。
+    收件人信息通过少量 JOIN 查询一次性加载，模板按 (招聘, 志愿) 只渲染一次，
+    邮件和短信分别批量交给连接池和短信客户端发送。
+    submit_ids 同时发送邮件和短信；重试时用 mail_ids、sms_ids 分别指定只需重发邮件或只需重发短信的 submit_id，
+    避免重复发送已成功的短信。
 
+    :return: {'mail_ids': 邮件发送失败的 submit_id 列表, 'sms_ids': 短信发送失败的 submit_id 列表}
+    """
+    send_sms = new_status_name in SMS_STATUSES and sms_client
+    mail_targets = set(submit_ids) | set(mail_ids)
+    sms_targets = (set(submit_ids) | set(sms_ids)) if send_sms else set()
+    all_ids = list(dict.fromkeys([*submit_ids, *mail_ids, *sms_ids]))
+    if not all_ids:
+        return {'mail_ids': [], 'sms_ids': []}
+    try:
+        recipients = _fetch_status_change_recipients(all_ids)
     except Exception as e:
-        logger.error(f"为 submit_id {submit_id} 发送状态变更通知时出错: {e}")
\ No newline at end of file
+        logger.error(f"加载状态变更通知收件人时出错: {e}")
+        if raise_on_error:
+            raise
+        return {'mail_ids': [i for i in all_ids if i in mail_targets], 'sms_ids': [i for i in all_ids if i in sms_targets]}
+
+    templates = {}
+    mail_submit_ids, mail_messages = [], []
+    sms_submit_ids, sms_messages = [], []
+    for row in recipients:
+        recruit_name = row['recruit_name'] if row['recruit_name'] is not None else 'N/A'
+        choice = row['first_choice'] if row['first_choice'] is not None else 'N/A'
+        realname = row['realname'] or ''
+        key = (recruit_name, choice)
+        if key not in templates:
+            templates[key] = _render_status_change_templates(new_status_name, recruit_name, choice)
+        subject, content, sms_content = templates[key]
+
+        # 邮件通知
+        if row['mail'] and row['submit_id'] in mail_targets:
+            msg = MIMEText(content.replace(_REALNAME, realname), 'plain', 'utf-8')
+            msg['Subject'] = subject
+            mail_submit_ids.append(row['submit_id'])
+            mail_messages.append((row['mail'], msg))
+        # 短信通知 (仅在特定状态下)
+        if row['phone_number'] and row['submit_id'] in sms_targets:
+            sms_submit_ids.append(row['submit_id'])
+            sms_messages.append((row['phone_number'], sms_content.replace(_REALNAME, realname)))
+
+    failed_mail_ids = []
+    if mail_messages:
+        async with cMailer() as mailer:
+            results = await mailer.send_many(mail_messages)
+        for submit_id, (mail_to, _), error in zip(mail_submit_ids, mail_messages, results):
+            if error is None:
+                logger.info(f"成功向 {mail_to} 发送状态变更邮件。")
+            else:
+                failed_mail_ids.append(submit_id)
+                logger.error(f"为 submit_id {submit_id} 发送状态变更邮件时出错: {error}")
+
+    failed_sms_ids = []
+    if sms_messages:
+        results = await sms_client.send_many(sms_messages)
+        for submit_id, (phone_number, _), (success, message) in zip(sms_submit_ids, sms_messages, results):
+            if success:
+                logger.info(f"已向 {phone_number} 发送状态变更短信。")
+            else:
+                failed_sms_ids.append(submit_id)
+                logger.warning(f"为 submit_id {submit_id} 向 {phone_number} 发送状态变更短信失败: {message}")
+
+    if (failed_mail_ids or failed_sms_ids) and raise_on_error:
+        # 重试时只重发各自失败的渠道
+        raise PartialFailure(f"{len(failed_mail_ids)}/{len(mail_messages)} 封状态变更邮件、"
+                             f"{len(failed_sms_ids)}/{len(sms_messages)} 条短信发送失败",
+                             {'mail_ids': failed_mail_ids, 'sms_ids': failed_sms_ids, 'new_status_name': new_status_name})
+    return {'mail_ids': failed_mail_ids, 'sms_ids': failed_sms_ids}
+
+
+async def send_status_change_notification(submit_id, new_status_name, raise_on_error=False):
+    """
+    发送简历状态变更的邮件和短信通知
+    """
+    failed = await send_status_change_notifications([submit_id], new_status_name)
+    if (failed['mail_ids'] or failed['sms_ids']) and raise_on_error:
+        raise ConnectionError(f"为 submit_id {submit_id} 发送状态变更通知失败")
+
+
+async def _handle_status_change(submit_id=None, new_status_name=None, mail_ids=(), sms_ids=()):
+    # 单条状态变更任务部分失败后，payload 会被替换为 mail_ids/sms_ids 形式，只重发失败的渠道
+    await send_status_change_notifications([submit_id] if submit_id else (), new_status_name, raise_on_error=True,
+                                           mail_ids=mail_ids, sms_ids=sms_ids)
+
+
+# 发件箱 worker 使用的任务处理函数，失败时抛出异常以触发重试
+NOTIFICATION_HANDLERS = {
+    'application_submission': functools.partial(send_application_submission_email, raise_on_error=True),
+    'interview_booking': functools.partial(send_interview_booking_email, raise_on_error=True),
+    'interview_cancellation': functools.partial(send_interview_cancellation_email, raise_on_error=True),
+    'status_change': _handle_status_change,
+    'status_change_batch': functools.partial(send_status_change_notifications, raise_on_error=True),
+}
@@ -0,0 +1,254 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .sql import SQL
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_TABLE = 'notification_outbox'
+
+# 任务状态
+STATUS_PENDING = 'pending'
+STATUS_SENDING = 'sending'
+STATUS_SENT = 'sent'
+STATUS_FAILED = 'failed'
+
+DEFAULT_MAX_ATTEMPTS = 5
+
+# 清理已结束任务时每条 DELETE 删除的行数，避免一次删除大量记录长时间锁表
+PURGE_BATCH_SIZE = 1000
+# 两次清理之间的间隔（秒）
+PURGE_INTERVAL = 3600
+
+
+class PartialFailure(Exception):
+    """
+    批量任务部分失败时由处理函数抛出。
+    worker 会把任务的 payload 替换为 remaining_payload 后再重试，避免重复投递已成功的部分。
+    """
+    def __init__(self, message: str, remaining_payload: Dict[str, Any]):
+        super().__init__(message)
+        self.remaining_payload = remaining_payload
+
+
+def enqueue_notification(kind: str, payload: Dict[str, Any], sql: Optional[SQL] = None,
+                         max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> str:
+    """
+    将一条通知任务写入发件箱 (notification_outbox)，由独立的 worker 进程异步投递。
+
+    :param kind: 任务类型，对应 worker 中注册的处理函数名
+    :param payload: 传给处理函数的关键字参数，必须可以 JSON 序列化
+    :param sql: 可选，传入调用方正在使用的 SQL 实例，使任务与业务数据在同一事务中提交
+    :param max_attempts: 最大投递尝试次数
+    :return: 任务 ID
+    """
+    job_id = str(uuid.uuid4())
+    now = datetime.now()
+    record = {
+        'job_id': job_id,
+        'kind': kind,
+        'payload': json.dumps(payload, ensure_ascii=False, default=str),
+        'status': STATUS_PENDING,
+        'attempts': 0,
+        'max_attempts': max_attempts,
+        'next_attempt_time': now,
+        'created_time': now,
+        'updated_time': now,
+    }
+    if sql is not None:
+        sql.insert(OUTBOX_TABLE, record)
+    else:
+        with SQL() as new_sql:
+            new_sql.insert(OUTBOX_TABLE, record)
+    return job_id
+
+
+class OutboxWorker:
+    """
+    发件箱 worker：从 notification_outbox 中认领到期的任务，以有限并发执行，
+    失败后按指数退避重试，并记录每个任务的投递状态。
+    多个 worker 进程可以同时运行，任务通过带 LIMIT 的 UPDATE 原子认领。
+    """
+
+    def __init__(self, handlers: Dict[str, Callable[..., Awaitable[Any]]], concurrency: int = 8,
+                 batch_size: int = 50, poll_interval: float = 1.0, retry_base_delay: float = 10,
+                 retry_max_delay: float = 600, lease_timeout: float = 300, retention_days: float = 30):
+        """
+        :param handlers: 任务类型到异步处理函数的映射，处理函数失败时应抛出异常
+        :param concurrency: 同时执行的任务数上限
+        :param batch_size: 每次认领的任务数
+        :param poll_interval: 队列为空时的轮询间隔（秒）
+        :param retry_base_delay: 第一次重试前的等待时间（秒），之后每次翻倍
+        :param retry_max_delay: 重试等待时间上限（秒）
+        :param lease_timeout: 认领后超过该时间仍未完成的任务（如 worker 崩溃）会被重新放回队列
+        :param retention_days: 已发送和最终失败的任务保留的天数，超过后由 worker 定期删除；为 0 时不清理
+        """
+        self.handlers = handlers
+        self.concurrency = max(1, int(concurrency))
+        self.batch_size = max(1, int(batch_size))
+        self.poll_interval = poll_interval
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.lease_timeout = lease_timeout
+        self.retention_days = retention_days
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._stopping: Optional[asyncio.Event] = None
+
+    def _claim_batch(self):
+        """原子地认领一批到期任务，并返回它们的记录。"""
+        claim_token = f"{self.worker_id}:{uuid.uuid4().hex[:8]}"
+        now = datetime.now()
+        with SQL() as sql:
+            claimed = sql.execute_update(
+                f"UPDATE `{OUTBOX_TABLE}` SET `status` = %s, `claimed_by` = %s, `updated_time` = %s "
+                f"WHERE `status` = %s AND `next_attempt_time` <= %s ORDER BY `created_time` LIMIT %s",
+                (STATUS_SENDING, claim_token, now, STATUS_PENDING, now, self.batch_size)
+            )
+            if not claimed:
+                return []
+            return sql.execute_query(
+                f"SELECT * FROM `{OUTBOX_TABLE}` WHERE `claimed_by` = %s AND `status` = %s",
+                (claim_token, STATUS_SENDING)
+            )
+
+    def _requeue_stale(self):
+        """将认领后长时间未完成的任务重新放回队列。"""
+        deadline = datetime.now() - timedelta(seconds=self.lease_timeout)
+        with SQL() as sql:
+            count = sql.execute_update(
+                f"UPDATE `{OUTBOX_TABLE}` SET `status` = %s, `claimed_by` = NULL "
+                f"WHERE `status` = %s AND `updated_time` < %s",
+                (STATUS_PENDING, STATUS_SENDING, deadline)
+            )
+        if count:
+            logger.warning(f"发件箱: {count} 个超时未完成的任务已重新入队。")
+
+    def _purge_finished(self):
+        """分批删除超过保留期的已发送、最终失败任务。"""
+        deadline = datetime.now() - timedelta(days=self.retention_days)
+        total = 0
+        while True:
+            with SQL() as sql:
+                count = sql.execute_update(
+                    f"DELETE FROM `{OUTBOX_TABLE}` WHERE `status` IN (%s, %s) AND `updated_time` < %s LIMIT %s",
+                    (STATUS_SENT, STATUS_FAILED, deadline, PURGE_BATCH_SIZE)
+                )
+            total += count
+            if count < PURGE_BATCH_SIZE:
+                break
+        if total:
+            logger.info(f"发件箱: 已删除 {total} 个超过 {self.retention_days} 天的已结束任务。")
+
+    @staticmethod
+    def _update_claimed(job, data: Dict[str, Any]):
+        """仅当任务仍由本次认领持有时更新；租约过期后任务可能已被重新入队或由其他 worker 认领，此时放弃本次结果。"""
+        with SQL() as sql:
+            updated = sql.update(OUTBOX_TABLE, data, {'job_id': job['job_id'], 'claimed_by': job['claimed_by']})
+        if not updated:
+            logger.warning(f"发件箱任务 {job['job_id']} ({job['kind']}) 的租约已失效（已重新入队或被其他 worker 认领），"
+                           f"本次结果（{data['status']}）未写入。")
+
+    def _mark_sent(self, job):
+        now = datetime.now()
+        self._update_claimed(job, {
+            'status': STATUS_SENT,
+            'attempts': job['attempts'] + 1,
+            'updated_time': now,
+            'sent_time': now,
+            'last_error': None
+        })
+
+    def _mark_failed(self, job, error: str, remaining_payload: Optional[Dict[str, Any]] = None):
+        attempts = job['attempts'] + 1
+        now = datetime.now()
+        data = {'attempts': attempts, 'updated_time': now, 'last_error': error[:2000], 'claimed_by': None}
+        if remaining_payload is not None:
+            data['payload'] = json.dumps(remaining_payload, ensure_ascii=False, default=str)
+        if attempts >= (job['max_attempts'] or DEFAULT_MAX_ATTEMPTS):
+            data['status'] = STATUS_FAILED
+            logger.error(f"发件箱任务 {job['job_id']} ({job['kind']}) 已达到最大重试次数，放弃投递: {error}")
+        else:
+            delay = min(self.retry_max_delay, self.retry_base_delay * (2 ** (attempts - 1)))
+            delay *= random.uniform(0.8, 1.2)
+            data['status'] = STATUS_PENDING
+            data['next_attempt_time'] = now + timedelta(seconds=delay)
+            logger.warning(f"发件箱任务 {job['job_id']} ({job['kind']}) 第 {attempts} 次投递失败，{delay:.0f} 秒后重试: {error}")
+        self._update_claimed(job, data)
+
+    async def _process(self, job, semaphore: asyncio.Semaphore):
+        async with semaphore:
+            handler = self.handlers.get(job['kind'])
+            try:
+                if handler is None:
+                    raise LookupError(f"未注册的任务类型: {job['kind']}")
+                payload = json.loads(job['payload']) if job['payload'] else {}
+                await handler(**payload)
+            except PartialFailure as e:
+                await asyncio.to_thread(self._mark_failed, job, f"{type(e).__name__}: {e}", e.remaining_payload)
+            except Exception as e:
+                await asyncio.to_thread(self._mark_failed, job, f"{type(e).__name__}: {e}")
+            else:
+                await asyncio.to_thread(self._mark_sent, job)
+
+    async def run(self):
+        """持续处理发件箱，直到 stop() 被调用。"""
+        self._stopping = asyncio.Event()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        in_flight = set()
+        last_requeue = 0.0
+        last_purge = None
+        loop = asyncio.get_running_loop()
+        logger.info(f"发件箱 worker {self.worker_id} 已启动，并发数 {self.concurrency}。")
+
+        while not self._stopping.is_set():
+            if loop.time() - last_requeue > self.lease_timeout / 2:
+                await asyncio.to_thread(self._requeue_stale)
+                last_requeue = loop.time()
+
+            if self.retention_days > 0 and (last_purge is None or loop.time() - last_purge > PURGE_INTERVAL):
+                try:
+                    await asyncio.to_thread(self._purge_finished)
+                except Exception as e:
+                    logger.error(f"发件箱清理已结束任务失败: {e}")
+                last_purge = loop.time()
+
+            # 仅在有空闲并发槽时认领，避免任务在本进程内排队时租约过期
+            jobs = []
+            if len(in_flight) < self.concurrency:
+                try:
+                    jobs = await asyncio.to_thread(self._claim_batch)
+                except Exception as e:
+                    logger.error(f"发件箱认领任务失败: {e}")
+
+            for job in jobs:
+                task = asyncio.create_task(self._process(job, semaphore))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+
+            if not jobs:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+            elif len(in_flight) >= self.concurrency:
+                await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+
+        if in_flight:
+            logger.info(f"发件箱 worker 正在等待 {len(in_flight)} 个进行中的任务完成...")
+            await asyncio.gather(*in_flight, return_exceptions=True)
+        logger.info(f"发件箱 worker {self.worker_id} 已停止。")
+
+    def stop(self):
+        """请求 worker 在完成进行中的任务后退出。"""
+        if self._stopping is not None:
+            self._stopping.set()
@@ -0,0 +1,89 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from werkzeug import security
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+def _method_prefix(method: str) -> str:
+    """
+    补全 werkzeug 的默认成本参数，得到该 method 生成的哈希的参数部分（第一个 '$' 之前），如 'scrypt:32768:8:1'。
+    直接解析配置而不实际计算哈希，避免在请求中（或启动时）额外计算一次 scrypt。
+    """
+    name, *args = method.split(':')
+    if name == 'scrypt':
+        n, r, p = args if args else (2 ** 15, 8, 1)
+        return f"scrypt:{int(n)}:{int(r)}:{int(p)}"
+    if name == 'pbkdf2':
+        hash_name = args[0] if args else 'sha256'
+        iterations = int(args[1]) if len(args) > 1 else security.DEFAULT_PBKDF2_ITERATIONS
+        return f"pbkdf2:{hash_name}:{iterations}"
+    # 其他算法由 werkzeug 校验并报错
+    return generate_password_hash('', method=method, salt_length=1).split('$', 1)[0]
+
+
+class PasswordHasher:
+    """
+    在独立线程池中计算密码哈希，避免阻塞事件循环。
+    hashlib 的 scrypt/pbkdf2 计算期间会释放 GIL，线程池即可并行；max_workers 限制同时进行的哈希数量，
+    登录高峰时多余的请求在线程池队列中等待，不会占满 CPU。
+    method 使用 werkzeug 的格式，如 'scrypt'、'scrypt:65536:8:1'、'pbkdf2:sha256:600000'；
+    修改后，旧参数生成的哈希会在用户下次登录成功时自动重新计算（见 needs_rehash）。
+    """
+
+    def __init__(self, method: str = 'scrypt', salt_length: int = 16, max_workers: Optional[int] = None):
+        """
+        :param method: 哈希算法及成本参数
+        :param salt_length: 盐的长度
+        :param max_workers: 同时计算哈希的线程数，默认为 CPU 核数
+        """
+        self.method = method
+        self.salt_length = salt_length
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pid = None
+        self._lock = threading.Lock()
+        # 当前配置生成的哈希的参数部分，needs_rehash() 据此判断旧哈希
+        self.method_prefix = _method_prefix(method)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # fork 之后线程池不可用，按进程重新创建
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='password-hash')
+                self._pid = os.getpid()
+            return self._executor
+
+    async def _run(self, func, *args):
+        return await asyncio.wrap_future(self._get_executor().submit(func, *args))
+
+    def hash_sync(self, password: str) -> str:
+        return generate_password_hash(password, method=self.method, salt_length=self.salt_length)
+
+    async def hash(self, password: str) -> str:
+        """计算密码哈希。"""
+        return await self._run(self.hash_sync, password)
+
+    async def verify(self, stored_hash: str, password: str) -> bool:
+        """校验密码。stored_hash 为空或格式错误时返回 False。"""
+        if not stored_hash:
+            return False
+        try:
+            return await self._run(check_password_hash, stored_hash, password)
+        except ValueError:
+            return False
+
+    def needs_rehash(self, stored_hash: str) -> bool:
+        """已保存的哈希与当前算法或成本参数不一致时返回 True。"""
+        return not stored_hash or stored_hash.split('$', 1)[0] != self.method_prefix
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
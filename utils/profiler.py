@@ -0,0 +1,279 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+import hashlib
+import hmac
+import inspect
+import logging
+import os
+import random
+import re
+import sys
+import sysconfig
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from flask import g, has_request_context, request
+
+# 携带签名令牌（由 issue_token() 生成）的请求会被采样
+PROFILE_HEADER = 'X-Profile-Token'
+# 采样结果的文件名，返回给携带令牌的请求
+PROFILE_ID_HEADER = 'X-Profile-Id'
+
+_PROFILE_NAME_RE = re.compile(r'^[0-9A-Za-z_.-]+\.folded$')
+_STDLIB_PREFIX = sysconfig.get_paths()['stdlib'] + os.sep
+
+
+class _Profile:
+    """一次请求的采样结果：折叠后的调用栈 -> 采样次数。"""
+
+    def __init__(self, thread_id: int):
+        self.threads = {thread_id}
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.start = time.perf_counter()
+
+
+class RequestProfiler:
+    """
+    按需的请求采样分析器。被选中的请求执行期间，一个后台线程每隔 interval 秒读取处理该请求的线程的调用栈
+    （sys._current_frames），结束后以折叠栈格式（flamegraph.pl、speedscope 可直接读取）写入 profile_dir。
+
+    请求在以下情况被采样：
+    - 携带 X-Profile-Token 请求头，且令牌是由 issue_token() 签发、尚未过期的（签发接口仅管理员可用）；
+    - 按 sample_rate 的比例随机抽样。
+    未被选中的请求只多一次请求头检查；异步视图在其事件循环所在线程上采样。
+    """
+
+    def __init__(self, secret: str, profile_dir: str = 'profiles', sample_rate: float = 0.0, interval: float = 0.005,
+                 token_ttl: int = 600, max_profiles: int = 200, exclude_prefixes: Tuple[str, ...] = ('/admin/profiler/',),
+                 logger: logging.Logger = None):
+        """
+        :param secret: 令牌签名密钥
+        :param profile_dir: 采样结果目录
+        :param sample_rate: 随机抽样比例（0-1），0 表示只采样携带令牌的请求
+        :param interval: 采样间隔（秒）
+        :param token_ttl: 令牌有效期（秒）
+        :param max_profiles: 目录中保留的采样结果数，超出时删除最旧的
+        :param exclude_prefixes: 不采样的路径前缀
+        """
+        self._key = hashlib.sha256(f'request-profiler:{secret}'.encode('utf-8')).digest()
+        self.profile_dir = profile_dir
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.token_ttl = token_ttl
+        self.max_profiles = max_profiles
+        self.exclude_prefixes = exclude_prefixes
+        self.logger = logger or logging.getLogger(__name__)
+        self._active: List[_Profile] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._labels: Dict[object, str] = {}
+
+    def init_app(self, app):
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        app.teardown_request(self.teardown_request)
+        default_ensure_sync = app.ensure_sync
+
+        def ensure_sync(func):
+            profile = g.get('_profile') if has_request_context() else None
+            if profile is not None and inspect.iscoroutinefunction(func):
+                func = self._profiled_coroutine(profile, func)
+            return default_ensure_sync(func)
+
+        app.ensure_sync = ensure_sync
+
+    # --- 令牌 ---
+
+    def _sign(self, payload: str) -> str:
+        return hmac.new(self._key, payload.encode('utf-8'), hashlib.sha256).hexdigest()
+
+    def issue_token(self, uid: str) -> Tuple[str, int]:
+        """为管理员 uid 签发采样令牌，返回 (令牌, 过期时间戳)。"""
+        expires = int(time.time()) + self.token_ttl
+        payload = f'{uid}:{expires}'
+        return f'{payload}:{self._sign(payload)}', expires
+
+    def verify_token(self, token: str) -> Optional[str]:
+        """令牌有效时返回签发对象的 uid，否则（包括任意格式错误的请求头）返回 None。"""
+        try:
+            payload, _, signature = token.rpartition(':')
+            uid, _, expires = payload.rpartition(':')
+            # 请求头按 latin-1 解码，'²' 等字符的 isdigit() 为真但 int() 无法解析
+            if not uid or not (expires.isascii() and expires.isdigit()) or int(expires) < time.time():
+                return None
+            # compare_digest 比较含非 ASCII 字符的 str 时会抛出 TypeError，统一按字节比较
+            if not hmac.compare_digest(signature.encode('latin-1', 'ignore'), self._sign(payload).encode('ascii')):
+                return None
+        except (ValueError, TypeError):
+            return None
+        return uid
+
+    # --- 请求钩子 ---
+
+    def _should_profile(self) -> Tuple[bool, Optional[str]]:
+        token = request.headers.get(PROFILE_HEADER)
+        if token is None and not self.sample_rate:
+            return False, None
+        if request.path.startswith(self.exclude_prefixes):
+            return False, None
+        if token is not None:
+            uid = self.verify_token(token)
+            if uid is not None:
+                return True, uid
+        return bool(self.sample_rate) and random.random() < self.sample_rate, None
+
+    def before_request(self):
+        selected, uid = self._should_profile()
+        if not selected:
+            return
+        profile = _Profile(threading.get_ident())
+        g._profile = profile
+        g._profile_requested_by = uid
+        self._start(profile)
+
+    def _finish(self) -> Optional[str]:
+        profile = g.pop('_profile', None)
+        if profile is None:
+            return None
+        self._stop(profile)
+        requested_by = g.pop('_profile_requested_by', None)
+        try:
+            name = self._save(profile)
+        except OSError as e:
+            self.logger.error(f"保存采样结果失败: {e}")
+            return None
+        self.logger.info(f"请求 {request.method} {request.path} 的采样结果已保存: {name}"
+                         + (f"（由 {requested_by} 请求）" if requested_by else ''))
+        # 只告知持有令牌的管理员，随机抽样的请求不暴露
+        return name if requested_by else None
+
+    def after_request(self, response):
+        # 采样到视图返回为止，流式响应的响应体生成不计入
+        name = self._finish()
+        if name is not None:
+            response.headers[PROFILE_ID_HEADER] = name
+        return response
+
+    def teardown_request(self, exc):
+        # 请求未经过 after_request 时在这里结束采样
+        self._finish()
+
+    def _profiled_coroutine(self, profile: _Profile, func):
+        async def wrapper(*args, **kwargs):
+            # 异步视图可能运行在另一个线程的事件循环中，执行期间改为采样该线程
+            threads = profile.threads
+            profile.threads = {threading.get_ident()}
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                profile.threads = threads
+        return wrapper
+
+    # --- 采样线程 ---
+
+    def _start(self, profile: _Profile):
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                # 首次使用或 fork 之后启动采样线程
+                self._active = []
+                self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+                self._pid = os.getpid()
+                self._thread.start()
+            self._active.append(profile)
+            self._wakeup.set()
+
+    def _stop(self, profile: _Profile):
+        with self._lock:
+            if profile in self._active:
+                self._active.remove(profile)
+            if not self._active:
+                self._wakeup.clear()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            time.sleep(self.interval)
+            with self._lock:
+                profiles = list(self._active)
+            if not profiles:
+                continue
+            frames = sys._current_frames()
+            for profile in profiles:
+                for thread_id in list(profile.threads):
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        profile.stacks[self._fold(frame)] += 1
+                profile.samples += 1
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            filename = code.co_filename
+            # 栈帧名中的文件路径尽量缩短：第三方库、标准库去掉安装目录，项目文件使用相对路径
+            if 'site-packages' + os.sep in filename:
+                filename = filename.split('site-packages' + os.sep, 1)[1]
+            elif filename.startswith(_STDLIB_PREFIX):
+                filename = filename[len(_STDLIB_PREFIX):]
+            elif filename.startswith(os.getcwd() + os.sep):
+                filename = os.path.relpath(filename)
+            label = f'{code.co_name} ({filename}:{code.co_firstlineno})'.replace(';', ',')
+            self._labels[code] = label
+        return label
+
+    def _fold(self, frame) -> str:
+        labels = []
+        while frame is not None:
+            labels.append(self._label(frame.f_code))
+            frame = frame.f_back
+        return ';'.join(reversed(labels))
+
+    # --- 存储 ---
+
+    def _save(self, profile: _Profile) -> str:
+        elapsed_ms = (time.perf_counter() - profile.start) * 1000
+        endpoint = (request.endpoint or 'unmatched').replace('.', '_')
+        name = f"{time.strftime('%Y%m%dT%H%M%S')}-{endpoint}-{elapsed_ms:.0f}ms-{uuid.uuid4().hex[:8]}.folded"
+        os.makedirs(self.profile_dir, exist_ok=True)
+        with open(os.path.join(self.profile_dir, name), 'w', encoding='utf-8') as f:
+            for stack, count in profile.stacks.most_common():
+                f.write(f'{stack} {count}\n')
+        self._prune()
+        return name
+
+    def _prune(self):
+        entries = self.list_profiles()
+        for entry in entries[self.max_profiles:]:
+            try:
+                os.remove(os.path.join(self.profile_dir, entry['name']))
+            except OSError:
+                pass
+
+    def list_profiles(self) -> List[dict]:
+        """目录中的采样结果，按时间从新到旧排列。"""
+        try:
+            names = [name for name in os.listdir(self.profile_dir) if _PROFILE_NAME_RE.match(name)]
+        except FileNotFoundError:
+            return []
+        entries = []
+        for name in names:
+            try:
+                stat = os.stat(os.path.join(self.profile_dir, name))
+            except OSError:
+                continue
+            entries.append({'name': name, 'size': stat.st_size, 'mtime': stat.st_mtime})
+        entries.sort(key=lambda entry: entry['mtime'], reverse=True)
+        return entries
+
+    def profile_path(self, name: str) -> Optional[str]:
+        """采样结果文件的路径；名称不合法或文件不存在时返回 None。"""
+        if not _PROFILE_NAME_RE.match(name):
+            return None
+        path = os.path.abspath(os.path.join(self.profile_dir, name))
+        return path if os.path.isfile(path) else None
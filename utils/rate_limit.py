@@ -0,0 +1,168 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+import functools
+import inspect
+import logging
+import math
+import uuid
+from typing import Callable, Optional, Sequence, Tuple
+
+import redis
+from flask import jsonify, request, session
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_KEY_PREFIX = 'rate_limit:'
+
+# 滑动窗口计数：每个键是一个有序集合，成员为单次请求，分数为请求时间（毫秒）。
+# 先检查所有键，全部未超限时才在所有键中记录本次请求，保证多个维度的计数一致。
+# 时间取自 Redis 服务器，多个节点之间不受本地时钟偏差影响。
+# 返回 {是否允许, 需要等待的毫秒数}
+_SLIDING_WINDOW_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local window = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+local retry_after = 0
+for i, key in ipairs(KEYS) do
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+    if redis.call('ZCARD', key) >= limit then
+        local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+        local wait = tonumber(oldest[2]) + window - now
+        if wait > retry_after then
+            retry_after = wait
+        end
+    end
+end
+if retry_after > 0 then
+    return {0, retry_after}
+end
+for i, key in ipairs(KEYS) do
+    redis.call('ZADD', key, now, ARGV[3])
+    redis.call('PEXPIRE', key, window)
+end
+return {1, 0}
+"""
+
+
+def _scope_value(scope: str) -> Optional[str]:
+    if scope == 'ip':
+        # 位于反向代理之后时，需配置 proxy（ProxyFix）使 remote_addr 为真实的客户端地址
+        return request.remote_addr or 'unknown'
+    if scope == 'uid':
+        uid = session.get('uid')
+        return str(uid) if uid else None
+    raise ValueError(f"不支持的限流维度: {scope}")
+
+
+class RateLimiter:
+    """
+    基于 Redis 的分布式滑动窗口限流器。
+    所有检查与计数在一个 Lua 脚本中原子完成，每个请求只增加一次 Redis 往返，
+    多个 worker 和节点共享同一份计数。
+    """
+
+    def __init__(self, redis_client, key_prefix: str = RATE_LIMIT_KEY_PREFIX):
+        """
+        :param redis_client: RedisClient 实例
+        :param key_prefix: 计数键前缀
+        """
+        self.redis_client = redis_client
+        self.key_prefix = key_prefix
+        self._script = redis_client.get_client().register_script(_SLIDING_WINDOW_SCRIPT)
+
+    def hit(self, keys: Sequence[str], limit: int, window: float) -> Tuple[bool, float]:
+        """
+        在给定的键上记录一次请求。任一键超限时不记录，返回 (False, 需要等待的秒数)；否则返回 (True, 0)。
+
+        :param keys: 计数键（不含前缀）
+        :param limit: 窗口内允许的最大请求数
+        :param window: 窗口长度（秒）
+        """
+        if not keys:
+            return True, 0
+        full_keys = [self.key_prefix + key for key in keys]
+        allowed, retry_after_ms = self._script(keys=full_keys, args=[int(window * 1000), limit, uuid.uuid4().hex])
+        return bool(allowed), int(retry_after_ms) / 1000
+
+    @staticmethod
+    def _keys(rule: str, scopes: Sequence[str], key_func: Optional[Callable[[], Optional[str]]]):
+        values = [(scope, _scope_value(scope)) for scope in scopes]
+        if key_func is not None:
+            values.append(('key', key_func()))
+        return [f'{rule}:{scope}:{value}' for scope, value in values if value is not None]
+
+    def check(self, rule: str, limit: int, window: float, scopes: Sequence[str] = ('ip',),
+              key_func: Optional[Callable[[], Optional[str]]] = None, error: str = "请求过于频繁，请稍后再试"):
+        """
+        在视图内部检查并计数，用于只对真正执行了操作的请求计数的场景；参数与 limit() 相同，rule 为规则名。
+        未超限时返回 None，超限时返回 429 响应。
+        """
+        keys = self._keys(rule, scopes, key_func)
+        try:
+            allowed, retry_after = self.hit(keys, limit, window)
+        except redis.exceptions.RedisError as e:
+            # Redis 不可用时放行，避免限流器成为单点故障
+            logger.warning(f"限流检查失败，已放行: {e}")
+            return None
+        if allowed:
+            return None
+        response = jsonify(success=False, error=error)
+        response.status_code = 429
+        response.headers['Retry-After'] = str(max(math.ceil(retry_after), 1))
+        return response
+
+    def refund(self, rule: str, scopes: Sequence[str] = ('ip',), key_func: Optional[Callable[[], Optional[str]]] = None):
+        """
+        撤销 check() 在这些维度上记录的一次请求，用于操作最终未执行的情况（如发送失败）。
+        并发请求时撤销的可能是其他请求的记录，但计数结果相同。
+        """
+        keys = self._keys(rule, scopes, key_func)
+        if not keys:
+            return
+        try:
+            pipe = self.redis_client.get_client().pipeline(transaction=False)
+            for key in keys:
+                pipe.zpopmax(self.key_prefix + key)
+            pipe.execute()
+        except redis.exceptions.RedisError as e:
+            logger.warning(f"撤销限流计数失败: {e}")
+
+    def limit(self, limit: int, window: float, scopes: Sequence[str] = ('ip',),
+              key_func: Optional[Callable[[], Optional[str]]] = None, name: Optional[str] = None,
+              error: str = "请求过于频繁，请稍后再试"):
+        """
+        路由限流装饰器，放在 @flask_app.route 之下。
+
+        :param limit: 窗口内允许的最大请求数
+        :param window: 窗口长度（秒）
+        :param scopes: 计数维度，'ip' 按客户端地址，'uid' 按登录用户（未登录时忽略）；每个维度单独计数
+        :param key_func: 额外的计数维度，如按邮箱地址；返回 None 时忽略
+        :param name: 计数键中的规则名，默认为视图函数名；同名规则共享计数
+        :param error: 超限时返回的错误信息
+        """
+        def decorator(func):
+            rule = name or func.__name__
+
+            def check():
+                return self.check(rule, limit, window, scopes, key_func, error)
+
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    rejected = check()
+                    if rejected is not None:
+                        return rejected
+                    return await func(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                rejected = check()
+                if rejected is not None:
+                    return rejected
+                return func(*args, **kwargs)
+            return wrapper
+
+        return decorator
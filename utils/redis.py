@@ -3,10 +3,49 @@
 
 import redis
 import logging
+import time
+
+from . import metrics
+
+
+class _InstrumentedRedis(redis.StrictRedis):
+    """记录每条命令耗时的 redis 客户端（含 Lua 脚本的 EVALSHA）；流水线在 execute() 时按整体计时。"""
+
+    def execute_command(self, *args, **options):
+        command = str(args[0]) if args else ''
+        start = time.perf_counter()
+        try:
+            return super().execute_command(*args, **options)
+        except redis.exceptions.NoScriptError:
+            # 脚本尚未缓存，redis-py 会随即 SCRIPT LOAD 后重试，不计为失败
+            raise
+        except redis.exceptions.RedisError:
+            metrics.REDIS_ERRORS.labels(command).inc()
+            raise
+        finally:
+            metrics.REDIS_LATENCY.labels(command).observe(time.perf_counter() - start)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        pipe = super().pipeline(transaction, shard_hint)
+        execute = pipe.execute
+
+        def timed_execute(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return execute(*args, **kwargs)
+            except redis.exceptions.RedisError:
+                metrics.REDIS_ERRORS.labels('PIPELINE').inc()
+                raise
+            finally:
+                metrics.REDIS_LATENCY.labels('PIPELINE').observe(time.perf_counter() - start)
+
+        pipe.execute = timed_execute
+        return pipe
+
 
 class RedisClient:
 
-    def __init__(self, host='localhost', port=6379, db=0, password=None, logger: logging.Logger = None, **kwargs):
+    def __init__(self, host='localhost', port=6379, db=0, password=None, logger: logging.Logger = None, lazy: bool = False, **kwargs):
         """
         初始化一个新的 Redis 客户端实例和连接池。
 
@@ -15,6 +54,7 @@ class RedisClient:
         :param db: 数据库编号
         :param password: 密码
         :param logger: 日志记录器实例
+        :param lazy: 为 True 时不在初始化时 ping，第一次执行命令时才建立连接
         :param kwargs: 其他传递给 ConnectionPool 的参数
         """
         self.logger = logger or logging.getLogger(__name__)
@@ -31,11 +71,12 @@ class RedisClient:
                 decode_responses=True,  # 自动将 bytes 解码为 utf-8
                 **kwargs
             )
-            # 基于连接池创建 StrictRedis 客户端
-            self.client = redis.StrictRedis(connection_pool=self.pool)
-            # 检查连接是否成功
-            self.client.ping()
-            self.logger.info("Redis client initialized successfully.")
+            # 基于连接池创建 StrictRedis 客户端，命令耗时计入 redis_command_duration_seconds
+            self.client = _InstrumentedRedis(connection_pool=self.pool)
+            if not lazy:
+                # 检查连接是否成功
+                self.client.ping()
+                self.logger.info("Redis client initialized successfully.")
         except redis.exceptions.ConnectionError as e:
             self.logger.error(f"Error connecting to Redis: {e}")
             # 向上抛出异常，让调用者知道连接失败
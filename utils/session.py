@@ -0,0 +1,169 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+import logging
+import re
+import secrets
+from typing import Iterable, Optional
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+logger = logging.getLogger(__name__)
+
+SESSION_KEY_PREFIX = 'session:'
+SESSION_UID_INDEX_PREFIX = 'session_uid:'
+# token_urlsafe(32) 生成的会话 ID
+_SESSION_ID_RE = re.compile(r'^[A-Za-z0-9_-]{43}$')
+
+
+class RedisSession(CallbackDict, SessionMixin):
+    """保存在 Redis 中的会话，Cookie 中只保存不透明的会话 ID。"""
+
+    def __init__(self, initial=None, sid: Optional[str] = None, new: bool = False):
+        def on_update(self):
+            self.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+        # 加载时的 uid，用于维护按用户的会话索引以及登录后更换会话 ID
+        self.initial_uid = self.get('uid')
+
+
+class RedisSessionInterface(SessionInterface):
+    """
+    基于 Redis 的服务端会话。
+    - 会话内容以紧凑的 JSON 保存在 session:<id>，过期时间为 PERMANENT_SESSION_LIFETIME，每次请求滑动续期；
+    - session_uid:<uid> 集合记录用户的所有会话 ID，revoke_user_sessions() 可以让某些用户的会话全部失效；
+    - 会话中的 uid 发生变化（登录、切换账号）时更换会话 ID，防止会话固定攻击。
+    """
+
+    serializer = TaggedJSONSerializer()
+    session_class = RedisSession
+
+    def __init__(self, redis_client, key_prefix: str = SESSION_KEY_PREFIX, uid_index_prefix: str = SESSION_UID_INDEX_PREFIX):
+        """
+        :param redis_client: RedisClient 实例
+        :param key_prefix: 会话键前缀
+        :param uid_index_prefix: 按用户的会话索引键前缀
+        """
+        self.redis_client = redis_client
+        self.key_prefix = key_prefix
+        self.uid_index_prefix = uid_index_prefix
+
+    @property
+    def _redis(self):
+        return self.redis_client.get_client()
+
+    def _session_key(self, sid: str) -> str:
+        return self.key_prefix + sid
+
+    def _uid_index_key(self, uid) -> str:
+        return f'{self.uid_index_prefix}{uid}'
+
+    @staticmethod
+    def _generate_sid() -> str:
+        return secrets.token_urlsafe(32)
+
+    def _lifetime_seconds(self, app) -> int:
+        return max(int(app.permanent_session_lifetime.total_seconds()), 1)
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if not sid or not _SESSION_ID_RE.match(sid):
+            return self.session_class(sid=self._generate_sid(), new=True)
+        data = self._redis.get(self._session_key(sid))
+        if data is None:
+            # 会话已过期或被撤销，使用新的 ID，避免沿用客户端提供的 ID
+            return self.session_class(sid=self._generate_sid(), new=True)
+        try:
+            return self.session_class(self.serializer.loads(data), sid=sid)
+        except ValueError:
+            logger.warning("会话数据无法解析，已丢弃。")
+            return self.session_class(sid=self._generate_sid(), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        secure = self.get_cookie_secure(app)
+        samesite = self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+
+        if session.accessed:
+            response.vary.add('Cookie')
+
+        uid = session.get('uid')
+        pipe = self._redis.pipeline(transaction=False)
+
+        if not session:
+            # 会话被清空：删除服务端数据和 Cookie
+            if session.modified and not session.new:
+                pipe.delete(self._session_key(session.sid))
+                if session.initial_uid is not None:
+                    pipe.srem(self._uid_index_key(session.initial_uid), session.sid)
+                pipe.execute()
+                response.delete_cookie(name, domain=domain, path=path, secure=secure, samesite=samesite, httponly=httponly)
+                response.vary.add('Cookie')
+            return
+
+        if not self.should_set_cookie(app, session):
+            return
+
+        ttl = self._lifetime_seconds(app)
+        key = self._session_key(session.sid)
+
+        if uid != session.initial_uid:
+            # 登录状态变化时更换会话 ID，旧 ID 立即失效
+            old_sid = session.sid
+            session.sid = self._generate_sid()
+            if not session.new:
+                pipe.delete(self._session_key(old_sid))
+            if session.initial_uid is not None:
+                pipe.srem(self._uid_index_key(session.initial_uid), old_sid)
+            key = self._session_key(session.sid)
+            session.modified = True
+
+        if session.modified or session.new:
+            pipe.set(key, self.serializer.dumps(dict(session)), ex=ttl)
+        else:
+            # 未修改时只续期
+            pipe.expire(key, ttl)
+        if uid is not None:
+            index_key = self._uid_index_key(uid)
+            pipe.sadd(index_key, session.sid)
+            pipe.expire(index_key, ttl)
+        pipe.execute()
+
+        response.set_cookie(
+            name,
+            session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=httponly,
+            domain=domain,
+            path=path,
+            secure=secure,
+            samesite=samesite,
+        )
+        response.vary.add('Cookie')
+
+    def revoke_user_sessions(self, uids: Iterable) -> int:
+        """使指定用户的所有会话失效，返回删除的会话数量。"""
+        client = self._redis
+        removed = 0
+        for uid in dict.fromkeys(uids):
+            index_key = self._uid_index_key(uid)
+            sids = client.smembers(index_key)
+            keys = [self._session_key(sid) for sid in sids]
+            pipe = client.pipeline(transaction=False)
+            if keys:
+                pipe.delete(*keys)
+            pipe.delete(index_key)
+            results = pipe.execute()
+            if keys:
+                removed += results[0]
+        if removed:
+            logger.info(f"已撤销 {removed} 个会话。")
+        return removed
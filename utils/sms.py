@@ -1,9 +1,18 @@
 # -*- coding: UTF-8 -*-
 
+import asyncio
 import hashlib
 import logging
+import time
+import aiohttp
 import requests
-from typing import Tuple, Optional
+from typing import Iterable, List, Tuple, Optional
+
+from . import metrics
+from .loop import BackgroundLoop
+from .throttle import TokenBucket
+
+logger = logging.getLogger(__name__)
 
 # API返回状态码说明
 STATUS_CODES = {
@@ -17,6 +26,47 @@ STATUS_CODES = {
     51: "手机号码不正确",
 }
 
+def _parse_send_response(response_text: str) -> Tuple[bool, str]:
+    """解析发送短信接口的返回值，ValueError 表示返回值无法解析。"""
+    status_code = int(response_text)
+    message = STATUS_CODES.get(status_code, f"未知错误，状态码: {status_code}")
+    return status_code == 0, message
+
+def _parse_query_response(response_text: str) -> Tuple[bool, str]:
+    """解析余额查询接口的返回值。"""
+    response_text = response_text.strip()
+    
+    parts = response_text.split('\n')
+    
+    # 检查响应是否为空或无效
+    if not parts:
+        return False, f"API返回了无效的空响应"
+
+    # 尝试解析第一部分作为状态码
+    try:
+        status_code = int(parts[0])
+    except ValueError:
+        return False, f"无法解析API响应中的状态码: {response_text}"
+
+    # 如果状态码为 0 (成功)
+    if status_code == 0:
+        if len(parts) >= 3:  # 标准格式: 0\n用户名\n剩余条数
+            user, balance = parts[1], parts[2]
+            message = f"查询成功, 用户名: {user}, 剩余短信: {balance}条"
+            return True, message
+        elif len(parts) == 2:  # 兼容格式: 0\n剩余信息
+            balance_info = parts[1]
+            left = balance_info.split(',')[-1]  # 处理中文冒号
+            message = f"查询成功, 剩余短信: {left.strip()}"
+            return True, message
+        else:
+            return False, f"成功的响应格式不符合预期: {response_text}"
+    
+    # 如果状态码不为 0 (失败)
+    else:
+        message = STATUS_CODES.get(status_code, f"未知错误，状态码: {status_code}")
+        return False, message
+
 class SmsBao:
     """
     短信宝 (smsbao.com) API 封装
@@ -24,17 +74,19 @@ class SmsBao:
     """
     API_BASE_URL = "http://api.smsbao.com"
 
-    def __init__(self, username: str, password: str):
+    def __init__(self, username: str, password: str, api_base_url: Optional[str] = None):
         """
         初始化客户端
 
         Args:
             username (str): 短信宝平台的用户名
             password (str): 短信宝平台的密码 (注意: 请传入原始密码，该类会自动进行MD5加密)
+            api_base_url (str, optional): API 地址，默认为短信宝官方地址，可指向本地桩服务用于测试
         """
         if not username or not password:
             raise ValueError("用户名和密码不能为空")
         self.username = username
+        self.api_base_url = (api_base_url or self.API_BASE_URL).rstrip('/')
         # 根据API文档，密码需要进行MD5加密
         self.password_md5 = self._md5_encode(password)
         self.session = requests.Session()
@@ -60,13 +112,13 @@ class SmsBao:
         Raises:
             requests.exceptions.RequestException: 当网络请求失败时抛出
         """
-        url = f"{self.API_BASE_URL}{endpoint}"
+        url = f"{self.api_base_url}{endpoint}"
         try:
             response = self.session.get(url, params=params, timeout=10)
             response.raise_for_status()  # 如果HTTP状态码不是200, 则抛出异常
             return response
         except requests.exceptions.RequestException as e:
-            print(f"网络请求失败: {e}")
+            logger.error(f"网络请求失败: {e}")
             raise
 
     def send(self, mobile: str, content: str) -> Tuple[bool, str]:
@@ -87,14 +139,15 @@ class SmsBao:
             'm': mobile,
             'c': content,
         }
+        start = time.perf_counter()
         try:
             response = self._make_request("/sms", params=params)
-            status_code = int(response.text)
-            message = STATUS_CODES.get(status_code, f"未知错误，状态码: {status_code}")
-            return status_code == 0, message
+            result = _parse_send_response(response.text)
         except (requests.exceptions.RequestException, ValueError) as e:
             # ValueError 可能在 int(response.text) 时发生
-            return False, f"请求处理失败: {e}"
+            result = False, f"请求处理失败: {e}"
+        metrics.record_send('sms', result[0], time.perf_counter() - start)
+        return result
 
     def query_balance(self) -> Tuple[bool, str]:
         """
@@ -111,39 +164,132 @@ class SmsBao:
         }
         try:
             response = self._make_request("/query", params=params)
-            response_text = response.text.strip()
-            
-            parts = response_text.split('\n')
-            
-            # 检查响应是否为空或无效
-            if not parts:
-                return False, f"API返回了无效的空响应"
-
-            # 尝试解析第一部分作为状态码
-            try:
-                status_code = int(parts[0])
-            except ValueError:
-                return False, f"无法解析API响应中的状态码: {response_text}"
-
-            # 如果状态码为 0 (成功)
-            if status_code == 0:
-                if len(parts) >= 3:  # 标准格式: 0\n用户名\n剩余条数
-                    user, balance = parts[1], parts[2]
-                    message = f"查询成功, 用户名: {user}, 剩余短信: {balance}条"
-                    return True, message
-                elif len(parts) == 2:  # 兼容格式: 0\n剩余信息
-                    balance_info = parts[1]
-                    left = balance_info.split(',')[-1]  # 处理中文冒号
-                    message = f"查询成功, 剩余短信: {left.strip()}"
-                    return True, message
-                else:
-                    return False, f"成功的响应格式不符合预期: {response_text}"
-            
-            # 如果状态码不为 0 (失败)
-            else:
-                message = STATUS_CODES.get(status_code, f"未知错误，状态码: {status_code}")
-                return False, message
-
+            return _parse_query_response(response.text)
         except requests.exceptions.RequestException as e:
             return False, f"网络请求失败: {e}"
-     
\ No newline at end of file
+
+
+class AsyncSmsBao:
+    """
+    短信宝 (smsbao.com) API 的异步客户端。
+    HTTP 会话常驻在后台事件循环 (BackgroundLoop) 中，复用 keep-alive 连接，
+    并用信号量限制同时进行的发送请求数，可以在任意事件循环中调用而不会阻塞它。
+    发送速率由令牌桶整形，批量发送会按 rate_limit 匀速排队而不是触发平台限流。
+    """
+    API_BASE_URL = SmsBao.API_BASE_URL
+
+    def __init__(self, username: str, password: str, background_loop: Optional[BackgroundLoop] = None,
+                 max_concurrency: int = 5, timeout: float = 10, api_base_url: Optional[str] = None,
+                 rate_limit: Optional[float] = None, rate_burst: Optional[float] = None):
+        """
+        初始化客户端
+
+        Args:
+            username (str): 短信宝平台的用户名
+            password (str): 短信宝平台的密码 (原始密码，自动进行MD5加密)
+            background_loop (BackgroundLoop, optional): 运行 HTTP 会话的后台事件循环
+            max_concurrency (int): 同时进行的请求数上限
+            timeout (float): 单个请求的超时时间（秒）
+            api_base_url (str, optional): API 地址，可指向本地桩服务用于测试
+            rate_limit (float, optional): 每秒最多发送的短信数，默认不限速
+            rate_burst (float, optional): 允许的突发发送数
+        """
+        if not username or not password:
+            raise ValueError("用户名和密码不能为空")
+        self.username = username
+        self.password_md5 = SmsBao._md5_encode(password)
+        self.rate_limiter = TokenBucket(rate_limit, rate_burst)
+        self.api_base_url = (api_base_url or self.API_BASE_URL).rstrip('/')
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.timeout = timeout
+        self.background_loop = background_loop or BackgroundLoop(name='sms-client')
+        # 以下状态只在后台事件循环中访问
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """返回后台事件循环中的常驻会话，必要时（首次使用、fork 或会话关闭后）重新创建。"""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout))
+            self._session_loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    async def _request(self, endpoint: str, params: dict) -> str:
+        session = self._get_session()
+        async with self._semaphore:
+            async with session.get(f"{self.api_base_url}{endpoint}", params=params) as response:
+                response.raise_for_status()
+                return await response.text()
+
+    async def _send(self, mobile: str, content: str) -> Tuple[bool, str]:
+        params = {
+            'u': self.username,
+            'p': self.password_md5,
+            'm': mobile,
+            'c': content,
+        }
+        await self.rate_limiter.acquire()
+        start = time.perf_counter()
+        try:
+            result = _parse_send_response(await self._request("/sms", params))
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            logger.error(f"短信发送请求失败: {e}")
+            result = False, f"请求处理失败: {e}"
+        metrics.record_send('sms', result[0], time.perf_counter() - start)
+        return result
+
+    @property
+    def queue_depth(self) -> int:
+        """正在等待发送令牌的短信数。"""
+        return self.rate_limiter.queue_depth
+
+    async def _send_many(self, messages: List[Tuple[str, str]]) -> List[Tuple[bool, str]]:
+        return await asyncio.gather(*(self._send(mobile, content) for mobile, content in messages))
+
+    async def send(self, mobile: str, content: str) -> Tuple[bool, str]:
+        """
+        发送短信
+
+        Returns:
+            Tuple[bool, str]: (是否成功, API返回的消息)
+        """
+        return await self.background_loop.run(self._send(mobile, content))
+
+    async def send_many(self, messages: Iterable[Tuple[str, str]]) -> List[Tuple[bool, str]]:
+        """
+        批量发送短信，并发数受 max_concurrency 限制。
+
+        Args:
+            messages: (手机号码, 短信内容) 的序列
+
+        Returns:
+            List[Tuple[bool, str]]: 与输入顺序一致的发送结果
+        """
+        return await self.background_loop.run(self._send_many(list(messages)))
+
+    async def _query_balance(self) -> Tuple[bool, str]:
+        params = {
+            'u': self.username,
+            'p': self.password_md5,
+        }
+        try:
+            return _parse_query_response(await self._request("/query", params))
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            return False, f"网络请求失败: {e}"
+
+    async def query_balance(self) -> Tuple[bool, str]:
+        """查询账户余额，返回值格式与 SmsBao.query_balance 相同。"""
+        return await self.background_loop.run(self._query_balance())
+
+    async def _close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    def close(self):
+        """关闭常驻的 HTTP 会话。"""
+        if self._session is not None:
+            self.background_loop.run_sync(self._close(), timeout=10)
@@ -4,11 +4,15 @@
 import pymysql
 import logging
 import re
-from pymysql.cursors import DictCursor
-from typing import List, Dict, Any, Optional, Tuple, Union
+import threading
+import time
+from pymysql.cursors import DictCursor, SSDictCursor
+from typing import List, Dict, Any, Optional, Tuple, Union, Iterator, Callable
 
 from dbutils.pooled_db import PooledDB
 
+from . import metrics
+
 # --- 数据库管理器，全局持有一个实例 ---
 class DatabaseManager:
     """
@@ -16,12 +20,15 @@ class DatabaseManager:
     在应用程序启动时，应调用 initialize_pool()。
     """
     _pool = None
+    _pool_kwargs = None
+    _lock = threading.Lock()
 
     @classmethod
     def initialize_pool(cls, **kwargs):
         """
         在程序启动时调用一次，初始化连接池。
         """
+        cls._pool_kwargs = kwargs
         if cls._pool is None:
             logging.info("Initializing database connection pool...")
             try:
@@ -40,12 +47,38 @@ class DatabaseManager:
                 logging.error(f"Failed to initialize database pool: {e}")
                 raise
 
+    @classmethod
+    def configure(cls, **kwargs):
+        """
+        只记录连接参数，连接池在第一次 get_connection() 时创建。
+        导入应用时不建立任何数据库连接，工作进程、命令行工具的启动不受数据库延迟影响。
+        """
+        cls._pool_kwargs = kwargs
+
+    @classmethod
+    def close_pool(cls):
+        """
+        关闭连接池中的所有连接。之后的 get_connection() 会使用相同的参数重新创建连接池。
+        多进程部署时，主进程在 fork 工作进程之前调用，避免子进程继承并共用同一批数据库连接。
+        """
+        if cls._pool is not None:
+            cls._pool.close()
+            cls._pool = None
+            logging.info("Database connection pool closed.")
+
     @classmethod
     def get_connection(cls):
-        """从池中获取一个连接。"""
+        """从池中获取一个连接，等待时间计入 db_pool_wait_seconds。"""
         if cls._pool is None:
-            raise ConnectionError("Database pool has not been initialized. Call initialize_pool() first.")
-        return cls._pool.connection()
+            if cls._pool_kwargs is None:
+                raise ConnectionError("Database pool has not been initialized. Call initialize_pool() first.")
+            with cls._lock:
+                if cls._pool is None:
+                    cls.initialize_pool(**cls._pool_kwargs)
+        start = time.perf_counter()
+        conn = cls._pool.connection()
+        metrics.DB_POOL_WAIT.observe(time.perf_counter() - start)
+        return conn
 
 class SQL:
     """
@@ -60,22 +93,42 @@ class SQL:
         self.logger = logging.getLogger(__name__)
         self._conn = None
         self._cursor = None
+        self._on_commit = []
 
     def __enter__(self):
         self._conn = DatabaseManager.get_connection()
         self._cursor = self._conn.cursor()
+        metrics.DB_POOL_IN_USE.inc()
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         if self._cursor:
             self._cursor.close()
         if self._conn:
-            if exc_type:
-                self.logger.warning(f"An exception occurred. Rolling back transaction. Error: {exc_val}")
-                self._conn.rollback()
-            else:
-                self._conn.commit()
-            self._conn.close()
+            try:
+                if exc_type:
+                    self.logger.warning(f"An exception occurred. Rolling back transaction. Error: {exc_val}")
+                    self._conn.rollback()
+                else:
+                    self._conn.commit()
+                self._conn.close()
+            finally:
+                metrics.DB_POOL_IN_USE.dec()
+        callbacks, self._on_commit = self._on_commit, []
+        if exc_type:
+            return
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                self.logger.error(f"Post-commit callback failed: {e}")
+
+    def on_commit(self, callback: Callable[[], Any]):
+        """
+        注册一个在事务提交成功后执行的回调（如删除文件），事务回滚时不会执行。
+        回调在连接归还之后执行，其中的异常只记录日志。
+        """
+        self._on_commit.append(callback)
 
     def validate_indentifier_part(self, identifier: str) -> bool:
         return self._VALID_IDENTIFIER_RE.match(identifier) is not None
@@ -219,6 +272,27 @@ class SQL:
         self._execute(sql, params)
         return self._cursor.fetchall()
 
+    def iter_query(self, sql: str, params: Optional[Union[Tuple, List, Dict]] = None, batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """
+        【慎用】以流式方式执行自定义的 SELECT 查询，逐行返回结果。
+        使用服务端游标 (SSDictCursor)，结果不会一次性加载到内存中。
+        注意：迭代结束前，该连接上不能再执行其他查询。
+        """
+        cursor = self._conn.cursor(SSDictCursor)
+        try:
+            try:
+                cursor.execute(sql, params)
+            except pymysql.MySQLError as e:
+                self.logger.error(f"SQL Execution Error: {e}\nQuery: {cursor.mogrify(sql, params)}")
+                raise
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cursor.close()
+
     def execute_update(self, sql: str, params: Optional[Union[Tuple, List, Dict]] = None) -> int:
         """
         【慎用】执行自定义的 INSERT, UPDATE, DELETE 等修改性操作。
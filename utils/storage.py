@@ -0,0 +1,268 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+import asyncio
+import glob
+import hashlib
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Optional, Tuple
+
+from werkzeug.datastructures import FileStorage
+
+from .image import find_stored_image, remove_image_variants
+from .sql import SQL
+from .upload import get_spooled_upload
+
+logger = logging.getLogger(__name__)
+
+BLOB_TABLE = 'blob_ref'
+# 计算文件哈希时每次读取的字节数
+HASH_CHUNK_SIZE = 1024 * 1024
+# 进程的 umask；os.umask() 只能先设置再恢复，在导入时（尚无其他线程）读取一次
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+FILE_MODE = 0o666 & ~_UMASK
+
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BlobStore:
+    """
+    内容寻址的上传文件存储。
+    文件按 SHA-256 保存在 root/<前2位>/<3-4位>/<hash> 下，相同内容只保存一份；
+    图片的各尺寸变体保存为 <hash>_<档位>_<size>.<ext>（同一张图片可能分别作为头像和正面照上传，各档位尺寸不同），
+    与原文件共用同一个引用计数。
+    引用计数记录在 blob_ref 表中：
+    - 写入文件之前先 retain()，并单独提交，保证清理任务不会删除正在写入的文件；
+    - 业务记录不再引用时 release()，与业务数据在同一事务中提交；
+    - sweep() 删除引用计数为 0 且超过宽限期的文件。
+    """
+
+    def __init__(self, root: str = 'blobs', sweep_grace: float = 3600):
+        """
+        :param root: 存储根目录
+        :param sweep_grace: 引用计数归零后保留文件的时间（秒）
+        """
+        self.root = root
+        self.sweep_grace = sweep_grace
+
+    @property
+    def tmp_dir(self) -> str:
+        """与存储位于同一文件系统的临时目录，保证 os.replace 是原子的。"""
+        path = os.path.join(self.root, 'tmp')
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def shard_dir(self, blob_hash: str) -> str:
+        return os.path.join(self.root, blob_hash[:2], blob_hash[2:4])
+
+    def path(self, blob_hash: str, suffix: str = '') -> str:
+        """返回文件路径；suffix 用于图片变体，如 '_photo_large.jpg'。"""
+        return os.path.join(self.shard_dir(blob_hash), blob_hash + suffix)
+
+    def exists(self, blob_hash: str, suffix: str = '') -> bool:
+        return os.path.isfile(self.path(blob_hash, suffix))
+
+    def retain(self, blob_hash: str, size: int = 0):
+        """为 blob 增加一个引用，并立即提交。必须在写入文件之前调用。"""
+        now = datetime.now()
+        with SQL() as sql:
+            sql.execute_update(
+                f"INSERT INTO `{BLOB_TABLE}` (`hash`, `refcount`, `size`, `created_time`, `updated_time`) "
+                f"VALUES (%s, 1, %s, %s, %s) "
+                f"ON DUPLICATE KEY UPDATE `refcount` = `refcount` + 1, `updated_time` = VALUES(`updated_time`)",
+                (blob_hash, size, now, now)
+            )
+
+    def release(self, blob_hash: Optional[str], sql: Optional[SQL] = None):
+        """释放一个引用；文件由 sweep() 在宽限期后删除。"""
+        if not blob_hash:
+            return
+        query = (f"UPDATE `{BLOB_TABLE}` SET `refcount` = `refcount` - 1, `updated_time` = %s "
+                 f"WHERE `hash` = %s AND `refcount` > 0")
+        params = (datetime.now(), blob_hash)
+        if sql is not None:
+            sql.execute_update(query, params)
+        else:
+            with SQL() as new_sql:
+                new_sql.execute_update(query, params)
+
+    def discard(self, blob_hash: Optional[str], legacy_path: Optional[str] = None, sql: Optional[SQL] = None):
+        """
+        业务记录不再引用某个文件时调用：有 hash 的释放引用，
+        迁移到 BlobStore 之前的旧记录（只有路径）则删除文件及其图片变体。
+        传入 sql 时旧文件在该事务提交后才删除，事务回滚时保留。
+        """
+        if blob_hash:
+            self.release(blob_hash, sql)
+        elif legacy_path:
+            if sql is not None:
+                sql.on_commit(lambda: remove_image_variants(legacy_path))
+            else:
+                remove_image_variants(legacy_path)
+
+    def write_bytes(self, blob_hash: str, data: bytes, suffix: str = ''):
+        """原子地写入文件；文件已存在时跳过。"""
+        target = self.path(blob_hash, suffix)
+        if os.path.isfile(target):
+            return
+        tmp_path = os.path.join(self.tmp_dir, uuid.uuid4().hex)
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        self.move_into_place(tmp_path, blob_hash, suffix)
+
+    def move_into_place(self, tmp_path: str, blob_hash: str, suffix: str = ''):
+        """将临时文件原子地移动到 blob 路径；内容已存在时删除临时文件。"""
+        target = self.path(blob_hash, suffix)
+        if os.path.isfile(target):
+            os.remove(tmp_path)
+            return
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # mkstemp 创建的上传临时文件权限为 0600，统一改为按 umask 的默认权限，
+        # 否则以其他用户运行的前端服务器（X-Accel-Redirect/X-Sendfile）无法读取
+        os.chmod(tmp_path, FILE_MODE)
+        os.replace(tmp_path, target)
+
+    def store_bytes(self, data: bytes) -> Tuple[str, str]:
+        """保存一段内容并持有一个引用，返回 (hash, 路径)。后续业务写入失败时调用方应 release()。"""
+        blob_hash = hash_bytes(data)
+        self.retain(blob_hash, len(data))
+        try:
+            self.write_bytes(blob_hash, data)
+        except BaseException:
+            self.release(blob_hash)
+            raise
+        return blob_hash, self.path(blob_hash)
+
+    def store_upload(self, file: FileStorage) -> Tuple[str, str]:
+        """
+        保存一个上传文件并持有一个引用，返回 (hash, 路径)。
+        由 SpoolingRequest 落盘的文件直接使用上传时计算的哈希，并原子地移动到位，不再读取内容。
+        """
+        upload = get_spooled_upload(file)
+        if upload is None:
+            return self.store_bytes(file.read())
+        blob_hash = upload.hexdigest()
+        self.retain(blob_hash, upload.size)
+        try:
+            self.move_into_place(upload.detach(), blob_hash)
+        except BaseException:
+            self.release(blob_hash)
+            raise
+        return blob_hash, self.path(blob_hash)
+
+    async def _store_image(self, blob_hash: str, size: int, read: Callable[[], bytes], processor, profile: str) -> Tuple[str, str]:
+        # 可能运行在共享的后台事件循环中（如 QQ 头像下载），数据库操作放到线程中执行
+        await asyncio.to_thread(self.retain, blob_hash, size)
+        try:
+            # 变体路径包含档位，resolve_image_variant()、remove_image_variants() 按 <hash>_<档位> 作为基础路径处理
+            base = self.path(blob_hash, f'_{profile}')
+            path = find_stored_image(base)
+            if path is None:
+                path = await processor.save(read(), base, profile)
+        except BaseException:
+            await asyncio.to_thread(self.release, blob_hash)
+            raise
+        return blob_hash, path
+
+    async def store_image(self, data: bytes, processor, profile: str) -> Tuple[str, str]:
+        """
+        保存图片的各尺寸变体并持有一个引用，返回 (原始内容的 hash, ImageProcessor.save() 返回的路径)。
+        相同图片再次上传时不会重复处理。后续业务写入失败时调用方应 release()。
+
+        :param processor: ImageProcessor 实例
+        :raises InvalidImageError: 文件无法解析为图片（此时已释放引用）
+        """
+        return await self._store_image(hash_bytes(data), len(data), lambda: data, processor, profile)
+
+    async def store_image_upload(self, file: FileStorage, processor, profile: str) -> Tuple[str, str]:
+        """与 store_image 相同，但接受上传文件；已落盘的重复图片无需读入内存。"""
+        upload = get_spooled_upload(file)
+        if upload is None:
+            return await self.store_image(file.read(), processor, profile)
+
+        def read():
+            upload.seek(0)
+            return upload.read()
+        return await self._store_image(upload.hexdigest(), upload.size, read, processor, profile)
+
+    def _remove_files(self, blob_hash: str):
+        # 原文件及所有档位的图片变体都以 hash 开头
+        for path in glob.glob(glob.escape(self.path(blob_hash)) + '*'):
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.warning(f"删除文件 {path} 失败: {e}")
+
+    def sweep(self, scan_orphans: bool = True) -> int:
+        """
+        删除引用计数为 0 且超过宽限期的 blob，返回删除的数量。
+        scan_orphans 为 True 时还会清理没有任何引用记录的文件（如写入后事务未提交）。
+        """
+        deadline = datetime.now() - timedelta(seconds=self.sweep_grace)
+        with SQL() as sql:
+            candidates = sql.execute_query(
+                f"SELECT `hash` FROM `{BLOB_TABLE}` WHERE `refcount` <= 0 AND `updated_time` < %s",
+                (deadline,)
+            )
+        removed = 0
+        for row in candidates:
+            blob_hash = row['hash']
+            # 删除记录与删除文件在同一事务中进行，并发的 retain() 会等待该事务结束后重新创建记录
+            with SQL() as sql:
+                if sql.execute_update(
+                    f"DELETE FROM `{BLOB_TABLE}` WHERE `hash` = %s AND `refcount` <= 0 AND `updated_time` < %s",
+                    (blob_hash, deadline)
+                ):
+                    self._remove_files(blob_hash)
+                    removed += 1
+
+        if scan_orphans and os.path.isdir(self.root):
+            removed += self._sweep_orphans(deadline.timestamp())
+        logger.info(f"Blob 清理完成，删除 {removed} 个无引用的文件。")
+        return removed
+
+    def _sweep_orphans(self, deadline_ts: float) -> int:
+        tmp_dir = os.path.abspath(os.path.join(self.root, 'tmp'))
+        hashes = set()
+        for dirpath, _, filenames in os.walk(self.root):
+            if os.path.abspath(dirpath).startswith(tmp_dir):
+                # 中断上传留下的临时文件
+                for name in filenames:
+                    path = os.path.join(dirpath, name)
+                    if os.path.getmtime(path) < deadline_ts:
+                        os.remove(path)
+                continue
+            for name in filenames:
+                blob_hash = name[:64]
+                path = os.path.join(dirpath, name)
+                if len(blob_hash) == 64 and os.path.getmtime(path) < deadline_ts:
+                    hashes.add(blob_hash)
+        removed = 0
+        hash_list = list(hashes)
+        for i in range(0, len(hash_list), 500):
+            chunk = hash_list[i:i + 500]
+            placeholders = ', '.join(['%s'] * len(chunk))
+            # FOR UPDATE 同时锁住不存在记录的间隙，删除期间并发的 retain() 会等待
+            with SQL() as sql:
+                known = {row['hash'] for row in sql.execute_query(
+                    f"SELECT `hash` FROM `{BLOB_TABLE}` WHERE `hash` IN ({placeholders}) FOR UPDATE", tuple(chunk)
+                )}
+                for blob_hash in chunk:
+                    if blob_hash not in known:
+                        self._remove_files(blob_hash)
+                        removed += 1
+        return removed
@@ -0,0 +1,187 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+import csv
+import io
+import logging
+import os
+import re
+import zipfile
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+from urllib.parse import quote
+
+from flask import Response, request
+
+from .json_provider import dumps as json_dumps
+from .sql import SQL
+
+logger = logging.getLogger(__name__)
+
+# 支持的流式输出格式及其 MIME 类型
+STREAM_FORMATS = {
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+# 打包 ZIP 时每次读取文件的字节数
+ZIP_CHUNK_SIZE = 64 * 1024
+# 这些格式本身已压缩，直接存储以节省 CPU
+ZIP_STORED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.zip', '.rar', '.7z', '.gz', '.pdf', '.docx'}
+
+
+def get_stream_format() -> Optional[str]:
+    """
+    从查询参数 `format` 中读取流式输出格式。
+    返回 'ndjson' / 'csv'，未指定或不支持时返回 None（即使用默认的 JSON 响应）。
+    """
+    fmt = request.args.get('format', '').strip().lower()
+    return fmt if fmt in STREAM_FORMATS else None
+
+
+def _iter_ndjson(rows: Iterable[Dict[str, Any]], flush_rows: int) -> Iterable[str]:
+    buffer = []
+    for row in rows:
+        buffer.append(json_dumps(row))
+        if len(buffer) >= flush_rows:
+            yield '\n'.join(buffer) + '\n'
+            buffer = []
+    if buffer:
+        yield '\n'.join(buffer) + '\n'
+
+
+def _iter_csv(rows: Iterable[Dict[str, Any]], columns: List[str], flush_rows: int) -> Iterable[str]:
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=columns, extrasaction='ignore')
+    # 写入 BOM，便于 Excel 正确识别 UTF-8 中文
+    output.write('\ufeff')
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count >= flush_rows:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate(0)
+            count = 0
+    yield output.getvalue()
+
+
+def content_disposition(filename: str) -> str:
+    """
+    附件下载的 Content-Disposition 头。filename 可能来自请求参数：
+    filename 参数只保留 ASCII 安全字符，完整文件名通过 RFC 5987 的 filename* 参数传递。
+    """
+    fallback = re.sub(r'[^A-Za-z0-9._-]', '_', filename)
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+
+def stream_rows(rows: Iterable[Dict[str, Any]], fmt: str, columns: List[str],
+                filename: Optional[str] = None, flush_rows: int = 100) -> Response:
+    """
+    将逐行产生的记录以 NDJSON 或 CSV 格式流式写入响应。
+
+    :param rows: 记录的迭代器（通常是包裹了 SQL.iter_query 的生成器）
+    :param fmt: 'ndjson' 或 'csv'
+    :param columns: CSV 的列顺序
+    :param filename: 如提供，则以附件形式下载
+    :param flush_rows: 每累计多少行向客户端写出一次
+    """
+    if fmt == 'csv':
+        body = _iter_csv(rows, columns, flush_rows)
+    else:
+        body = _iter_ndjson(rows, flush_rows)
+
+    response = Response(body, content_type=STREAM_FORMATS[fmt])
+    if filename:
+        response.headers['Content-Disposition'] = content_disposition(f'{filename}.{fmt}')
+    # 禁止反向代理缓冲，保证首字节尽快到达客户端
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def stream_query(query: str, params: Any, row_formatter: Callable[[Dict[str, Any]], Dict[str, Any]]) -> Iterable[Dict[str, Any]]:
+    """
+    在独立的数据库连接上以服务端游标执行查询，并对每一行应用 row_formatter。
+    连接会一直持有到生成器被完全消费或被关闭为止。
+    """
+    with SQL() as sql:
+        for row in sql.iter_query(query, params):
+            yield row_formatter(row)
+
+
+class _ZipSink:
+    """
+    zipfile 的只写输出：缓存写入的数据，由生成器取走后发送给客户端。
+    不提供 seek()，zipfile 会改用数据描述符记录大小和 CRC，无需回写已发送的内容。
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+ZipEntry = Tuple[str, Union[str, bytes]]
+
+
+def iter_zip(entries: Iterable[ZipEntry], chunk_size: int = ZIP_CHUNK_SIZE) -> Iterable[bytes]:
+    """
+    边打包边输出 ZIP 数据。内存占用只与 chunk_size 有关，不写临时文件。
+
+    :param entries: (压缩包内路径, 文件路径或 bytes 内容) 的迭代器；文件不存在时跳过
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED, allowZip64=True) as zf:
+        for arcname, source in entries:
+            compress_type = zipfile.ZIP_STORED if os.path.splitext(arcname)[1].lower() in ZIP_STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+            if isinstance(source, bytes):
+                info = zipfile.ZipInfo(arcname, date_time=datetime.now().timetuple()[:6])
+                info.compress_type = compress_type
+                zf.writestr(info, source)
+            else:
+                if not source or not os.path.isfile(source):
+                    logger.warning(f"打包 ZIP 时跳过不存在的文件: {source}")
+                    continue
+                info = zipfile.ZipInfo.from_file(source, arcname)
+                info.compress_type = compress_type
+                with open(source, 'rb') as src, zf.open(info, 'w', force_zip64=info.file_size > zipfile.ZIP64_LIMIT) as dest:
+                    for chunk in iter(lambda: src.read(chunk_size), b''):
+                        dest.write(chunk)
+                        data = sink.drain()
+                        if data:
+                            yield data
+            data = sink.drain()
+            if data:
+                yield data
+    # 中央目录在 ZipFile 关闭时写出
+    yield sink.drain()
+
+
+def stream_zip(entries: Iterable[ZipEntry], filename: str) -> Response:
+    """
+    以附件形式流式返回 ZIP 压缩包。
+
+    :param entries: 参见 iter_zip
+    :param filename: 下载文件名（不含扩展名）
+    """
+    response = Response(iter_zip(entries), mimetype='application/zip')
+    response.headers['Content-Disposition'] = content_disposition(f'{filename}.zip')
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,73 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+import asyncio
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    令牌桶限速器，用于把批量发送整形为服务商允许的速率。
+    - 令牌以 rate 个/秒的速度补充，最多积攒 burst 个；
+    - acquire() 按调用顺序预约令牌，令牌不足时等待，而不是失败；
+    - pause() 用于服务商返回限流响应时整体推迟后续发送；
+    - rate 为 None 或 0 时不限速。
+    预约在线程锁下完成，因此同一个实例可以在不同线程、不同事件循环中共享。
+    """
+
+    def __init__(self, rate: Optional[float], burst: Optional[float] = None):
+        """
+        :param rate: 每秒允许的次数，None 或 0 表示不限速
+        :param burst: 允许的突发次数，默认与 rate 相同（至少为 1）
+        """
+        self.rate = float(rate) if rate else 0.0
+        self.burst = max(1.0, float(burst) if burst else self.rate)
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._waiting = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    @property
+    def queue_depth(self) -> int:
+        """当前正在等待令牌的调用数。"""
+        return self._waiting
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def reserve(self, tokens: float = 1) -> float:
+        """预约令牌，返回需要等待的秒数（0 表示可以立即执行）。"""
+        if not self.enabled:
+            return 0.0
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    async def acquire(self, tokens: float = 1):
+        """等待直到获得令牌。"""
+        delay = self.reserve(tokens)
+        if delay <= 0:
+            return
+        self._waiting += 1
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            self._waiting -= 1
+
+    def pause(self, seconds: float):
+        """推迟之后的预约，使下一次发放令牌至少在 seconds 秒之后。"""
+        if not self.enabled or seconds <= 0:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, 0.0) - seconds * self.rate
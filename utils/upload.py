@@ -0,0 +1,89 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+import hashlib
+import os
+import tempfile
+from typing import Optional
+
+from flask import Request, current_app
+from werkzeug.datastructures import FileStorage
+from werkzeug.exceptions import RequestEntityTooLarge
+
+
+class SpooledUpload:
+    """
+    multipart 上传文件的落盘容器。
+    werkzeug 解析请求体时按块调用 write()，每块直接写入临时文件，同时计算 SHA-256 并检查大小，
+    内存占用与文件大小无关。临时文件位于存储目录所在的文件系统，校验通过后可以原子地移动到最终位置；
+    未被移走的临时文件在 close() 时删除。
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_size: Optional[int] = None):
+        fd, self.name = tempfile.mkstemp(prefix='upload-', dir=directory)
+        self._file = os.fdopen(fd, 'w+b')
+        self._digest = hashlib.sha256()
+        self.size = 0
+        self.max_size = max_size
+
+    def write(self, data: bytes) -> int:
+        self.size += len(data)
+        if self.max_size is not None and self.size > self.max_size:
+            raise RequestEntityTooLarge()
+        self._digest.update(data)
+        return self._file.write(data)
+
+    def hexdigest(self) -> str:
+        """已写入内容的 SHA-256。"""
+        return self._digest.hexdigest()
+
+    def detach(self) -> str:
+        """刷新并关闭文件，返回临时文件路径；之后由调用方负责移动或删除该文件。"""
+        self._file.flush()
+        self._file.close()
+        path, self.name = self.name, None
+        return path
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+        if self.name and os.path.exists(self.name):
+            os.remove(self.name)
+        self.name = None
+
+    def __getattr__(self, name):
+        # read/seek/tell 等操作直接交给底层文件
+        return getattr(self._file, name)
+
+    def __iter__(self):
+        return iter(self._file)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def get_spooled_upload(file: FileStorage) -> Optional[SpooledUpload]:
+    """如果上传文件由 SpoolingRequest 落盘，返回对应的 SpooledUpload。"""
+    stream = getattr(file, 'stream', None)
+    return stream if isinstance(stream, SpooledUpload) else None
+
+
+class SpoolingRequest(Request):
+    """
+    将上传文件流式写入 UPLOAD_TMP_DIR 下的临时文件的请求类，
+    单个文件超过 MAX_UPLOAD_FILE_SIZE 时立即以 413 中止解析。
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        upload = SpooledUpload(current_app.config.get('UPLOAD_TMP_DIR'), current_app.config.get('MAX_UPLOAD_FILE_SIZE'))
+        # 解析中途失败（如 413）时 werkzeug 不会关闭已创建的文件，需要在请求结束时统一清理
+        self.__dict__.setdefault('_spooled_uploads', []).append(upload)
+        return upload
+
+    def close(self):
+        super().close()
+        for upload in self.__dict__.pop('_spooled_uploads', []):
+            upload.close()
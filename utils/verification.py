@@ -0,0 +1,127 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+import hashlib
+import secrets
+
+VERIFICATION_KEY_PREFIX = 'verify:'
+
+# 校验结果
+VERIFY_OK = 'ok'
+VERIFY_MISMATCH = 'mismatch'
+VERIFY_EXPIRED = 'expired'
+VERIFY_LOCKED = 'locked'
+
+# 冷却期内返回 {0, 剩余秒数}；否则写入验证码、重置尝试次数并设置冷却，返回 {1, 0}
+_ISSUE_SCRIPT = """
+if redis.call('SET', KEYS[3], '1', 'NX', 'EX', ARGV[3]) == false then
+    return {0, redis.call('TTL', KEYS[3])}
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+redis.call('DEL', KEYS[2])
+return {1, 0}
+"""
+
+# 验证码不存在返回 expired；尝试次数超限时作废验证码并返回 locked；匹配时删除验证码（一次性）
+_VERIFY_SCRIPT = """
+local stored = redis.call('GET', KEYS[1])
+if not stored then
+    return 'expired'
+end
+local attempts = redis.call('INCR', KEYS[2])
+if attempts == 1 then
+    redis.call('EXPIRE', KEYS[2], redis.call('TTL', KEYS[1]))
+end
+if stored == ARGV[1] then
+    redis.call('DEL', KEYS[1], KEYS[2])
+    return 'ok'
+end
+if attempts >= tonumber(ARGV[2]) then
+    redis.call('DEL', KEYS[1], KEYS[2])
+    return 'locked'
+end
+return 'mismatch'
+"""
+
+
+class VerificationCooldown(Exception):
+    """冷却期内重复申请验证码。"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"请在 {retry_after} 秒后重试")
+        self.retry_after = retry_after
+
+
+class VerificationCodeService:
+    """
+    基于 Redis 的一次性验证码。
+    验证码（只保存其哈希）、尝试次数和冷却标记分别保存在 verify:<用途>:<目标>:code/attempts/cooldown，
+    全部使用 Redis 原生过期时间，签发与校验各为一个原子脚本。可用于邮箱、手机号等不同用途。
+    """
+
+    def __init__(self, redis_client, purpose: str, ttl: int = 600, cooldown: int = 60, max_attempts: int = 5,
+                 length: int = 6, alphabet: str = '0123456789abcdef', key_prefix: str = VERIFICATION_KEY_PREFIX):
+        """
+        :param redis_client: RedisClient 实例
+        :param purpose: 用途，如 'mail'、'phone'，不同用途的验证码互不影响
+        :param ttl: 验证码有效期（秒）
+        :param cooldown: 同一目标两次签发之间的最短间隔（秒）
+        :param max_attempts: 最多校验次数，用完后验证码作废
+        :param length: 验证码长度
+        :param alphabet: 验证码字符集
+        """
+        self.redis_client = redis_client
+        self.purpose = purpose
+        self.ttl = ttl
+        self.cooldown = cooldown
+        self.max_attempts = max_attempts
+        self.length = length
+        self.alphabet = alphabet
+        self.key_prefix = key_prefix
+        client = redis_client.get_client()
+        self._issue_script = client.register_script(_ISSUE_SCRIPT)
+        self._verify_script = client.register_script(_VERIFY_SCRIPT)
+
+    def _keys(self, target: str):
+        base = f'{self.key_prefix}{self.purpose}:{self._normalize_target(target)}'
+        return [f'{base}:code', f'{base}:attempts', f'{base}:cooldown']
+
+    @staticmethod
+    def _normalize_target(target: str) -> str:
+        return str(target).strip().lower()
+
+    def _normalize_code(self, code: str) -> str:
+        code = str(code).strip()
+        return code.lower() if self.alphabet == self.alphabet.lower() else code
+
+    @staticmethod
+    def _digest(code: str) -> str:
+        return hashlib.sha256(code.encode('utf-8')).hexdigest()
+
+    def issue(self, target: str) -> str:
+        """
+        为目标签发新的验证码，之前的验证码随之失效。
+
+        :raises VerificationCooldown: 距离上次签发不足 cooldown 秒
+        """
+        code = ''.join(secrets.choice(self.alphabet) for _ in range(self.length))
+        issued, retry_after = self._issue_script(keys=self._keys(target),
+                                                 args=[self._digest(code), self.ttl, self.cooldown])
+        if not issued:
+            raise VerificationCooldown(max(int(retry_after), 1))
+        return code
+
+    def verify(self, target: str, code: str) -> str:
+        """
+        校验验证码，成功后验证码立即作废。
+
+        :return: VERIFY_OK、VERIFY_MISMATCH、VERIFY_EXPIRED（不存在或已过期）或 VERIFY_LOCKED（尝试次数用完）
+        """
+        if not code:
+            return VERIFY_MISMATCH
+        return self._verify_script(keys=self._keys(target),
+                                   args=[self._digest(self._normalize_code(code)), self.max_attempts])
+
+    def revoke(self, target: str):
+        """作废验证码并解除冷却，用于验证码发送失败的情况。"""
+        self.redis_client.delete(*self._keys(target))
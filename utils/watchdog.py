@@ -0,0 +1,179 @@
+#!/usr/bin/python
+# -*- coding: UTF-8 -*-
+
+import asyncio
+import functools
+import inspect
+import itertools
+import logging
+import os
+import sys
+import sysconfig
+import threading
+import time
+import traceback
+from typing import Any, Dict, Optional
+
+from flask import has_request_context, request, session
+
+from . import metrics
+
+# 标准库与第三方库所在目录，定位阻塞点时跳过其中的栈帧
+_LIBRARY_PATHS = tuple({os.path.realpath(sysconfig.get_paths()[key]) for key in ('stdlib', 'platstdlib', 'purelib', 'platlib')})
+
+
+def _is_library_file(filename: str) -> bool:
+    return os.path.realpath(filename).startswith(_LIBRARY_PATHS)
+
+
+class _WatchedLoop:
+    __slots__ = ('loop', 'name', 'thread_id', 'context', 'pending_since', 'reported')
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, name: str, thread_id: int, context: Dict[str, Any]):
+        self.loop = loop
+        self.name = name
+        self.thread_id = thread_id
+        self.context = context
+        self.pending_since: Optional[float] = None
+        self.reported = False
+
+
+class LoopWatchdog:
+    """
+    事件循环阻塞检测。独立的守护线程每隔 interval 秒向被监视的事件循环投递一个回调，
+    回调超过 threshold 秒仍未执行，说明循环正被同步调用（数据库查询、requests、文件读写、密码哈希等）占住：
+    此时抓取事件循环所在线程的调用栈，连同路由、uid 一起写入日志，并计入 event_loop_blocked_total；
+    循环恢复后再记录本次阻塞的总时长。
+
+    - init_app() 之后，每个异步视图（及异步的请求钩子）执行期间自动监视其事件循环；
+    - watch()/unwatch() 用于监视常驻的事件循环，如 BackgroundLoop（可在 on_start 回调中调用）。
+    """
+
+    def __init__(self, threshold: float = 0.1, interval: Optional[float] = None, stack_limit: int = 30,
+                 logger: logging.Logger = None):
+        """
+        :param threshold: 判定为阻塞的时长（秒）
+        :param interval: 采样间隔（秒），默认为 threshold 的一半
+        :param stack_limit: 日志中保留的栈帧数
+        """
+        self.threshold = threshold
+        self.interval = interval or threshold / 2
+        self.stack_limit = stack_limit
+        self.logger = logger or logging.getLogger(__name__)
+        self._watched: Dict[int, _WatchedLoop] = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._stop = threading.Event()
+
+    def init_app(self, app):
+        """监视 app 中所有异步视图执行时所在的事件循环（无论事件循环由谁创建）。"""
+        default_ensure_sync = app.ensure_sync
+
+        def ensure_sync(func):
+            if inspect.iscoroutinefunction(func):
+                func = self._watched_coroutine(func)
+            return default_ensure_sync(func)
+
+        app.ensure_sync = ensure_sync
+
+    def _watched_coroutine(self, func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            token = self.watch(asyncio.get_running_loop(), 'request', self._request_context())
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                self.unwatch(token)
+        return wrapper
+
+    @staticmethod
+    def _request_context() -> Dict[str, Any]:
+        if not has_request_context():
+            return {}
+        return {
+            'method': request.method,
+            'route': request.url_rule.rule if request.url_rule is not None else request.path,
+            'uid': session.get('uid'),
+        }
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        # 首次使用或 fork 之后（子进程不继承线程）启动采样线程；父进程中监视的事件循环在子进程里不再运行
+        if self._pid is not None and self._pid != os.getpid():
+            self._watched.clear()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='loop-watchdog', daemon=True)
+        self._pid = os.getpid()
+        self._thread.start()
+
+    def watch(self, loop: asyncio.AbstractEventLoop, name: str, context: Optional[Dict[str, Any]] = None,
+              thread_id: Optional[int] = None) -> int:
+        """
+        开始监视 loop，返回供 unwatch() 使用的标识。
+        thread_id 为运行该事件循环的线程，默认为当前线程（在循环内部调用时即为循环所在线程）。
+        """
+        entry = _WatchedLoop(loop, name, thread_id or threading.get_ident(), context or {})
+        with self._lock:
+            self._ensure_thread()
+            token = next(self._ids)
+            self._watched[token] = entry
+        return token
+
+    def unwatch(self, token: int):
+        with self._lock:
+            self._watched.pop(token, None)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                entries = list(self._watched.items())
+            now = time.monotonic()
+            for token, entry in entries:
+                if entry.pending_since is None:
+                    entry.pending_since = now
+                    try:
+                        entry.loop.call_soon_threadsafe(self._ack, entry)
+                    except RuntimeError:
+                        # 事件循环已关闭
+                        self.unwatch(token)
+                elif not entry.reported and now - entry.pending_since >= self.threshold:
+                    entry.reported = True
+                    self._report(entry, now - entry.pending_since)
+
+    def _ack(self, entry: _WatchedLoop):
+        # 在被监视的事件循环中执行，能执行到这里说明循环已恢复响应
+        if entry.reported:
+            blocked = time.monotonic() - entry.pending_since
+            metrics.LOOP_BLOCKED_SECONDS.labels(entry.name).observe(blocked)
+            self.logger.warning(f"事件循环 {entry.name} 阻塞了 {blocked * 1000:.0f}ms 后恢复{self._describe(entry)}")
+        entry.pending_since = None
+        entry.reported = False
+
+    @staticmethod
+    def _describe(entry: _WatchedLoop) -> str:
+        context = entry.context
+        if not context:
+            return ''
+        return f"（{context.get('method', '')} {context.get('route', '')} uid={context.get('uid')}）"
+
+    def _report(self, entry: _WatchedLoop, blocked: float):
+        frame = sys._current_frames().get(entry.thread_id)
+        if frame is None:
+            return
+        stack = traceback.extract_stack(frame)
+        site = next((item for item in reversed(stack) if not _is_library_file(item.filename)), stack[-1])
+        metrics.LOOP_BLOCKED.labels(entry.name, entry.context.get('route', '')).inc()
+        self.logger.warning(
+            f"事件循环 {entry.name} 已阻塞 {blocked * 1000:.0f}ms{self._describe(entry)}，"
+            f"阻塞点 {site.filename}:{site.lineno} {site.name}\n"
+            + ''.join(traceback.format_list(stack[-self.stack_limit:]))
+        )
@@ -0,0 +1,59 @@
+import argparse
+import asyncio
+import signal
+
+import utils
+import core
+
+
+async def run_worker():
+    from core.global_params import global_config
+    from utils.notification import NOTIFICATION_HANDLERS
+
+    worker_config = global_config.get('notification_worker', {})
+    worker = utils.OutboxWorker(
+        NOTIFICATION_HANDLERS,
+        concurrency=worker_config.get('concurrency', 8),
+        batch_size=worker_config.get('batch_size', 50),
+        poll_interval=worker_config.get('poll_interval', 1),
+        retry_base_delay=worker_config.get('retry_base_delay', 10),
+        retry_max_delay=worker_config.get('retry_max_delay', 600),
+        lease_timeout=worker_config.get('lease_timeout', 300),
+        retention_days=worker_config.get('retention_days', 30)
+    )
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+
+    metrics_config = global_config.get('metrics', {})
+    if metrics_config.get('enabled', True):
+        utils.watch_loop_lag(loop, 'worker', metrics_config.get('loop_lag_interval', 1))
+    if global_config.get('loop_watchdog', {}).get('enabled', False):
+        from core.global_params import loop_watchdog
+        loop_watchdog.watch(loop, 'worker')
+
+    await worker.run()
+
+
+def sync_schema():
+    from core.schema import sync_schema
+    sync_schema()
+
+
+def sweep_blobs():
+    from core.global_params import blob_store
+    blob_store.sweep()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='后台任务')
+    parser.add_argument('--sync-schema', action='store_true', help='创建、同步数据表后退出（部署或升级后执行一次）')
+    parser.add_argument('--sweep-blobs', action='store_true', help='清理引用计数为 0 的上传文件后退出（可由 cron 定期执行）')
+    args = parser.parse_args()
+    if args.sync_schema:
+        sync_schema()
+    elif args.sweep_blobs:
+        sweep_blobs()
+    else:
+        asyncio.run(run_worker())
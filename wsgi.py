@@ -0,0 +1,14 @@
+import utils
+from core import create_app
+from core.global_params import global_config
+
+flask_app = create_app()
+
+server_config = global_config.get('server', {})
+
+# 可选：异步视图复用所在工作线程的常驻事件循环，而不是每个请求新建一个
+if server_config.get('thread_event_loop', False):
+    utils.use_thread_event_loops(flask_app)
+
+# WSGI 入口，供 gunicorn 等服务器使用: gunicorn -c gunicorn.conf.py wsgi:app
+app = flask_app